@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Benchmark collection and import checks on synthetic source trees"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import importlib.machinery
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+from pathlib import Path
+
+LAYOUTS = ("flat", "deep", "namespace", "src", "extension")
+# modules per leaf package
+PACKAGE_SIZE = 50
+# nesting depth of "deep" and "namespace" layouts
+DEPTH = 4
+
+
+def find_extension() -> Path | None:
+    """Find a stdlib extension module that can be copied into packages"""
+    dynload = Path(sysconfig.get_path("platstdlib")) / "lib-dynload"
+    for suffix in importlib.machinery.EXTENSION_SUFFIXES:
+        path = dynload / f"_bisect{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def generate(root: Path, layout: str, modules: int) -> None:
+    """Generate a tree of approximately `modules` modules"""
+    base = root / "src" if layout == "src" else root
+    extension = find_extension() if layout == "extension" else None
+    packages = max(1, modules // PACKAGE_SIZE)
+    for pkg in range(packages):
+        if layout in ("deep", "namespace"):
+            parts = [f"top{pkg % 10}",
+                     *(f"sub{pkg}_{level}" for level in range(DEPTH - 1))]
+        else:
+            parts = [f"pkg{pkg}"]
+        directory = base.joinpath(*parts)
+        directory.mkdir(parents=True, exist_ok=True)
+        for i in range(len(parts)):
+            init = base.joinpath(*parts[:i + 1], "__init__.py")
+            # namespace packages only have a regular package at the bottom
+            if layout != "namespace" or i == len(parts) - 1:
+                init.touch()
+        module_count = PACKAGE_SIZE - 1
+        if extension is not None:
+            # the PyInit function name matches the basename of the module
+            shutil.copy(extension, directory / extension.name)
+            module_count -= 1
+        prefix = ".".join(parts)
+        for i in range(module_count):
+            imports = f"import {prefix}.mod{i - 1}\n" if i > 0 else ""
+            (directory / f"mod{i}.py").write_text(
+                f"{imports}\n"
+                f"def func{i}(x):\n"
+                f"    return x + {i}\n")
+
+
+def run_pytest(root: Path, args: list[str]) -> tuple[float, int, str]:
+    """Run pytest in a subprocess, returning wall time, exit code and output"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-m", "pytest",
+                           "-p", "no:cacheprovider", *args],
+                          cwd=root, env=env, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True, check=False)
+    return time.perf_counter() - start, proc.returncode, proc.stdout
+
+
+def count_items(output: str) -> int:
+    """Count the items listed by --collect-only -q"""
+    return sum(1 for line in output.splitlines()
+               if "::import-check" in line)
+
+
+def benchmark(root: Path, layout: str, modules: int, mode: str,
+              cnp: str, extra_args: list[str], repeat: int) -> dict:
+    args = ["--import-check", f"--import-mode={mode}",
+            "-o", f"consider_namespace_packages={cnp}", *extra_args]
+    if layout == "src":
+        args.append("src")
+    collect_times = []
+    run_times = []
+    items = 0
+    exit_code = 0
+    for _ in range(repeat):
+        wall, exit_code, output = run_pytest(
+            root, [*args, "--collect-only", "-q"])
+        collect_times.append(wall)
+        items = count_items(output)
+        wall, exit_code, _ = run_pytest(root, [*args, "-q"])
+        run_times.append(wall)
+    collect_time = min(collect_times)
+    run_time = min(run_times)
+    return {
+        "layout": layout,
+        "modules": modules,
+        "import_mode": mode,
+        "consider_namespace_packages": cnp == "true",
+        "items": items,
+        "collect_time": collect_time,
+        "run_time": run_time,
+        "per_item": (run_time - collect_time) / items if items else None,
+        "exit_code": exit_code,
+    }
+
+
+def metadata() -> dict:
+    import pytest
+
+    import pytest_import_check
+
+    revision = None
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version,
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pytest": pytest.__version__,
+        "pytest_import_check": pytest_import_check.__version__,
+        "revision": revision,
+    }
+
+
+def comma_list(value: str) -> list[str]:
+    return [x.strip() for x in value.split(",") if x.strip()]
+
+
+def main() -> int:
+    argp = argparse.ArgumentParser(description=__doc__)
+    argp.add_argument("--sizes",
+                      type=lambda x: [int(y) for y in comma_list(x)],
+                      default=[1000, 10000],
+                      help="Comma-separated numbers of modules to generate "
+                           "(default: 1000,10000)")
+    argp.add_argument("--layouts",
+                      type=comma_list,
+                      default=list(LAYOUTS),
+                      help=f"Comma-separated tree layouts "
+                           f"(default: {','.join(LAYOUTS)})")
+    argp.add_argument("--import-modes",
+                      type=comma_list,
+                      default=["importlib", "prepend", "append"],
+                      help="Comma-separated import modes "
+                           "(default: importlib,prepend,append)")
+    argp.add_argument("--consider-namespace-packages",
+                      type=comma_list,
+                      default=["false", "true"],
+                      help="Comma-separated consider_namespace_packages "
+                           "values (default: false,true)")
+    argp.add_argument("--repeat",
+                      type=int,
+                      default=1,
+                      help="Repeat every measurement N times, and report "
+                           "the best time (default: 1)")
+    argp.add_argument("--output", "-o",
+                      type=Path,
+                      help="Write JSON results to the specified file "
+                           "(default: stdout)")
+    argp.add_argument("--keep",
+                      type=Path,
+                      help="Generate the trees in the specified directory, "
+                           "and keep them")
+    argp.add_argument("pytest_args",
+                      nargs="*",
+                      help="Additional arguments to pass to pytest, after "
+                           "\"--\"")
+    args = argp.parse_args()
+
+    if "extension" in args.layouts and find_extension() is None:
+        print("No extension module found to copy, skipping the extension "
+              "layout", file=sys.stderr)
+        args.layouts.remove("extension")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        base = args.keep if args.keep is not None else Path(tempdir)
+        for layout, size in itertools.product(args.layouts, args.sizes):
+            root = base / f"{layout}-{size}"
+            if root.exists():
+                shutil.rmtree(root)
+            root.mkdir(parents=True)
+            generate(root, layout, size)
+            for mode, cnp in itertools.product(
+                    args.import_modes, args.consider_namespace_packages):
+                result = benchmark(root, layout, size, mode, cnp,
+                                   args.pytest_args, args.repeat)
+                print(f"{layout:>10} {size:>7} {mode:>10} cnp={cnp:<5} "
+                      f"{result['items']:>7} items  "
+                      f"collect {result['collect_time']:8.3f}s  "
+                      f"run {result['run_time']:8.3f}s",
+                      file=sys.stderr)
+                results.append(result)
+
+    output = json.dumps({"metadata": metadata(), "results": results},
+                        indent=2)
+    if args.output is not None:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
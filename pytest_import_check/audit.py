@@ -0,0 +1,160 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Recording side effects of imports via audit hooks"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from typing import TYPE_CHECKING
+
+import pytest_import_check.importer
+import pytest_import_check.timing
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+# audit events recorded, and the classes they belong to
+EVENT_CLASSES = {
+    "open": "file",
+    "os.mkdir": "file",
+    "os.remove": "file",
+    "os.rename": "file",
+    "os.rmdir": "file",
+    "os.truncate": "file",
+    "shutil.copyfile": "file",
+    "shutil.rmtree": "file",
+    "os.exec": "subprocess",
+    "os.fork": "subprocess",
+    "os.forkpty": "subprocess",
+    "os.posix_spawn": "subprocess",
+    "os.spawn": "subprocess",
+    "os.startfile": "subprocess",
+    "os.system": "subprocess",
+    "subprocess.Popen": "subprocess",
+    "socket.bind": "network",
+    "socket.connect": "network",
+    "socket.getaddrinfo": "network",
+    "socket.gethostbyaddr": "network",
+    "socket.gethostbyname": "network",
+    "socket.sendto": "network",
+    "urllib.Request": "network",
+}
+# threads are recorded by wrapping threading.Thread.start(), as there
+# is no audit event for starting them before Python 3.13
+EVENT_CLASS_NAMES = ("file", "subprocess", "network", "thread")
+
+_MACHINERY_FILES = frozenset((
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<frozen zipimport>",
+    pytest_import_check.importer.__file__,
+    pytest_import_check.timing.__file__,
+))
+
+
+class AuditRecorder:
+    """Record side effects of the code executed within the context
+
+    Events are attributed to the module whose top-level code was
+    executing, and recorded as ``{module: {event: [class, count,
+    first argument]}}``.  Events raised by the import system itself,
+    e.g. while reading source files, are ignored.  Threads started
+    within the context are recorded as "threading.Thread.start" events.
+    Only events raised in the thread that entered the context are
+    recorded, and not those of unrelated threads running meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self.events: dict[str, dict[str, list]] = {}
+
+    def __enter__(self) -> Self:
+        global _active
+        _install()
+        self.thread = threading.get_ident()
+        self._thread_start = threading.Thread.start
+        recorder = self
+        thread_start = self._thread_start
+
+        def start(thread):
+            module = (_importing_module(sys._getframe(1))
+                      if threading.get_ident() == recorder.thread else None)
+            if module is not None:
+                recorder.add(module, "thread", "threading.Thread.start",
+                             thread.name)
+            return thread_start(thread)
+
+        threading.Thread.start = start
+        _active = self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _active
+        _active = None
+        threading.Thread.start = self._thread_start
+
+    def add(self, module: str, event_class: str, event: str,
+            detail: object) -> None:
+        entry = self.events.setdefault(module, {}).get(event)
+        if entry is None:
+            self.events[module][event] = [event_class, 1, str(detail)[:200]]
+        else:
+            entry[1] += 1
+
+
+_active: AuditRecorder | None = None
+_installed = False
+
+
+def _importing_module(frame) -> str | None:
+    """Return the name of the module whose top-level code is executing
+
+    None is returned if the frame belongs to the import machinery.
+    """
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename in _MACHINERY_FILES:
+            return None
+        if code.co_name == "<module>":
+            return frame.f_globals.get("__name__", "<unknown>")
+        frame = frame.f_back
+    return "<unknown>"
+
+
+def _hook(event: str, args: tuple) -> None:
+    # this is called for every audit event in the process, so return
+    # as early as possible
+    recorder = _active
+    if recorder is None:
+        return
+    event_class = EVENT_CLASSES.get(event)
+    if event_class is None or threading.get_ident() != recorder.thread:
+        return
+    module = _importing_module(sys._getframe(1))
+    if module is None:
+        return
+    recorder.add(module, event_class, event, args[0] if args else "")
+
+
+def _install() -> None:
+    global _installed
+    if not _installed:
+        # audit hooks can not be removed, so it is installed once,
+        # and does nothing while no recorder is active
+        sys.addaudithook(_hook)
+        _installed = True
+
+
+def format_events(events: dict[str, dict[str, list]],
+                  classes: set[str] | None = None) -> list[str]:
+    """Format recorded events, optionally limited to the specified classes"""
+    lines = []
+    for module, module_events in sorted(events.items()):
+        for event, (event_class, count, detail) in sorted(
+                module_events.items()):
+            if classes is None or event_class in classes:
+                lines.append(f"{module}: {event_class}: {event} "
+                             f"x{count} ({detail})")
+    return lines
@@ -0,0 +1,125 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Persistent cache of passing import check results"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import sysconfig
+from collections.abc import Iterable
+from pathlib import Path
+
+CACHE_KEY = "import-check/results"
+
+
+def interpreter_tag() -> str:
+    """Return a string identifying the interpreter and its ABI"""
+    return "/".join((sys.implementation.cache_tag or sys.implementation.name,
+                     sysconfig.get_config_var("SOABI") or "",
+                     sys.version))
+
+
+def _stdlib_dirs() -> tuple[tuple[str, ...], tuple[str, ...]]:
+    paths = sysconfig.get_paths()
+    stdlib = {paths["stdlib"], paths["platstdlib"]}
+    site = {paths["purelib"], paths["platlib"]}
+    return (tuple(os.path.join(x, "") for x in stdlib),
+            tuple(os.path.join(x, "") for x in site))
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Cache of modules that were imported successfully
+
+    Every entry records the module file and the files of all modules
+    that were loaded while importing it, along with their digests.
+    A cached pass is reused if the interpreter, the import options
+    and all of these files are unchanged.  File stats are used to avoid
+    rehashing files that were not modified since they were recorded.
+
+    Files belonging to the standard library are not recorded, since
+    they are covered by the interpreter tag.
+    """
+
+    def __init__(self, cache, key: str, write: bool) -> None:
+        self.cache = cache
+        self.key = key
+        self.write = write
+        self._entries: dict[str, dict] = cache.get(CACHE_KEY, {})
+        self._dirty = False
+        # file -> [mtime_ns, size, digest] or None, verified this session
+        self._files: dict[str, list | None] = {}
+        self._stdlib, self._site = _stdlib_dirs()
+
+    def _stat(self, path: str) -> list | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _current(self, path: str, recorded: list | None = None
+                 ) -> list | None:
+        """Return current [mtime_ns, size, digest] of the file"""
+        if path in self._files:
+            return self._files[path]
+        value = self._stat(path)
+        if value is not None:
+            if recorded is not None and recorded[:2] == value:
+                value = recorded
+            else:
+                try:
+                    value.append(file_digest(path))
+                except OSError:
+                    value = None
+        self._files[path] = value
+        return value
+
+    def lookup(self, path: Path) -> bool:
+        """Return True if there is a valid cached pass for the module"""
+        entry = self._entries.get(str(path))
+        if entry is None or entry["key"] != self.key:
+            return False
+        for file, recorded in entry["files"].items():
+            current = self._current(file, recorded)
+            if current is None or current[2] != recorded[2]:
+                return False
+        return True
+
+    def _is_stdlib(self, file: str) -> bool:
+        return file.startswith(self._stdlib) and not file.startswith(self._site)
+
+    def store(self, path: Path, loaded: Iterable[str]) -> None:
+        """Record a pass for the module, along with the loaded files"""
+        if not self.write:
+            return
+        files = {}
+        for file in (str(path), *loaded):
+            if file in files or self._is_stdlib(file):
+                continue
+            current = self._current(file)
+            if current is None:
+                return
+            files[file] = current
+        self._entries[str(path)] = {"key": self.key, "files": files}
+        self._dirty = True
+
+    def discard(self, path: Path) -> None:
+        """Remove the entry for a module that is not passing anymore"""
+        if self.write and self._entries.pop(str(path), None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        if self._dirty:
+            self.cache.set(CACHE_KEY, self._entries)
+            self._dirty = False
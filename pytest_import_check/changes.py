@@ -0,0 +1,55 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Finding files changed since a previous revision"""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+
+class ChangedFilesError(Exception):
+    """Changed files could not be determined"""
+
+
+def _git(directory: Path, *args: str) -> str:
+    try:
+        return subprocess.run(["git", *args],
+                              cwd=directory,
+                              check=True,
+                              capture_output=True,
+                              encoding="utf-8",
+                              errors="surrogateescape",
+                              ).stdout
+    except FileNotFoundError:
+        raise ChangedFilesError("git executable not found")
+    except subprocess.CalledProcessError as e:
+        raise ChangedFilesError(
+            f"git {' '.join(args)} failed: {e.stderr.strip()}")
+
+
+def git_changed_files(directory: Path, ref: str) -> set[Path]:
+    """Return files changed in the working tree since the git ref
+
+    This includes files that were modified, added or removed, whether
+    they are committed, staged or not, as well as untracked files
+    that are not ignored.
+    """
+    top = Path(_git(directory, "rev-parse", "--show-toplevel").rstrip("\n"))
+    changed = _git(top, "diff", "--name-only", "--no-renames", "-z", ref, "--")
+    untracked = _git(top, "ls-files", "--others", "--exclude-standard",
+                     "--full-name", "-z")
+    return {top / name for name in (changed + untracked).split("\0") if name}
+
+
+def read_changed_files(path: Path, directory: Path) -> set[Path]:
+    """Read the list of changed files, one per line
+
+    Relative paths are relative to `directory`.
+    """
+    try:
+        with open(path) as f:
+            return {directory / line.strip() for line in f if line.strip()}
+    except OSError as e:
+        raise ChangedFilesError(f"unable to read changed files: {e}")
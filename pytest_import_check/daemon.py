@@ -0,0 +1,378 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Long-running daemon reusing warm worker processes across runs"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import hashlib
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest_import_check
+from pytest_import_check.engine import WorkerPool, batched
+from pytest_import_check.importer import SUFFIXES
+from pytest_import_check.runner import CheckOptions, CheckResult
+
+# seconds between scanning files for changes
+POLL_INTERVAL = 1.0
+# seconds of inactivity after which the daemon exits
+IDLE_TIMEOUT = 3600.0
+# seconds to wait for a newly started daemon to accept connections
+START_TIMEOUT = 30.0
+
+
+class DaemonError(Exception):
+    """Failed to communicate with the daemon"""
+
+
+def daemon_options(options: CheckOptions) -> CheckOptions:
+    """Return a copy of options that can be reused across runs
+
+    State collected by a single run, such as the directory index,
+    is removed, since it would get stale.
+    """
+    return dataclasses.replace(options, index=None, root_finder=None,
+                               spec_cache=None, code_cache=None)
+
+
+def daemon_directory() -> str:
+    """Return the private directory holding daemon sockets
+
+    The directory is created if necessary.  If it exists already, it must
+    be owned by the current user and not accessible to other users,
+    so that nobody else can replace the sockets.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        directory = os.path.join(runtime_dir, "pytest-import-check")
+    else:
+        directory = os.path.join(tempfile.gettempdir(),
+                                 f"pytest-import-check-{os.getuid()}")
+    with contextlib.suppress(FileExistsError):
+        os.mkdir(directory, 0o700)
+    st = os.lstat(directory)
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid()
+            or st.st_mode & 0o077):
+        raise DaemonError(f"{directory} is not a directory owned "
+                          f"by the current user with 0700 permissions")
+    return directory
+
+
+def daemon_authkey(directory: str) -> bytes:
+    """Return the key authenticating connections, creating it if necessary"""
+    path = os.path.join(directory, "authkey")
+    with contextlib.suppress(FileNotFoundError), open(path, "rb") as f:
+        return f.read()
+    tmp = f"{path}.{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(os.urandom(32))
+    try:
+        # another process may have created the key in the meantime
+        with contextlib.suppress(FileExistsError):
+            os.link(tmp, path)
+    finally:
+        os.unlink(tmp)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def daemon_address(options: CheckOptions, workers: int) -> str:
+    """Return the socket path of the daemon serving the options"""
+    key = repr((pytest_import_check.__version__,
+                sys.executable,
+                dataclasses.astuple(daemon_options(options)),
+                workers)).encode()
+    return os.path.join(daemon_directory(),
+                        hashlib.sha256(key).hexdigest()[:16] + ".sock")
+
+
+def _stamp(file: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(file)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class DirectoryListings:
+    """Listings of the directories under root, to notice new modules
+
+    Only subdirectories and files with module suffixes are listed.
+    Directories are only listed again when their modification time
+    changes.  ``__pycache__`` and hidden directories are skipped.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = str(root)
+        # directory -> (mtime_ns, entries, subdirectories)
+        self._dirs: dict[str, tuple[int, frozenset[str], list[str]]] = {}
+
+    def update(self) -> bool:
+        """Update the listings, returning True if any of them changed"""
+        changed = False
+        seen = set()
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(directory)
+            old = self._dirs.get(directory)
+            if old is None or old[0] != mtime:
+                entries = set()
+                subdirs = []
+                with contextlib.suppress(OSError), \
+                        os.scandir(directory) as it:
+                    for entry in it:
+                        if (entry.name == "__pycache__"
+                                or entry.name.startswith(".")):
+                            continue
+                        with contextlib.suppress(OSError):
+                            if entry.is_dir():
+                                subdirs.append(entry.path)
+                            elif not entry.name.endswith(SUFFIXES):
+                                continue
+                            entries.add(entry.name)
+                if old is not None and old[1] != entries:
+                    changed = True
+                old = self._dirs[directory] = (mtime, frozenset(entries),
+                                               subdirs)
+            stack.extend(old[2])
+        for directory in self._dirs.keys() - seen:
+            del self._dirs[directory]
+        return changed
+
+
+class Daemon:
+    """Serve import check results, reusing them while files are unchanged
+
+    Passing results are stored along with the modification times
+    of the checked module and the modules loaded while importing it that
+    reside inside the root directory.  A result is reused until one
+    of these files changes, so modules are checked again when they or any
+    of their (transitive) imports change.  All results are discarded when
+    files are added to or removed from the root directory, since they
+    can shadow other modules.  Failures are never reused.  The files are
+    polled in the background, and the affected modules are checked
+    as soon as a change is noticed.
+    """
+
+    def __init__(self, options: CheckOptions, workers: int) -> None:
+        self.options = options
+        self.workers = workers
+        start_method = "spawn"
+        if (options.preload
+                and "forkserver" in multiprocessing.get_all_start_methods()):
+            start_method = "forkserver"
+        self.pool = WorkerPool(options, workers, start_method)
+        # path -> (result, {file: stamp})
+        self.results: dict[Path, tuple[CheckResult, dict]] = {}
+        self.last_request = time.monotonic()
+        self.listings = DirectoryListings(options.root)
+        self.listings.update()
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, path: Path) -> bool:
+        entry = self.results.get(path)
+        return entry is not None and all(
+            _stamp(file) == stamp for file, stamp in entry[1].items())
+
+    def check(self, paths: Iterable[Path]) -> list[CheckResult]:
+        """Return results for the paths, checking them if necessary"""
+        paths = list(paths)
+        with self._lock:
+            if self.listings.update():
+                self.results.clear()
+            stale = [path for path in paths if not self._is_fresh(path)]
+            checked = {}
+            if stale:
+                root = os.path.join(str(self.options.root), "")
+                stamps = {path: _stamp(str(path)) for path in stale}
+                self.pool.submit(batched(stale, self.workers))
+                for path in stale:
+                    result = checked[path] = self.pool.result(path)
+                    if result.error is not None:
+                        self.results.pop(path, None)
+                        continue
+                    files = {str(path): stamps[path]}
+                    files.update((file, _stamp(file))
+                                 for file in result.loaded
+                                 if file.startswith(root))
+                    self.results[path] = (result, files)
+            return [checked[path] if path in checked
+                    else self.results[path][0] for path in paths]
+
+    def watch(self) -> None:
+        """Check modules affected by changes as they are noticed"""
+        while True:
+            time.sleep(POLL_INTERVAL)
+            if time.monotonic() - self.last_request > IDLE_TIMEOUT:
+                self.shutdown()
+            with self._lock:
+                if self.listings.update():
+                    stale = list(self.results)
+                    self.results.clear()
+                else:
+                    stale = [path for path in self.results
+                             if not self._is_fresh(path)]
+            if stale:
+                self.check(stale)
+
+    def serve(self, address: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(address)
+        self.address = address
+        listener = multiprocessing.connection.Listener(
+            address, "AF_UNIX",
+            authkey=daemon_authkey(os.path.dirname(address)))
+        threading.Thread(target=self.watch, daemon=True).start()
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, multiprocessing.AuthenticationError):
+                continue
+            with conn:
+                try:
+                    command, *args = conn.recv()
+                    self.last_request = time.monotonic()
+                    if command == "check":
+                        conn.send(self.check(*args))
+                    elif command == "stop":
+                        conn.send(None)
+                        self.shutdown()
+                except (EOFError, OSError):
+                    pass
+                except Exception:  # noqa: BLE001
+                    traceback.print_exc()
+
+    def shutdown(self) -> None:
+        for path in (self.address, f"{self.address}.log"):
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+        self.pool.close()
+        # the listener thread may be blocked on accept()
+        os._exit(0)
+
+
+def _connect(address: str) -> multiprocessing.connection.Connection | None:
+    try:
+        return multiprocessing.connection.Client(
+            address, "AF_UNIX",
+            authkey=daemon_authkey(os.path.dirname(address)))
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except multiprocessing.AuthenticationError as e:
+        raise DaemonError(f"Daemon authentication failed: {e}")
+
+
+def start_daemon(address: str, options: CheckOptions, workers: int,
+                 ) -> None:
+    """Start a daemon serving the options in the background"""
+    options_path = f"{address}.options"
+    with open(options_path, "wb") as f:
+        pickle.dump(daemon_options(options), f)
+    with open(f"{address}.log", "ab") as log:
+        subprocess.Popen([sys.executable, "-m", __name__, address,
+                          options_path, str(workers)],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                         start_new_session=True)
+
+
+def stop_daemon(address: str) -> bool:
+    """Stop the daemon, returning False if it was not running"""
+    conn = _connect(address)
+    if conn is None:
+        return False
+    with conn:
+        conn.send(("stop",))
+        with contextlib.suppress(EOFError):
+            conn.recv()
+    return True
+
+
+class DaemonClient:
+    """Engine obtaining import check results from the daemon
+
+    The daemon is started if it is not running already.  All submitted
+    modules are sent in a single request, once the first result
+    is needed.
+    """
+
+    def __init__(self, options: CheckOptions, workers: int) -> None:
+        self.options = options
+        self.workers = workers
+        self.address = daemon_address(options, workers)
+        self._paths: list[Path] = []
+        self._results: dict[Path, CheckResult] = {}
+
+    def submit(self, batches: Iterable[list[Path]]) -> None:
+        for batch in batches:
+            self._paths.extend(batch)
+
+    def _request(self) -> None:
+        paths, self._paths = self._paths, []
+        try:
+            results = self._check(paths)
+        except DaemonError as e:
+            # report the failure once, rather than retrying for every path
+            results = [CheckResult(path, error=str(e)) for path in paths]
+        self._results.update(zip(paths, results))
+
+    def _check(self, paths: list[Path]) -> list[CheckResult]:
+        conn = _connect(self.address)
+        if conn is None:
+            start_daemon(self.address, self.options, self.workers)
+            deadline = time.monotonic() + START_TIMEOUT
+            while conn is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+                conn = _connect(self.address)
+            if conn is None:
+                raise DaemonError(f"Daemon did not start, see "
+                                  f"{self.address}.log")
+        try:
+            with conn:
+                conn.send(("check", paths))
+                return conn.recv()
+        except (EOFError, OSError) as e:
+            raise DaemonError(f"Daemon connection failed: {e}")
+
+    def result(self, path: Path) -> CheckResult:
+        if path not in self._results and path in self._paths:
+            self._request()
+        try:
+            return self._results.pop(path)
+        except KeyError:
+            raise KeyError(f"{path} was not submitted for checking")
+
+    def close(self) -> None:
+        self._paths.clear()
+        self._results.clear()
+
+
+def main() -> None:
+    address, options_path, workers = sys.argv[1:]
+    with open(options_path, "rb") as f:
+        options = pickle.load(f)
+    os.unlink(options_path)
+    Daemon(options, int(workers)).serve(address)
+
+
+if __name__ == "__main__":
+    main()
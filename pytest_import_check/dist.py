@@ -0,0 +1,160 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Finding modules installed by distributions"""
+
+from __future__ import annotations
+
+import importlib.metadata
+import importlib.util
+import json
+import os
+import re
+from collections.abc import Iterable
+from pathlib import Path
+
+
+class DistributionNotFoundError(Exception):
+    """Some of the requested distributions are not installed"""
+
+
+def normalize_name(name: str) -> str:
+    """Normalize the distribution name, as specified in PEP 503"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def find_distributions(names: Iterable[str],
+                       ) -> dict[str, importlib.metadata.Distribution]:
+    """Find the installed distributions, scanning sys.path once
+
+    If a distribution is installed multiple times, the one found first
+    on sys.path is used, as it would be imported.  Returns a dict keyed
+    by the normalized names.
+    """
+    wanted = {normalize_name(x) for x in names}
+    found = {}
+    for dist in importlib.metadata.distributions():
+        name = dist.metadata["Name"]
+        if name is None:
+            continue
+        name = normalize_name(name)
+        if name in wanted and name not in found:
+            found[name] = dist
+            if len(found) == len(wanted):
+                break
+    missing = wanted - found.keys()
+    if missing:
+        raise DistributionNotFoundError(
+            f"Distributions not installed: {', '.join(sorted(missing))}")
+    return found
+
+
+def _module_name(parts: tuple[str, ...],
+                 suffixes: tuple[str, ...]) -> str | None:
+    stem = next((parts[-1][:-len(x)] for x in suffixes
+                 if parts[-1].endswith(x)), None)
+    if stem is None:
+        return None
+    parts = parts[:-1] if stem == "__init__" else (*parts[:-1], stem)
+    if not parts or not all(x.isidentifier() for x in parts):
+        return None
+    return ".".join(parts)
+
+
+def _record_files(dist: importlib.metadata.Distribution,
+                  ) -> Iterable[tuple[str, ...]] | None:
+    # SOURCES.txt of egg-info lists paths in the source tree rather
+    # than the installed files
+    if (dist.read_text("RECORD") is None
+            and dist.read_text("installed-files.txt") is None):
+        return None
+    files = dist.files
+    if files is None:
+        return None
+    return (file.parts for file in files if ".." not in file.parts)
+
+
+def _is_editable(dist: importlib.metadata.Distribution) -> bool:
+    try:
+        direct_url = json.loads(dist.read_text("direct_url.json") or "{}")
+        return bool(direct_url.get("dir_info", {}).get("editable"))
+    except (AttributeError, ValueError):
+        return False
+
+
+def _top_level_names(dist: importlib.metadata.Distribution) -> list[str]:
+    names = (dist.read_text("top_level.txt") or "").split()
+    if not names:
+        # guess the package name from the distribution name
+        name = normalize_name(dist.metadata["Name"]).replace("-", "_")
+        if name.isidentifier():
+            names.append(name)
+    return names
+
+
+def _spec_modules(name: str, suffixes: tuple[str, ...]) -> dict[Path, str]:
+    """Find the modules of the top-level package via the import system"""
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return {}
+    if spec is None:
+        return {}
+    if spec.submodule_search_locations is None:
+        if spec.has_location and spec.origin.endswith(suffixes):
+            return {Path(os.path.abspath(spec.origin)): name}
+        return {}
+    modules = {}
+    for location in spec.submodule_search_locations:
+        for directory, dirs, files in os.walk(location):
+            dirs[:] = sorted(x for x in dirs if x.isidentifier())
+            rel = Path(directory).relative_to(location).parts
+            for file in sorted(files):
+                module = _module_name((name, *rel, file), suffixes)
+                if module is not None:
+                    path = os.path.abspath(os.path.join(directory, file))
+                    modules[Path(path)] = module
+    return modules
+
+
+def _top_level_files(dist: importlib.metadata.Distribution,
+                     ) -> Iterable[tuple[str, ...]]:
+    # fallback for distributions that do not list installed files
+    base = Path(dist.locate_file(""))
+    for name in (dist.read_text("top_level.txt") or "").split():
+        top = base / name
+        if not top.is_dir():
+            yield from ((x.name,) for x in base.glob(f"{name}.*"))
+            continue
+        for directory, dirs, files in os.walk(top):
+            dirs[:] = [x for x in dirs if x.isidentifier()]
+            rel = Path(directory).relative_to(base).parts
+            yield from ((*rel, x) for x in files)
+
+
+def distribution_modules(dist: importlib.metadata.Distribution,
+                         suffixes: tuple[str, ...],
+                         ) -> dict[Path, str]:
+    """Return the modules installed by the distribution
+
+    The files are read from the RECORD (or the equivalent) metadata.
+    If it is missing or does not list any modules, the top-level
+    packages listed in the metadata are used instead.  The packages
+    of editable installs are found via the import system, since
+    they are not installed into the distribution's location.  Returns
+    a dict mapping module paths to module names.
+    """
+    modules = {}
+    if _is_editable(dist):
+        for name in _top_level_names(dist):
+            modules.update(_spec_modules(name, suffixes))
+        return modules
+    for files in (_record_files(dist), _top_level_files(dist)):
+        for parts in files or ():
+            name = _module_name(parts, suffixes)
+            if name is not None:
+                path = os.path.abspath(dist.locate_file("/".join(parts)))
+                modules[Path(path)] = name
+        if modules:
+            break
+    return modules
@@ -0,0 +1,293 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Static checks of ELF extension modules that do not load them"""
+
+from __future__ import annotations
+
+import collections
+import functools
+import glob
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+ELF_MAGIC = b"\x7fELF"
+
+_SHT_DYNAMIC = 6
+_SHT_DYNSYM = 11
+_DT_NEEDED = 1
+_DT_RPATH = 15
+_DT_RUNPATH = 29
+_STB_GLOBAL = 1
+_STB_WEAK = 2
+_STB_GNU_UNIQUE = 10
+_STV_INTERNAL = 1
+_STV_HIDDEN = 2
+
+# (header, section header, symbol, dynamic entry) formats for ELFCLASS32
+# and ELFCLASS64
+_FORMATS = {
+    1: ("HHIIIIIHHHHHH", "IIIIIIIIII", "IIIBBH", "iI"),
+    2: ("HHIQQQIHHHHHH", "IIQQQQIIQQ", "IBBHQQ", "qQ"),
+}
+
+# symbols with a leading underscore that are part of the stable ABI,
+# mostly used by the macros in the limited API headers
+STABLE_ABI_PRIVATE = frozenset((
+    "_PyArg_ParseTupleAndKeywords_SizeT",
+    "_PyArg_ParseTuple_SizeT",
+    "_PyArg_Parse_SizeT",
+    "_PyArg_VaParseTupleAndKeywords_SizeT",
+    "_PyArg_VaParse_SizeT",
+    "_PyErr_BadInternalCall",
+    "_PyObject_CallFunction_SizeT",
+    "_PyObject_CallMethod_SizeT",
+    "_PyObject_GC_New",
+    "_PyObject_GC_NewVar",
+    "_PyObject_GC_Resize",
+    "_PyObject_New",
+    "_PyObject_NewVar",
+    "_PyState_AddModule",
+    "_PyThreadState_Init",
+    "_PyThreadState_Prealloc",
+    "_PyWeakref_CallableProxyType",
+    "_PyWeakref_ProxyType",
+    "_PyWeakref_RefType",
+    "_Py_BuildValue_SizeT",
+    "_Py_CheckRecursiveCall",
+    "_Py_DECREF_DecRefTotal",
+    "_Py_Dealloc",
+    "_Py_DecRef",
+    "_Py_EllipsisObject",
+    "_Py_FalseStruct",
+    "_Py_INCREF_IncRefTotal",
+    "_Py_IncRef",
+    "_Py_NegativeRefcount",
+    "_Py_NoneStruct",
+    "_Py_NotImplementedStruct",
+    "_Py_RefTotal",
+    "_Py_SetRefcnt",
+    "_Py_SwappedOp",
+    "_Py_TrueStruct",
+    "_Py_VaBuildValue_SizeT",
+))
+
+
+class ElfInfo(NamedTuple):
+    """Dynamic linking information of an ELF file"""
+
+    # (class, data encoding, machine), libraries need to match it
+    arch: tuple[int, int, int]
+    needed: tuple[str, ...]
+    rpath: tuple[str, ...]
+    runpath: tuple[str, ...]
+    defined: frozenset[str]
+    undefined: frozenset[str]
+
+
+def _parse(data: mmap.mmap, path: str) -> ElfInfo | None:
+    elf_class, elf_data = data[4], data[5]
+    if elf_class not in _FORMATS or elf_data not in (1, 2):
+        return None
+    order = "<" if elf_data == 1 else ">"
+    header_fmt, shdr_fmt, sym_fmt, dyn_fmt = (
+        struct.Struct(order + x) for x in _FORMATS[elf_class])
+    (_, machine, _, _, _, shoff, _, _, _, _, shentsize, shnum,
+     _) = header_fmt.unpack_from(data, 16)
+    sections = [shdr_fmt.unpack_from(data, shoff + i * shentsize)
+                for i in range(shnum)]
+
+    def strings(index):
+        _, _, _, _, offset, size, *_ = sections[index]
+        return data[offset:offset + size]
+
+    def string(table, offset):
+        return table[offset:table.index(b"\0", offset)].decode(
+            errors="surrogateescape")
+
+    needed = []
+    rpath = []
+    runpath = []
+    defined = set()
+    undefined = set()
+    origin = os.path.dirname(path)
+    for _, sh_type, _, _, offset, size, link, _, _, entsize in sections:
+        if sh_type == _SHT_DYNAMIC:
+            table = strings(link)
+            for pos in range(offset, offset + size, dyn_fmt.size):
+                tag, value = dyn_fmt.unpack_from(data, pos)
+                if tag == _DT_NEEDED:
+                    needed.append(string(table, value))
+                elif tag in (_DT_RPATH, _DT_RUNPATH):
+                    dirs = [x.replace("$ORIGIN", origin).replace(
+                                "${ORIGIN}", origin)
+                            for x in string(table, value).split(":") if x]
+                    (rpath if tag == _DT_RPATH else runpath).extend(dirs)
+        elif sh_type == _SHT_DYNSYM:
+            table = strings(link)
+            # skip the null symbol
+            for pos in range(offset + sym_fmt.size, offset + size,
+                             entsize or sym_fmt.size):
+                fields = sym_fmt.unpack_from(data, pos)
+                if elf_class == 2:
+                    name, info, other, shndx, _, _ = fields
+                else:
+                    name, _, _, info, other, shndx = fields
+                bind = info >> 4
+                if not name:
+                    continue
+                if shndx == 0:
+                    # weak undefined symbols may remain unresolved
+                    if bind == _STB_GLOBAL:
+                        undefined.add(string(table, name))
+                elif (bind in (_STB_GLOBAL, _STB_WEAK, _STB_GNU_UNIQUE)
+                        and other & 3 not in (_STV_INTERNAL, _STV_HIDDEN)):
+                    defined.add(string(table, name))
+    return ElfInfo(arch=(elf_class, elf_data, machine),
+                   needed=tuple(needed),
+                   rpath=tuple(rpath),
+                   runpath=tuple(runpath),
+                   defined=frozenset(defined),
+                   undefined=frozenset(undefined))
+
+
+@functools.cache
+def read_elf(path: str) -> ElfInfo | None:
+    """Read the dynamic linking information from an ELF file
+
+    Returns None if the file is not a supported ELF file.  The results
+    are cached, so that the symbol tables of libraries are only read once.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(4) != ELF_MAGIC:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _parse(data, path)
+    except (OSError, ValueError, IndexError, struct.error):
+        return None
+
+
+def _read_ld_so_conf(path: str, seen: set[str]) -> list[str]:
+    dirs = []
+    if path in seen:
+        return dirs
+    seen.add(path)
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return dirs
+    for line in lines:
+        line = line.partition("#")[0].strip()
+        if line.startswith("include "):
+            pattern = line[len("include "):].strip()
+            if not os.path.isabs(pattern):
+                pattern = os.path.join(os.path.dirname(path), pattern)
+            for included in sorted(glob.glob(pattern)):
+                dirs.extend(_read_ld_so_conf(included, seen))
+        elif line:
+            dirs.append(line)
+    return dirs
+
+
+@functools.cache
+def system_library_dirs() -> tuple[str, ...]:
+    """Return the directories searched by the dynamic loader by default"""
+    dirs = [*_read_ld_so_conf("/etc/ld.so.conf", set()),
+            "/lib64", "/usr/lib64", "/lib", "/usr/lib"]
+    return tuple(dict.fromkeys(x for x in dirs if x))
+
+
+def find_library(name: str, info: ElfInfo) -> str | None:
+    """Find the library needed by the ELF file, like the dynamic loader"""
+    if "/" in name:
+        return name if read_elf(name) is not None else None
+    # DT_RPATH is ignored if DT_RUNPATH is present
+    dirs = (*(info.rpath if not info.runpath else ()),
+            *os.environ.get("LD_LIBRARY_PATH", "").split(":"),
+            *info.runpath,
+            *system_library_dirs())
+    for directory in dirs:
+        if not directory:
+            continue
+        candidate = os.path.join(directory, name)
+        lib = read_elf(candidate)
+        if lib is not None and lib.arch == info.arch:
+            return candidate
+    return None
+
+
+def library_closure(info: ElfInfo) -> tuple[set[str], list[str]]:
+    """Find all libraries loaded along with the ELF file
+
+    Returns the symbols they define, and the names of the libraries
+    that could not be found.
+    """
+    symbols: set[str] = set()
+    missing = []
+    seen = set()
+    queue = collections.deque([info])
+    while queue:
+        current = queue.popleft()
+        for name in current.needed:
+            if name in seen:
+                continue
+            seen.add(name)
+            path = find_library(name, current)
+            if path is None:
+                missing.append(name)
+                continue
+            lib = read_elf(path)
+            symbols |= lib.defined
+            queue.append(lib)
+    return symbols, missing
+
+
+@functools.cache
+def interpreter_symbols() -> frozenset[str] | None:
+    """Return the symbols exported by the Python interpreter
+
+    Returns None if they can not be determined, e.g. because
+    the interpreter is not an ELF executable.
+    """
+    info = read_elf(os.path.realpath(sys.executable))
+    if info is None:
+        return None
+    symbols, _ = library_closure(info)
+    symbols |= info.defined
+    # extensions can not be verified if libpython symbols are not
+    # exported
+    if "Py_Initialize" not in symbols:
+        return None
+    return frozenset(symbols)
+
+
+def check_extension(path: Path) -> str | None:
+    """Verify that the libraries and symbols needed by the extension exist
+
+    Returns an error message, or None if the check passed or the file
+    could not be checked.
+    """
+    info = read_elf(str(path))
+    if info is None:
+        return None
+    errors = []
+    provided, missing = library_closure(info)
+    for name in missing:
+        errors.append(f"{path}: library {name!r} not found")
+    interpreter = interpreter_symbols()
+    # if libraries are missing, their symbols are not known either
+    if not missing and interpreter is not None:
+        for name in sorted(info.undefined - provided - interpreter):
+            errors.append(f"{path}: undefined symbol {name!r}")
+    if ".abi3." in path.name:
+        for name in sorted(info.undefined):
+            if name.startswith("_Py") and name not in STABLE_ABI_PRIVATE:
+                errors.append(f"{path}: symbol {name!r} is not part "
+                              f"of the stable ABI")
+    return "\n".join(errors) or None
@@ -0,0 +1,577 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Engines running import checks in parallel"""
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import contextlib
+import importlib._bootstrap
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import IO
+
+from pytest_import_check.importer import (
+    CouldNotResolvePathError,
+    DirectoryIndex,
+    SpecCache,
+    resolve_pkg_root_and_module_name,
+)
+from pytest_import_check.runner import (
+    CheckOptions,
+    CheckResult,
+    apply_options,
+    check_isolated,
+    format_import_error,
+    run_check,
+)
+from pytest_import_check.watchdog import KILL_FACTOR
+
+
+def _worker_main(conn, options: CheckOptions, recycle: bool,
+                 dump_path: str | None) -> None:
+    apply_options(options)
+    with contextlib.ExitStack() as stack:
+        dump_file = (stack.enter_context(open(dump_path, "w"))
+                     if dump_path is not None else None)
+        while True:
+            batch = conn.recv()
+            if batch is None:
+                break
+            for path in batch:
+                if dump_file is not None:
+                    dump_file.seek(0)
+                    dump_file.truncate()
+                conn.send(check_isolated(path, options, dump_file=dump_file))
+            if recycle:
+                break
+
+
+def batched(paths: list[Path], workers: int) -> list[list[Path]]:
+    """Split paths into batches, aiming for a few batches per worker"""
+    size = max(1, min(32, len(paths) // (workers * 4)))
+    return [paths[i:i + size] for i in range(0, len(paths), size)]
+
+
+def package_key(path: Path,
+                consider_namespace_packages: bool,
+                index: DirectoryIndex | None,
+                spec_cache: SpecCache | None,
+                module_names: dict[Path, str] | None = None,
+                ) -> tuple:
+    """Return a key identifying the top-level package of the module"""
+    if module_names is not None and path in module_names:
+        return (None, module_names[path].partition(".")[0])
+    try:
+        pkg_root, module_name = resolve_pkg_root_and_module_name(
+            path, consider_namespace_packages=consider_namespace_packages,
+            index=index, spec_cache=spec_cache)
+    except CouldNotResolvePathError:
+        return (path.parent, None)
+    return (pkg_root, module_name.partition(".")[0])
+
+
+def package_batches(paths: list[Path],
+                    consider_namespace_packages: bool,
+                    index: DirectoryIndex | None = None,
+                    max_size: int = 32,
+                    spec_cache: SpecCache | None = None,
+                    module_names: dict[Path, str] | None = None,
+                    ) -> list[list[Path]]:
+    """Split paths into batches of modules from the same top-level package
+
+    Modules outside packages are grouped by their directory.  Large
+    packages are split into multiple batches of at most `max_size`
+    modules.
+    """
+    groups: dict[tuple, list[Path]] = {}
+    for path in paths:
+        key = package_key(path, consider_namespace_packages, index,
+                          spec_cache, module_names)
+        groups.setdefault(key, []).append(path)
+    return [group[i:i + max_size]
+            for group in groups.values()
+            for i in range(0, len(group), max_size)]
+
+
+class _Worker:
+    def __init__(self, context, options: CheckOptions, recycle: bool) -> None:
+        self.recycle = recycle
+        # file receiving stack dumps of imports that time out
+        self.dump_path = None
+        if options.timeout is not None:
+            fd, self.dump_path = tempfile.mkstemp(prefix="import-check-",
+                                                  suffix=".txt")
+            os.close(fd)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, options, recycle,
+                                             self.dump_path),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        # paths sent to the worker and not reported back yet
+        self.pending: collections.deque[Path] = collections.deque()
+        # when the worker started checking the first pending path
+        self.started = time.monotonic()
+
+    def send(self, batch: list[Path]) -> None:
+        if not self.pending:
+            self.started = time.monotonic()
+        self.pending.extend(batch)
+        self.conn.send(batch)
+
+    def read_dump(self) -> str:
+        if self.dump_path is None:
+            return ""
+        try:
+            with open(self.dump_path, errors="replace") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def discard(self) -> None:
+        """Release the resources of a worker that has exited"""
+        self.conn.close()
+        if self.dump_path is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(self.dump_path)
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.discard()
+
+
+class WorkerPool:
+    """Pool of worker interpreters checking modules in batches
+
+    Batches are sent to workers as they become idle.  Every module
+    is imported with a clean import state, and the results are
+    collected lazily, as the pytest items request them.
+
+    If `start_method` is "forkserver", the modules listed
+    in `options.preload` are imported once into the fork server,
+    and a new worker is forked from it for every batch.  Otherwise,
+    every worker imports them on startup, and is reused for subsequent
+    batches.
+
+    If `options.timeout` is set, workers that do not report back
+    within `KILL_FACTOR` times the timeout are killed, and restarted.
+    """
+
+    def __init__(self,
+                 options: CheckOptions,
+                 workers: int,
+                 start_method: str = "spawn",
+                 ) -> None:
+        self.options = options
+        self.workers = workers
+        self.context = multiprocessing.get_context(start_method)
+        self.recycle = start_method == "forkserver"
+        if self.recycle:
+            self.context.set_forkserver_preload(
+                [__name__, *options.preload])
+        self._queue: collections.deque[list[Path]] = collections.deque()
+        self._results: dict[Path, CheckResult] = {}
+        self._pool: list[_Worker] = []
+
+    def submit(self, batches: Iterable[list[Path]]) -> None:
+        """Queue batches of modules to check"""
+        self._queue.extend(batches)
+        # idle workers left from earlier submissions
+        for worker in self._pool:
+            if not worker.pending and self._queue:
+                worker.send(self._queue.popleft())
+        while len(self._pool) < self.workers and self._queue:
+            worker = _Worker(self.context, self.options, self.recycle)
+            self._pool.append(worker)
+            worker.send(self._queue.popleft())
+
+    def result(self, path: Path) -> CheckResult:
+        """Wait for and return the result for the specified module"""
+        while path not in self._results:
+            busy = {worker.conn: worker for worker in self._pool
+                    if worker.pending}
+            if not busy:
+                raise KeyError(f"{path} was not submitted for checking")
+            timeout = None
+            if self.options.timeout is not None:
+                kill_after = self.options.timeout * KILL_FACTOR
+                timeout = max(0.0, min(worker.started for worker
+                                       in busy.values())
+                              + kill_after - time.monotonic())
+            for conn in multiprocessing.connection.wait(list(busy), timeout):
+                self._receive(busy[conn])
+            if self.options.timeout is not None:
+                self._kill_hung()
+        return self._results.pop(path)
+
+    def _kill_hung(self) -> None:
+        """Kill workers that did not finish an import in time"""
+        deadline = time.monotonic() - self.options.timeout * KILL_FACTOR
+        for worker in list(self._pool):
+            if (not worker.pending or worker.started > deadline
+                    or worker.conn.poll()):
+                continue
+            worker.process.kill()
+            worker.process.join()
+            self._restart(worker,
+                          f"Import timed out after {self.options.timeout}s, "
+                          f"and the worker process was killed.  Stacks at "
+                          f"the time:\n\n{worker.read_dump()}")
+
+    def _receive(self, worker: _Worker) -> None:
+        try:
+            result = worker.conn.recv()
+        except (EOFError, OSError):
+            # the worker died, possibly while sending the result
+            self._restart(worker)
+            return
+        worker.pending.popleft()
+        worker.started = time.monotonic()
+        self._results[result.path] = result
+        if not worker.pending:
+            if worker.recycle:
+                worker.process.join()
+                worker.discard()
+                self._pool.remove(worker)
+                self.submit(())
+            elif self._queue:
+                worker.send(self._queue.popleft())
+
+    def _restart(self, worker: _Worker, error: str | None = None) -> None:
+        """Handle a worker that died, and restart it"""
+        worker.process.join()
+        path = worker.pending.popleft()
+        if error is None:
+            error = (f"Worker process exited with code "
+                     f"{worker.process.exitcode} while importing {path}")
+        self._results[path] = CheckResult(path, error=error)
+        remaining = list(worker.pending)
+        worker.discard()
+        self._pool.remove(worker)
+        if remaining:
+            self._queue.appendleft(remaining)
+        self.submit(())
+
+    def close(self) -> None:
+        for worker in self._pool:
+            worker.close()
+        self._pool.clear()
+
+
+def free_threading() -> bool:
+    """Return whether the interpreter is running without the GIL"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+# raised by the import system when two threads wait for each other's
+# module locks; private, so it may be missing on other implementations
+_DeadlockError = getattr(importlib._bootstrap, "_DeadlockError", None)
+
+
+def _is_deadlock(exc: BaseException) -> bool:
+    return _DeadlockError is not None and isinstance(exc, _DeadlockError)
+
+
+class _ThreadBatch:
+    def __init__(self, paths: list[Path]) -> None:
+        self.paths = paths
+        # the path being checked and when its check started
+        self.running: tuple[Path, float] | None = None
+
+
+class ThreadPool:
+    """Pool of threads checking modules concurrently in-process
+
+    This is meant for free-threaded interpreters, where imports
+    in different threads can run in parallel.  Batches are expected
+    to contain whole packages, and the modules of every batch are
+    imported sequentially, so that concurrent imports do not race
+    to set up the same parent packages.  As with in-process checks,
+    modules are imported into the shared `sys.modules`, and output
+    and warnings are not captured separately.
+
+    Timeouts can only interrupt imports in the main thread, so imports
+    in the pool that time out only get their stacks dumped to `dump_file`.
+    If `options.timeout` is set, imports that do not finish within
+    `KILL_FACTOR` times the timeout are reported as failed, and their
+    threads are abandoned, along with the remaining modules
+    of the batch.  Import lock deadlocks between threads are detected
+    by the import system.  The affected modules are imported again once
+    all threads finished, and the deadlock is reported
+    in `CheckResult.deadlock`.
+    """
+
+    def __init__(self,
+                 options: CheckOptions,
+                 threads: int,
+                 dump_file: IO | int | None = None,
+                 ) -> None:
+        self.options = options
+        self.threads = threads
+        self.dump_file = dump_file
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        # daemon threads, so that imports that hang do not block exiting
+        self._threads = [
+            threading.Thread(target=self._thread_main,
+                             name=f"import-check_{i}",
+                             daemon=True)
+            for i in range(threads)]
+        for thread in self._threads:
+            thread.start()
+        self._futures: dict[Path, tuple[concurrent.futures.Future,
+                                        _ThreadBatch]] = {}
+        self._batches: set[_ThreadBatch] = set()
+
+    def submit(self, batches: Iterable[list[Path]]) -> None:
+        """Queue batches of modules to check"""
+        for paths in batches:
+            batch = _ThreadBatch(paths)
+            self._batches.add(batch)
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            self._queue.put((future, batch))
+            for path in paths:
+                self._futures[path] = (future, batch)
+
+    def _thread_main(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, batch = item
+            if not future.set_running_or_notify_cancel():
+                self._batches.discard(batch)
+                continue
+            try:
+                future.set_result(self._check_batch(batch))
+            except BaseException as e:  # noqa: BLE001
+                future.set_exception(e)
+
+    def _check(self, path: Path) -> CheckResult:
+        result = CheckResult(path)
+        try:
+            run_check(path, self.options, result, dump_file=self.dump_file)
+        except BaseException as e:  # noqa: BLE001
+            if (_is_deadlock(e)
+                    and threading.current_thread()
+                    is not threading.main_thread()):
+                result.deadlock = str(e)
+            else:
+                result.error = format_import_error(e)
+        return result
+
+    def _check_batch(self, batch: _ThreadBatch) -> dict[Path, CheckResult]:
+        results = {}
+        for path in batch.paths:
+            batch.running = (path, time.monotonic())
+            results[path] = self._check(path)
+        batch.running = None
+        self._batches.discard(batch)
+        return results
+
+    def _hung(self) -> list[_ThreadBatch]:
+        """Return the batches whose current import timed out"""
+        deadline = time.monotonic() - self.options.timeout * KILL_FACTOR
+        return [batch for batch in list(self._batches)
+                if (running := batch.running) is not None
+                and running[1] <= deadline]
+
+    def _wait(self,
+              path: Path,
+              future: concurrent.futures.Future,
+              batch: _ThreadBatch,
+              ) -> str | None:
+        """Wait for the batch, returning an error if it timed out"""
+        kill_after = self.options.timeout * KILL_FACTOR
+        while True:
+            running = batch.running
+            timeout = kill_after
+            if running is not None:
+                timeout = max(0.0, running[1] + kill_after - time.monotonic())
+            done, _ = concurrent.futures.wait([future], timeout)
+            if done:
+                return None
+            hung = self._hung()
+            if batch in hung:
+                hung_path = batch.running[0]
+                if hung_path == path:
+                    return (f"Import timed out after {self.options.timeout}s, "
+                            f"and the thread could not be interrupted")
+                return (f"Not checked, as importing {hung_path} in the same "
+                        f"thread timed out")
+            if batch.running is None and len(hung) >= self.threads:
+                return ("Not checked, as all threads are blocked by imports "
+                        "that timed out")
+
+    def result(self, path: Path) -> CheckResult:
+        """Wait for and return the result for the specified module"""
+        future, batch = self._futures.pop(path, (None, None))
+        if future is None:
+            raise KeyError(f"{path} was not submitted for checking")
+        if self.options.timeout is not None:
+            error = self._wait(path, future, batch)
+            if error is not None:
+                return CheckResult(path, error=error)
+        result = future.result()[path]
+        if result.deadlock is not None:
+            # retry once no other imports are running
+            concurrent.futures.wait(
+                {future for future, _ in self._futures.values()},
+                None if self.options.timeout is None
+                else self.options.timeout * KILL_FACTOR)
+            deadlock = result.deadlock
+            result = self._check(path)
+            result.deadlock = deadlock
+        return result
+
+    def close(self) -> None:
+        for future, _ in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        for _ in self._threads:
+            self._queue.put(None)
+        # threads stuck in imports that timed out can not be joined
+        if self.options.timeout is None or not self._hung():
+            for thread in self._threads:
+                thread.join()
+
+
+def interpreters_available() -> bool:
+    """Return whether a pool of isolated sub-interpreters can be used"""
+    return hasattr(concurrent.futures, "InterpreterPoolExecutor")
+
+
+# error raised when importing single-phase init extension modules
+# in an isolated sub-interpreter
+_SUBINTERPRETER_ERROR = "does not support loading in subinterpreters"
+
+
+# options of the checks in a sub-interpreter, set by its initializer
+_interpreter_options: CheckOptions | None = None
+
+
+def _interpreter_init(options: CheckOptions) -> None:
+    global _interpreter_options
+    apply_options(options)
+    _interpreter_options = options
+
+
+def _interpreter_batch(paths: list[Path]) -> list[CheckResult]:
+    assert _interpreter_options is not None
+    return [check_isolated(path, _interpreter_options) for path in paths]
+
+
+class InterpreterPool:
+    """Pool of isolated sub-interpreters checking modules in batches
+
+    Every sub-interpreter has its own GIL and import system state, so
+    the modules are imported in parallel, with a clean state, without
+    starting a process for every worker.  The options are sent to every
+    sub-interpreter once, when it starts.  Modules that fail because
+    they load extension modules not supporting sub-interpreters are
+    checked again in a worker process.
+
+    Sub-interpreters can not be killed, so if `options.timeout` is set,
+    batches that do not finish within `KILL_FACTOR` times the timeout
+    per module are reported as failed, and their sub-interpreters
+    are abandoned.
+    """
+
+    def __init__(self, options: CheckOptions, workers: int) -> None:
+        self.options = options
+        self.workers = workers
+        self._executor = concurrent.futures.InterpreterPoolExecutor(
+            workers, initializer=_interpreter_init, initargs=(options,))
+        self._futures: dict[Path, concurrent.futures.Future] = {}
+        # when the batches were first seen running
+        self._started: dict[concurrent.futures.Future, float] = {}
+        self._batch_sizes: dict[concurrent.futures.Future, int] = {}
+        self._fallback: WorkerPool | None = None
+
+    def submit(self, batches: Iterable[list[Path]]) -> None:
+        """Queue batches of modules to check"""
+        for batch in batches:
+            future = self._executor.submit(_interpreter_batch, batch)
+            self._batch_sizes[future] = len(batch)
+            for path in batch:
+                self._futures[path] = future
+
+    def _hung(self) -> list[concurrent.futures.Future]:
+        """Return the running batches that exceeded their timeout"""
+        now = time.monotonic()
+        for future in self._batch_sizes:
+            if future.running():
+                self._started.setdefault(future, now)
+        kill_after = self.options.timeout * KILL_FACTOR
+        return [future for future, started in self._started.items()
+                if not future.done()
+                and started + kill_after * self._batch_sizes[future] <= now]
+
+    def _wait(self, future: concurrent.futures.Future) -> str | None:
+        """Wait for the batch, returning an error if it timed out"""
+        kill_after = self.options.timeout * KILL_FACTOR
+        while True:
+            hung = self._hung()
+            if future in hung:
+                return (f"Import timed out after {self.options.timeout}s "
+                        f"per module, and the sub-interpreter could not "
+                        f"be interrupted")
+            if not future.running() and len(hung) >= self.workers:
+                return ("Not checked, as all sub-interpreters are blocked "
+                        "by imports that timed out")
+            timeout = kill_after
+            if future in self._started:
+                timeout = max(0.0, self._started[future] - time.monotonic()
+                              + kill_after * self._batch_sizes[future])
+            done, _ = concurrent.futures.wait([future], timeout)
+            if done:
+                return None
+
+    def result(self, path: Path) -> CheckResult:
+        """Wait for and return the result for the specified module"""
+        future = self._futures.pop(path, None)
+        if future is None:
+            raise KeyError(f"{path} was not submitted for checking")
+        if self.options.timeout is not None:
+            error = self._wait(future)
+            if error is not None:
+                return CheckResult(path, error=error)
+        try:
+            results = future.result()
+        except Exception as e:  # noqa: BLE001
+            return CheckResult(path, error=f"Sub-interpreter failed while "
+                                           f"importing {path}: {e}")
+        result = next(x for x in results if x.path == path)
+        if result.error is not None and _SUBINTERPRETER_ERROR in result.error:
+            if self._fallback is None:
+                self._fallback = WorkerPool(self.options, 1)
+            self._fallback.submit([[path]])
+            result = self._fallback.result(path)
+        return result
+
+    def close(self) -> None:
+        # sub-interpreters stuck in imports that timed out can not be joined
+        wait = self.options.timeout is None or not self._hung()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._futures.clear()
+        if self._fallback is not None:
+            self._fallback.close()
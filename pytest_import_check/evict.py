@@ -0,0 +1,118 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Evicting modules imported by earlier checks from sys.modules"""
+
+from __future__ import annotations
+
+import collections
+import gc
+import importlib.machinery
+import sys
+
+from pytest_import_check.memory import current_rss
+
+
+def _is_pure_python(module) -> bool:
+    spec = getattr(module, "__spec__", None)
+    if spec is None:
+        return False
+    if spec.origin is None:
+        # namespace packages
+        return spec.submodule_search_locations is not None
+    return isinstance(spec.loader, (importlib.machinery.SourceFileLoader,
+                                    importlib.machinery.SourcelessFileLoader))
+
+
+def _is_extension(module) -> bool:
+    spec = getattr(module, "__spec__", None)
+    return (spec is not None and isinstance(
+        spec.loader, importlib.machinery.ExtensionFileLoader))
+
+
+class ModuleEvictor:
+    """Remove modules imported by groups of checks when over a watermark
+
+    Checks are grouped by package.  When the group changes, the modules
+    added to `sys.modules` since the group started are attributed to it.
+    If the number of loaded modules exceeds `max_modules`, or the resident
+    set size exceeds `max_memory` bytes, the modules of the least recently
+    checked groups are removed until the process is below both.
+
+    Only pure-Python modules are removed.  Groups that loaded extension
+    modules are never evicted, since extensions can not be unloaded, and
+    the Python modules using them may not support being imported again.
+    Neither are modules from packages that were loaded when the evictor
+    was created, such as pytest itself.
+    """
+
+    def __init__(self, max_modules: int | None, max_memory: int | None,
+                 ) -> None:
+        self.max_modules = max_modules
+        self.max_memory = max_memory
+        self._protected = {name.partition(".")[0] for name in sys.modules}
+        # group -> names of modules added by it, least recent first
+        self._groups: collections.OrderedDict[object, set[str]] = (
+            collections.OrderedDict())
+        self._pinned: set[object] = set()
+        self._current: object = None
+        self._before: set[str] = set(sys.modules)
+        self.evicted = 0
+
+    def enter(self, group: object) -> None:
+        """Start checking a module belonging to the group"""
+        if group == self._current:
+            return
+        self._finish()
+        self._current = group
+        self._before = set(sys.modules)
+
+    def _finish(self) -> None:
+        if self._current is None:
+            return
+        added = set(sys.modules) - self._before
+        modules = self._groups.setdefault(self._current, set())
+        self._groups.move_to_end(self._current)
+        for name in added:
+            if name.partition(".")[0] in self._protected:
+                continue
+            if _is_extension(sys.modules[name]):
+                self._pinned.add(self._current)
+            modules.add(name)
+        self.evict()
+
+    def _over_watermark(self) -> bool:
+        if (self.max_modules is not None
+                and len(sys.modules) > self.max_modules):
+            return True
+        if self.max_memory is not None:
+            rss = current_rss()
+            if rss is not None and rss > self.max_memory:
+                return True
+        return False
+
+    def evict(self) -> None:
+        """Evict groups until below the watermarks"""
+        for group in list(self._groups):
+            if not self._over_watermark():
+                break
+            if group in self._pinned:
+                continue
+            self._evict_modules(self._groups.pop(group))
+            # memory is only freed once the references are collected
+            gc.collect()
+
+    def _evict_modules(self, names: set[str]) -> None:
+        for name in names:
+            module = sys.modules.get(name)
+            if module is not None and not _is_pure_python(module):
+                continue
+            sys.modules.pop(name, None)
+            self.evicted += 1
+            # missing, or blocked via sys.modules[name] = None
+            if module is None:
+                continue
+            parent_name, _, child = name.rpartition(".")
+            parent = sys.modules.get(parent_name)
+            if getattr(parent, "__dict__", {}).get(child) is module:
+                delattr(parent, child)
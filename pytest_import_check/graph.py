@@ -0,0 +1,188 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Import dependency graph of the checked modules"""
+
+from __future__ import annotations
+
+import ast
+import os
+from collections.abc import Iterator
+from importlib.machinery import SOURCE_SUFFIXES
+from pathlib import Path
+
+from pytest_import_check.scan import module_level_imports
+
+
+def _imported_names(node: ast.Import | ast.ImportFrom, name: str,
+                    is_package: bool) -> list[str]:
+    """Return names of all modules that the import statement may import"""
+    if isinstance(node, ast.Import):
+        targets = [alias.name for alias in node.names]
+    else:
+        base = node.module or ""
+        if node.level > 0:
+            parts = name.split(".")
+            if not is_package:
+                parts.pop()
+            if node.level > 1:
+                parts = parts[:-(node.level - 1)]
+            if not parts:
+                return []
+            base = ".".join(filter(None, [*parts, base]))
+        # "from foo import bar" may import either foo or foo.bar
+        targets = [base, *(f"{base}.{alias.name}" for alias in node.names
+                           if alias.name != "*")]
+    names = []
+    for target in targets:
+        # importing a submodule implies importing its parents
+        parts = target.split(".")
+        names.extend(".".join(parts[:i + 1]) for i in range(len(parts)))
+    return names
+
+
+class ImportGraph:
+    """Dependencies between the checked modules
+
+    The graph is built from the import statements that are executed
+    unconditionally while importing the module, without executing it.
+    Modules are identified by their paths, since different files may
+    have the same module name, e.g. top-level modules in different
+    directories in the prepend import mode.  `names` maps module paths
+    to their names, and `paths` names to the lists of paths having them.
+    `imports` maps module paths to the names of all modules they import
+    at the module level, `required` to the names of modules imported
+    unconditionally (see `module_level_imports`), and `dependencies`
+    to the paths of the latter that are checked.
+
+    `stored` are the entries returned by `entries()` in a previous run.
+    Imports found in them are reused for files whose stat did not change.
+    """
+
+    def __init__(self, stored: dict[str, list] | None = None) -> None:
+        self.names: dict[Path, str] = {}
+        self.paths: dict[str, list[Path]] = {}
+        self.imports: dict[Path, set[str]] = {}
+        self.required: dict[Path, set[str]] = {}
+        self.dependencies: dict[Path, set[Path]] = {}
+        self._stored = stored or {}
+        # path -> [mtime_ns, size, name, imports, required]
+        self._entries: dict[str, list] = {}
+
+    def add(self, name: str, path: Path) -> None:
+        if path not in self.names:
+            self.names[path] = name
+            self.paths.setdefault(name, []).append(path)
+
+    def build(self) -> None:
+        """Find the dependencies of all added modules"""
+        for path, name in self.names.items():
+            self.imports[path], self.required[path] = self._find_imports(
+                name, path)
+        for path, required in self.required.items():
+            self.dependencies[path] = {
+                x for name in required for x in self.paths.get(name, ())
+                if x != path}
+
+    def _find_imports(self, name: str, path: Path,
+                      ) -> tuple[set[str], set[str]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return set(), set()
+        key = [st.st_mtime_ns, st.st_size, name]
+        stored = self._stored.get(str(path))
+        if stored is not None and stored[:3] == key:
+            imports, required = set(stored[3]), set(stored[4])
+        else:
+            imports, required = self._parse_imports(name, path)
+        self._entries[str(path)] = [*key, sorted(imports), sorted(required)]
+        return imports, required
+
+    def _parse_imports(self, name: str, path: Path,
+                       ) -> tuple[set[str], set[str]]:
+        if not path.name.endswith(tuple(SOURCE_SUFFIXES)):
+            return set(), set()
+        try:
+            tree = ast.parse(path.read_bytes(), str(path))
+        except (SyntaxError, ValueError, OSError):
+            return set(), set()
+        is_package = path.stem == "__init__"
+        required_nodes = set(module_level_imports(tree, required_only=True))
+        imports = set()
+        required = set()
+        for node in module_level_imports(tree):
+            names = _imported_names(node, name, is_package)
+            imports.update(names)
+            if node in required_nodes:
+                required.update(names)
+        return imports, required
+
+    def entries(self) -> dict[str, list]:
+        """Return entries to be stored for reuse in the next run
+
+        Stored entries of files that were not checked in this run
+        are preserved, as long as the files still exist.
+        """
+        entries = {path: entry for path, entry in self._stored.items()
+                   if path not in self._entries and os.path.exists(path)}
+        entries.update(self._entries)
+        return entries
+
+    def affected(self, changed: set[str]) -> set[Path]:
+        """Return paths of modules affected by changes to modules
+
+        `changed` are the names of the changed modules.  The affected
+        modules are the changed modules, the modules importing them
+        (including modules that are not checked, e.g. removed ones),
+        and all modules that transitively import these.  Unlike
+        `dependencies`, optional imports are considered too.
+        """
+        dependents: dict[str, list[Path]] = {}
+        for path, imports in self.imports.items():
+            for dependency in imports:
+                if (dependency in self.paths
+                        and dependency != self.names[path]):
+                    dependents.setdefault(dependency, []).append(path)
+        stack = [path for path, imports in self.imports.items()
+                 if self.names[path] in changed
+                 or not imports.isdisjoint(changed)]
+        affected = set(stack)
+        while stack:
+            for dependent in dependents.get(self.names[stack.pop()], ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    stack.append(dependent)
+        return affected
+
+    def order(self, paths: list[Path]) -> list[Path]:
+        """Sort module paths so that dependencies come before dependents
+
+        The original order is preserved as far as possible.  Modules
+        in import cycles are ordered as first visited.  Only the specified
+        paths are returned.
+        """
+        wanted = set(paths)
+
+        def children(path: Path) -> Iterator[Path]:
+            return iter(sorted(self.dependencies.get(path, set()) & wanted))
+
+        ordered = []
+        visited = set()
+        for start in paths:
+            if start in visited:
+                continue
+            visited.add(start)
+            # depth-first search, appending modules in post-order
+            stack = [(start, children(start))]
+            while stack:
+                path, it = stack[-1]
+                for child in it:
+                    if child not in visited:
+                        visited.add(child)
+                        stack.append((child, children(child)))
+                        break
+                else:
+                    stack.pop()
+                    ordered.append(path)
+        return ordered
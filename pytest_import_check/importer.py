@@ -10,6 +10,7 @@ from __future__ import annotations
 
 import contextlib
 import importlib
+import importlib.machinery
 import importlib.util
 import itertools
 import os
@@ -19,6 +20,7 @@ from enum import Enum
 from importlib.machinery import ModuleSpec, EXTENSION_SUFFIXES, SOURCE_SUFFIXES
 from pathlib import Path
 from types import ModuleType
+from typing import NamedTuple
 
 
 SUFFIXES = (*EXTENSION_SUFFIXES, *SOURCE_SUFFIXES)
@@ -56,6 +58,9 @@ def import_path(
     mode: str | ImportMode = ImportMode.prepend,
     root: Path,
     consider_namespace_packages: bool,
+    index: DirectoryIndex | None = None,
+    root_finder: IndexedRootFinder | None = None,
+    spec_cache: SpecCache | None = None,
 ) -> ModuleType:
     """
     Import and return a module from the given path, which can be a file (a module) or
@@ -86,6 +91,18 @@ def import_path(
     :param consider_namespace_packages:
         If True, consider namespace packages when resolving module names.
 
+    :param index:
+        If specified, the directory index used to determine package
+        structure instead of checking the filesystem.
+
+    :param root_finder:
+        If specified, package roots are added to the finder instead
+        of ``sys.path`` in `prepend` and `append` modes.  Its `append`
+        attribute must match the mode.
+
+    :param spec_cache:
+        If specified, the cache used to memoize finding module specs.
+
     :raises ImportPathMismatchError:
         If after importing the given `path` and the module `__file__`
         are different. Only raised in `prepend` and `append` modes.
@@ -93,7 +110,7 @@ def import_path(
     path = Path(path)
     mode = ImportMode(mode)
 
-    if not path.exists():
+    if not (path.exists() if index is None else index.exists(path)):
         raise ImportError(path)
 
     if mode is ImportMode.importlib:
@@ -101,7 +118,8 @@ def import_path(
         # without touching sys.path.
         try:
             pkg_root, module_name = resolve_pkg_root_and_module_name(
-                path, consider_namespace_packages=consider_namespace_packages
+                path, consider_namespace_packages=consider_namespace_packages,
+                index=index, spec_cache=spec_cache,
             )
         except CouldNotResolvePathError:
             pass
@@ -111,19 +129,21 @@ def import_path(
                 return sys.modules[module_name]
 
             mod = _import_module_using_spec(
-                module_name, path, pkg_root, insert_modules=False
+                module_name, path, pkg_root, insert_modules=False, index=index,
+                spec_cache=spec_cache,
             )
             if mod is not None:
                 return mod
 
         # Could not import the module with the current sys.path, so we fall back
         # to importing the file as a single module, not being a part of a package.
-        module_name = module_name_from_path(path, root)
+        module_name = module_name_from_path(path, root, index=index)
         with contextlib.suppress(KeyError):
             return sys.modules[module_name]
 
         mod = _import_module_using_spec(
-            module_name, path, path.parent, insert_modules=True
+            module_name, path, path.parent, insert_modules=True, index=index,
+            spec_cache=spec_cache,
         )
         if mod is None:
             raise ImportError(f"Can't find module {module_name} at location {path}")
@@ -131,7 +151,8 @@ def import_path(
 
     try:
         pkg_root, module_name = resolve_pkg_root_and_module_name(
-            path, consider_namespace_packages=consider_namespace_packages
+            path, consider_namespace_packages=consider_namespace_packages,
+            index=index, spec_cache=spec_cache,
         )
     except CouldNotResolvePathError:
         path_without_suffix = strip_suffix(path)
@@ -141,7 +162,11 @@ def import_path(
     # Change sys.path permanently: restoring it at the end of this function would cause surprising
     # problems because of delayed imports: for example, a conftest.py file imported by this function
     # might have local imports, which would fail at runtime if we restored sys.path.
-    if mode is ImportMode.append:
+    if root_finder is not None:
+        assert root_finder.append == (mode is ImportMode.append)
+        root_finder.add(pkg_root)
+        root_finder.install()
+    elif mode is ImportMode.append:
         if str(pkg_root) not in sys.path:
             sys.path.append(str(pkg_root))
     elif mode is ImportMode.prepend:
@@ -150,6 +175,19 @@ def import_path(
     else:
         assert False, f"invalid import mode: {mode}"
 
+    return import_module_name(path, module_name)
+
+
+def import_module_name(path: Path, module_name: str) -> ModuleType:
+    """
+    Import and return a module by its name, and verify that it was loaded
+    from the given path.  `sys.path` is not modified, so the module must
+    already be importable.
+
+    :raises ImportPathMismatchError:
+        If after importing the module its `__file__` and `path` are
+        different.
+    """
     importlib.import_module(module_name)
 
     mod = sys.modules[module_name]
@@ -179,7 +217,13 @@ def import_path(
 
 
 def _import_module_using_spec(
-    module_name: str, module_path: Path, module_location: Path, *, insert_modules: bool
+    module_name: str,
+    module_path: Path,
+    module_location: Path,
+    *,
+    insert_modules: bool,
+    index: DirectoryIndex | None = None,
+    spec_cache: SpecCache | None = None,
 ) -> ModuleType | None:
     """
     Tries to import a module by its canonical name, path to the .py file, and its
@@ -191,12 +235,18 @@ def _import_module_using_spec(
     """
     # Checking with sys.meta_path first in case one of its hooks can import this module,
     # such as our own assertion-rewrite hook.
-    for meta_importer in sys.meta_path:
-        spec = meta_importer.find_spec(module_name, [str(module_location)])
-        if spec_matches_module_path(spec, module_path):
-            break
-    else:
+    key = (module_name, str(module_location), module_path)
+    if spec_cache is not None and spec_cache.is_meta_path_miss(key):
         spec = importlib.util.spec_from_file_location(module_name, str(module_path))
+    else:
+        for meta_importer in sys.meta_path:
+            spec = meta_importer.find_spec(module_name, [str(module_location)])
+            if spec_matches_module_path(spec, module_path):
+                break
+        else:
+            spec = importlib.util.spec_from_file_location(module_name, str(module_path))
+            if spec_cache is not None:
+                spec_cache.add_meta_path_miss(key)
 
     if spec_matches_module_path(spec, module_path):
         assert spec is not None
@@ -214,16 +264,21 @@ def _import_module_using_spec(
                     else module_path.parent
                 )
                 # Consider the parent module path as its __init__.py file, if it has one.
+                has_init = (
+                    (parent_dir / "__init__.py").is_file()
+                    if index is None
+                    else index.has_init(parent_dir)
+                )
                 parent_module_path = (
-                    parent_dir / "__init__.py"
-                    if (parent_dir / "__init__.py").is_file()
-                    else parent_dir
+                    parent_dir / "__init__.py" if has_init else parent_dir
                 )
                 parent_module = _import_module_using_spec(
                     parent_module_name,
                     parent_module_path,
                     parent_dir,
                     insert_modules=insert_modules,
+                    index=index,
+                    spec_cache=spec_cache,
                 )
 
         # Find spec and import this module.
@@ -263,13 +318,17 @@ else:
         return os.path.samefile(f1, f2)
 
 
-def module_name_from_path(path: Path, root: Path) -> str:
+def module_name_from_path(
+    path: Path, root: Path, *, index: DirectoryIndex | None = None
+) -> str:
     """
     Return a dotted module name based on the given path, anchored on root.
 
     For example: path="projects/src/tests/test_foo.py" and root="/projects", the
     resulting module name will be "src.tests.test_foo".
     """
+    if index is not None:
+        return index.module_name_from_path(path, root)
     path = strip_suffix(path)
     try:
         relative_path = path.relative_to(root)
@@ -332,12 +391,16 @@ def insert_missing_modules(modules: dict[str, ModuleType], module_name: str) ->
         module_name = ".".join(module_parts)
 
 
-def resolve_package_path(path: Path) -> Path | None:
+def resolve_package_path(
+    path: Path, *, index: DirectoryIndex | None = None
+) -> Path | None:
     """Return the Python package path by looking for the last
     directory upwards which still contains an __init__.py.
 
     Returns None if it cannot be determined.
     """
+    if index is not None:
+        return index.package_path(path)
     result = None
     for parent in itertools.chain((path,), path.parents):
         if parent.is_dir():
@@ -350,7 +413,11 @@ def resolve_package_path(path: Path) -> Path | None:
 
 
 def resolve_pkg_root_and_module_name(
-    path: Path, *, consider_namespace_packages: bool = False
+    path: Path,
+    *,
+    consider_namespace_packages: bool = False,
+    index: DirectoryIndex | None = None,
+    spec_cache: SpecCache | None = None,
 ) -> tuple[Path, str]:
     """
     Return the path to the directory of the root package that contains the
@@ -373,20 +440,24 @@ def resolve_pkg_root_and_module_name(
     Raises CouldNotResolvePathError if the given path does not belong to a package (missing any __init__.py files).
     """
     pkg_root: Path | None = None
-    pkg_path = resolve_package_path(path)
+    pkg_path = resolve_package_path(path, index=index)
     if pkg_path is not None:
         pkg_root = pkg_path.parent
     if consider_namespace_packages:
         start = pkg_root if pkg_root is not None else path.parent
         for candidate in (start, *start.parents):
-            module_name = compute_module_name(candidate, path)
-            if module_name and is_importable(module_name, path):
+            module_name = compute_module_name(candidate, path, index=index)
+            if module_name and (
+                is_importable(module_name, path)
+                if spec_cache is None
+                else spec_cache.is_importable(module_name, path)
+            ):
                 # Point the pkg_root to the root of the namespace package.
                 pkg_root = candidate
                 break
 
     if pkg_root is not None:
-        module_name = compute_module_name(pkg_root, path)
+        module_name = compute_module_name(pkg_root, path, index=index)
         if module_name:
             return pkg_root, module_name
 
@@ -419,8 +490,12 @@ def is_importable(module_name: str, module_path: Path) -> bool:
         return spec_matches_module_path(spec, module_path)
 
 
-def compute_module_name(root: Path, module_path: Path) -> str | None:
+def compute_module_name(
+    root: Path, module_path: Path, *, index: DirectoryIndex | None = None
+) -> str | None:
     """Compute a module name based on a path and a root anchor."""
+    if index is not None:
+        return index.compute_module_name(root, module_path)
     try:
         path_without_suffix = strip_suffix(module_path)
     except ValueError:
@@ -442,3 +517,273 @@ def compute_module_name(root: Path, module_path: Path) -> str | None:
 class CouldNotResolvePathError(Exception):
     """Custom exception raised by resolve_pkg_root_and_module_name."""
 
+
+
+class _DirectoryInfo(NamedTuple):
+    # names of files and subdirectories
+    files: frozenset[str]
+    dirs: frozenset[str]
+    # the topmost package directory containing this directory
+    pkg_path: Path | None
+
+
+class DirectoryIndex:
+    """Package structure of directories, scanned once using os.scandir().
+
+    Directories are scanned on first use, and the results are reused
+    for the remainder of the session.  This replaces the repeated stat
+    calls done by ``resolve_package_path`` and friends for every module.
+    The index is not updated if directories change.
+    """
+
+    def __init__(self) -> None:
+        self._dirs: dict[Path, _DirectoryInfo] = {}
+        # (directory, root) -> module name parts of the directory
+        self._parts: dict[tuple[Path, Path], tuple[str, ...] | None] = {}
+        self._root_parts: dict[tuple[Path, Path], tuple[str, ...]] = {}
+
+    def _info(self, directory: Path) -> _DirectoryInfo:
+        with contextlib.suppress(KeyError):
+            return self._dirs[directory]
+        files = set()
+        dirs = set()
+        with contextlib.suppress(OSError), os.scandir(directory) as it:
+            for entry in it:
+                with contextlib.suppress(OSError):
+                    if entry.is_dir():
+                        dirs.add(entry.name)
+                    elif entry.is_file():
+                        files.add(entry.name)
+        pkg_path = None
+        if "__init__.py" in files and directory.name.isidentifier():
+            parent = directory.parent
+            if parent != directory:
+                pkg_path = self._info(parent).pkg_path
+            if pkg_path is None:
+                pkg_path = directory
+        info = self._dirs[directory] = _DirectoryInfo(
+            frozenset(files), frozenset(dirs), pkg_path)
+        return info
+
+    def add(self, path: Path) -> None:
+        """Scan the directory containing path, and its parents."""
+        self._info(path.parent)
+
+    def exists(self, path: Path) -> bool:
+        info = self._info(path.parent)
+        return path.name in info.files or path.name in info.dirs
+
+    def has_init(self, directory: Path) -> bool:
+        return "__init__.py" in self._info(directory).files
+
+    def package_path(self, path: Path) -> Path | None:
+        """Equivalent of ``resolve_package_path``."""
+        if path.name in self._info(path.parent).dirs:
+            return self._info(path).pkg_path
+        return self._info(path.parent).pkg_path
+
+    def _relative_parts(self, directory: Path, root: Path) -> tuple[str, ...] | None:
+        key = (directory, root)
+        with contextlib.suppress(KeyError):
+            return self._parts[key]
+        try:
+            parts: tuple[str, ...] | None = directory.relative_to(root).parts
+        except ValueError:
+            parts = None
+        self._parts[key] = parts
+        return parts
+
+    def compute_module_name(self, root: Path, module_path: Path) -> str | None:
+        """Equivalent of ``compute_module_name``."""
+        try:
+            stem = strip_suffix(module_path).name
+        except ValueError:
+            return None
+        if module_path.parent == root.parent and stem == root.name:
+            # the module path without suffix is root itself
+            return None
+        parts = self._relative_parts(module_path.parent, root)
+        if parts is None:
+            return None
+        names = [*parts, stem]
+        if names[-1] == "__init__":
+            names.pop()
+        return ".".join(names)
+
+    def module_name_from_path(self, path: Path, root: Path) -> str:
+        """Equivalent of ``module_name_from_path``."""
+        stem = strip_suffix(path).name
+        if path.parent == root.parent and stem == root.name:
+            # the path without suffix is root itself
+            return ""
+        key = (path.parent, root)
+        try:
+            parts = self._root_parts[key]
+        except KeyError:
+            relative_parts = self._relative_parts(path.parent, root)
+            if relative_parts is None:
+                relative_parts = path.parent.parts[1:]
+            parts = self._root_parts[key] = tuple(
+                x.replace(".", "_") for x in relative_parts)
+        path_parts = (*parts, stem.replace(".", "_"))
+        if len(path_parts) >= 2 and path_parts[-1] == "__init__":
+            path_parts = path_parts[:-1]
+        return ".".join(path_parts)
+
+
+class IndexedRootFinder:
+    """Meta path finder for top-level modules in package roots.
+
+    A replacement for adding package roots to ``sys.path`` in the
+    prepend and append import modes.  The top-level names found
+    in every root are indexed, so that the cost of finding a module does
+    not grow with the number of roots, and imports of modules outside
+    the roots do not have to scan them at all.
+
+    Roots added later take precedence in prepend mode, and roots added
+    earlier in append mode, as if they were inserted into ``sys.path``.
+    """
+
+    def __init__(self, append: bool = False) -> None:
+        self.append = append
+        # root -> priority, higher is searched first
+        self._roots: dict[str, int] = {}
+        # top-level name -> roots containing it
+        self._names: dict[str, set[str]] = {}
+        self._counter = 0
+        # incremented whenever the modules found may change
+        self.generation = 0
+
+    def _scan(self, root: str) -> None:
+        suffixes = tuple(importlib.machinery.all_suffixes())
+        with contextlib.suppress(OSError), os.scandir(root) as it:
+            for entry in it:
+                with contextlib.suppress(OSError):
+                    if entry.is_dir():
+                        name = entry.name
+                    elif entry.name.endswith(suffixes):
+                        name = entry.name.partition(".")[0]
+                    else:
+                        continue
+                if name.isidentifier():
+                    self._names.setdefault(name, set()).add(root)
+
+    def add(self, root: Path) -> None:
+        """Add a package root, equivalently to inserting it into sys.path."""
+        root = str(root)
+        if root in self._roots:
+            if self.append or self._roots[root] == self._counter:
+                return
+        else:
+            self._scan(root)
+        self._counter += 1
+        self._roots[root] = -self._counter if self.append else self._counter
+        self.generation += 1
+
+    def snapshot(self) -> tuple[dict[str, int], int]:
+        """Return the current roots, to be passed to `restore()`."""
+        return dict(self._roots), self._counter
+
+    def restore(self, state: tuple[dict[str, int], int]) -> None:
+        """Revert to the roots returned by an earlier `snapshot()`."""
+        roots, counter = state
+        for root in self._roots.keys() - roots.keys():
+            for names in self._names.values():
+                names.discard(root)
+        self._roots = dict(roots)
+        self._counter = counter
+        self.generation += 1
+
+    def install(self) -> None:
+        """Insert the finder into sys.meta_path, before PathFinder."""
+        if self in sys.meta_path:
+            return
+        try:
+            pos = sys.meta_path.index(importlib.machinery.PathFinder)
+        except ValueError:
+            pos = len(sys.meta_path)
+        sys.meta_path.insert(pos, self)
+
+    def invalidate_caches(self) -> None:
+        self.generation += 1
+        self._names.clear()
+        for root in self._roots:
+            self._scan(root)
+
+    def find_spec(self, name, path, target=None):
+        if path is not None:
+            # submodules are found via their parent packages
+            return None
+        roots = self._names.get(name)
+        if not roots:
+            return None
+        roots = sorted(roots, key=self._roots.__getitem__, reverse=True)
+        if self.append:
+            search_path = [*sys.path, *roots]
+        else:
+            search_path = [*roots, *sys.path]
+        return importlib.machinery.PathFinder.find_spec(name, search_path,
+                                                        target)
+
+
+class SpecCache:
+    """Memoized results of finding module specs.
+
+    Caches the results of ``is_importable`` and of probing
+    ``sys.meta_path`` in ``_import_module_using_spec``, keyed by module
+    name and location.  The cache is cleared whenever ``sys.path``
+    or ``sys.meta_path`` change, or a finder with a ``generation``
+    attribute (such as ``IndexedRootFinder``) increments it.  Finders with a true
+    ``delegates_to_meta_path`` attribute (such as timing wrappers) only
+    pass on results of the remaining finders, and are not considered
+    a change.
+
+    The cache is not pickled, so every process gets a fresh one.
+    """
+
+    def __init__(self) -> None:
+        self._state: tuple | None = None
+        self._importable: dict[tuple[str, Path], bool] = {}
+        # (module name, location, path) not found by any meta_path finder
+        self._meta_path_misses: set[tuple[str, str, Path]] = set()
+
+    def __getstate__(self) -> dict:
+        return {}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()  # type: ignore[misc]
+
+    def _validate(self) -> None:
+        finders = tuple(
+            finder
+            for finder in sys.meta_path
+            if not getattr(finder, "delegates_to_meta_path", False)
+        )
+        state = (
+            tuple(sys.path),
+            finders,
+            tuple(getattr(finder, "generation", None) for finder in finders),
+        )
+        if state != self._state:
+            self._state = state
+            self._importable.clear()
+            self._meta_path_misses.clear()
+
+    def is_importable(self, module_name: str, module_path: Path) -> bool:
+        """Memoized ``is_importable``."""
+        self._validate()
+        key = (module_name, module_path)
+        try:
+            return self._importable[key]
+        except KeyError:
+            value = self._importable[key] = is_importable(module_name, module_path)
+            return value
+
+    def is_meta_path_miss(self, key: tuple[str, str, Path]) -> bool:
+        """Return True if no ``sys.meta_path`` finder found the module."""
+        self._validate()
+        return key in self._meta_path_misses
+
+    def add_meta_path_miss(self, key: tuple[str, str, Path]) -> None:
+        self._validate()
+        self._meta_path_misses.add(key)
@@ -0,0 +1,88 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Measuring memory used by imported modules"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import tracemalloc
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+def current_rss() -> int | None:
+    """Return the resident set size of the process, in bytes
+
+    Returns the peak resident set size on platforms that do not make
+    the current size available, and None if neither is available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes except on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class MemoryTracker:
+    """Measure memory allocated while the context is active
+
+    `allocated` is the net size of memory blocks allocated by Python
+    within the context, as traced by tracemalloc, and `peak` the peak
+    growth.  `rss` is the growth of the resident set size of the process.
+    If tracemalloc was not tracing already, it is started for the duration
+    of the context.
+    """
+
+    def __init__(self) -> None:
+        self.allocated = 0
+        self.peak = 0
+        self.rss: int | None = None
+
+    def __enter__(self) -> Self:
+        self._stop = not tracemalloc.is_tracing()
+        if self._stop:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._start, _ = tracemalloc.get_traced_memory()
+        self._start_rss = current_rss()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        end_rss = current_rss()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stop:
+            tracemalloc.stop()
+        self.allocated = current - self._start
+        self.peak = peak - self._start
+        if end_rss is not None and self._start_rss is not None:
+            self.rss = end_rss - self._start_rss
+
+
+def parse_size(value: str) -> int:
+    """Parse a size in bytes, with an optional K, M or G suffix"""
+    match = re.fullmatch(r"\s*([0-9]*\.?[0-9]+)\s*([KMG]?)(?:I?B)?\s*",
+                         value, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"invalid size: {value!r}")
+    number, suffix = match.groups()
+    return int(float(number) * 1024 ** " KMG".index(suffix.upper() or " "))
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} GiB"
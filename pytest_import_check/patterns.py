@@ -0,0 +1,91 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Matching paths against include and exclude glob patterns"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+_SCRIPT_RE = re.compile(rb"""__name__\s*==\s*["']__main__["']""")
+
+
+def translate(pattern: str) -> str:
+    """Translate a glob pattern into a regular expression
+
+    ``*`` and ``?`` do not match ``/``, while ``**`` matches any number
+    of directories.  Patterns that do not contain ``/`` match the last
+    component of the path, patterns starting with ``/`` are anchored
+    at the root directory and other patterns match at any depth.
+    """
+    pattern = pattern.rstrip("/")
+    if pattern.startswith("/"):
+        prefix = ""
+        pattern = pattern.lstrip("/")
+    else:
+        prefix = "(?:.*/)?"
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            if pattern.startswith("*/", i):
+                out.append("(?:.*/)?")
+                i += 2
+            elif pattern.startswith("*", i):
+                out.append(".*")
+                i += 1
+            else:
+                out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1 if pattern.startswith("!", i)
+                               else i)
+            if end == -1:
+                out.append(re.escape(c))
+                continue
+            chars = pattern[i:end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            out.append(f"[{chars}]")
+            i = end + 1
+        else:
+            out.append(re.escape(c))
+    return prefix + "".join(out)
+
+
+class PathMatcher:
+    """Match relative paths against a list of glob patterns
+
+    All patterns are compiled into a single regular expression.
+    Paths need to be relative to the root directory, and use ``/``
+    as the separator.  A pattern matching a directory matches all paths
+    inside it as well.  An empty matcher is false.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = [x for x in patterns if x]
+        self._re = None
+        if self.patterns:
+            self._re = re.compile(
+                "(?:" + "|".join(f"(?:{translate(x)})"
+                                 for x in self.patterns) + ")(?:/.*)?",
+                re.DOTALL)
+
+    def __bool__(self) -> bool:
+        return self._re is not None
+
+    def match(self, path: str) -> bool:
+        return self._re is not None and self._re.fullmatch(path) is not None
+
+
+def is_script(path) -> bool:
+    """Check whether the file contains an ``if __name__ == "__main__"``"""
+    try:
+        with open(path, "rb") as f:
+            return _SCRIPT_RE.search(f.read()) is not None
+    except OSError:
+        return False
@@ -1,15 +1,94 @@
 # (c) 2024 Michał Górny
 # SPDX-License-Identifier: GPL-2.0-or-later
 
+import builtins
+import collections
 import importlib
+import multiprocessing
+import os
+import socket
+import sys
+import warnings
+from importlib.machinery import SOURCE_SUFFIXES
 from pathlib import Path
 
 import pytest
 
 import pytest_import_check.importer
-from pytest_import_check.importer import (import_path,
-                                          SUFFIXES,
+import pytest_import_check.timing
+import pytest_import_check.watchdog
+from pytest_import_check.audit import EVENT_CLASS_NAMES, format_events
+from pytest_import_check.cache import ResultCache, interpreter_tag
+from pytest_import_check.changes import (ChangedFilesError,
+                                         git_changed_files,
+                                         read_changed_files,
+                                         )
+from pytest_import_check.daemon import (DaemonClient,
+                                        DaemonError,
+                                        daemon_address,
+                                        stop_daemon,
+                                        )
+from pytest_import_check.dist import (DistributionNotFoundError,
+                                      distribution_modules,
+                                      find_distributions,
+                                      )
+from pytest_import_check.engine import (InterpreterPool,
+                                        ThreadPool,
+                                        WorkerPool,
+                                        batched,
+                                        free_threading,
+                                        interpreters_available,
+                                        package_batches,
+                                        package_key,
+                                        )
+from pytest_import_check.evict import ModuleEvictor
+from pytest_import_check.graph import ImportGraph
+from pytest_import_check.importer import (SUFFIXES,
+                                          CouldNotResolvePathError,
+                                          DirectoryIndex,
+                                          ImportMode,
+                                          IndexedRootFinder,
+                                          SpecCache,
+                                          resolve_pkg_root_and_module_name,
                                           )
+from pytest_import_check.memory import format_size, parse_size
+from pytest_import_check.patterns import PathMatcher, is_script
+from pytest_import_check.precompile import CodeCache, precompile
+from pytest_import_check.profile import FORMATS, Profile, write_profiles
+from pytest_import_check.runner import (CheckOptions,
+                                        CheckResult,
+                                        in_package,
+                                        run_check,
+                                        )
+from pytest_import_check.scan import detect_preload
+from pytest_import_check.static import check_file, check_files
+from pytest_import_check.watchdog import ImportTimeoutError
+
+
+engine_key = pytest.StashKey[WorkerPool]()
+cache_key = pytest.StashKey[ResultCache]()
+index_key = pytest.StashKey[DirectoryIndex]()
+self_times_key = pytest.StashKey[dict]()
+static_key = pytest.StashKey[dict]()
+failed_key = pytest.StashKey[dict]()
+changed_key = pytest.StashKey[set]()
+root_finder_key = pytest.StashKey[IndexedRootFinder]()
+spec_cache_key = pytest.StashKey[SpecCache]()
+evictor_key = pytest.StashKey[ModuleEvictor]()
+stderr_fd_key = pytest.StashKey[int]()
+audit_policy_key = pytest.StashKey[dict]()
+code_cache_key = pytest.StashKey[CodeCache]()
+include_key = pytest.StashKey[PathMatcher]()
+exclude_key = pytest.StashKey[PathMatcher]()
+dist_modules_key = pytest.StashKey[dict]()
+static_search_path_key = pytest.StashKey[list]()
+
+GRAPH_CACHE_KEY = "import-check/graph"
+DURATIONS_CACHE_KEY = "import-check/durations"
+
+# ".so" is only used if it is the only extension suffix supported
+COLLECT_SUFFIXES = tuple(x for x in SUFFIXES
+                         if x != ".so" or len(set(SUFFIXES)) == 1)
 
 
 def pytest_addoption(parser):
@@ -18,23 +97,870 @@ def pytest_addoption(parser):
                     action="store_true",
                     help="Check whether all Python modules that can be found "
                          "are importable")
+    group.addoption("--import-check-level",
+                    choices=("full", "syntax"),
+                    help="Check level: \"full\" imports the modules "
+                         "(the default), \"syntax\" only compiles them and "
+                         "verifies that their imports can be found, without "
+                         "executing any code (implies --import-check)")
+    group.addoption("--import-check-workers",
+                    type=int,
+                    default=0,
+                    metavar="N",
+                    help="Check modules in N worker processes, importing "
+                         "every module with a clean import state")
+    group.addoption("--import-check-daemon",
+                    action="store_true",
+                    help="Check modules using a background daemon that keeps "
+                         "worker processes warm between runs, and reuses "
+                         "results while the modules and their imports are "
+                         "unchanged (implies --import-check-workers)")
+    group.addoption("--import-check-daemon-stop",
+                    action="store_true",
+                    help="Stop the daemon started with the same options, "
+                         "and exit")
+    group.addoption("--import-check-interpreters",
+                    type=int,
+                    default=0,
+                    metavar="N",
+                    help="Check modules in N isolated sub-interpreters "
+                         "within the pytest process (Python 3.14+)")
+    group.addoption("--import-check-threads",
+                    type=int,
+                    default=0,
+                    metavar="N",
+                    help="On free-threaded Python builds, check modules "
+                         "of different packages concurrently in N threads. "
+                         "Modules are checked serially on other builds")
+    group.addoption("--import-check-preload",
+                    metavar="MODULE[,MODULE...]|auto",
+                    help="Import the specified modules once in a fork "
+                         "server, and fork a worker for every batch "
+                         "of modules (implies --import-check-workers). "
+                         "\"auto\" selects common third-party imports "
+                         "of the checked modules")
+    group.addoption("--import-check-cache",
+                    choices=("off", "read", "readwrite"),
+                    default="off",
+                    help="Reuse passing results from previous runs if neither "
+                         "the module nor any of the modules loaded while "
+                         "importing it have changed (default: off)")
+    group.addoption("--import-check-durations",
+                    type=int,
+                    metavar="N",
+                    help="Show N slowest module imports (N=0 for all)")
+    group.addoption("--import-check-profile",
+                    metavar="PATH",
+                    type=Path,
+                    help="Write profiles of nested imports to PATH. If PATH "
+                         "is a directory, a separate file is written for "
+                         "every module")
+    group.addoption("--import-check-profile-format",
+                    choices=tuple(FORMATS),
+                    default="speedscope",
+                    help="Import profile format (default: speedscope)")
+    group.addoption("--import-check-memory",
+                    type=int,
+                    metavar="N",
+                    help="Measure memory allocated by imports, and show N "
+                         "modules allocating the most memory (N=0 for all)")
+    group.addoption("--import-check-footprint",
+                    type=int,
+                    metavar="N",
+                    help="Record modules loaded by imports, and show N "
+                         "modules loading the most modules (N=0 for all)")
+    group.addoption("--import-check-precompile",
+                    action="store_true",
+                    help="Compile all modules to bytecode using a process "
+                         "pool before importing them")
+    group.addoption("--import-check-graph",
+                    action="store_true",
+                    help="Check modules in the order of their import "
+                         "dependencies, and report modules importing a failed "
+                         "module as blocked by it, without importing them")
+    group.addoption("--import-check-audit",
+                    action="store_true",
+                    help="Record side effects of imports, such as opening "
+                         "files, starting subprocesses or threads and "
+                         "network access, and summarize them")
+    group.addoption("--import-check-timeout",
+                    type=float,
+                    metavar="SECONDS",
+                    help="Interrupt imports taking longer than SECONDS, "
+                         "overriding import_check_timeout")
+    group.addoption("--import-check-indexed-roots",
+                    action="store_true",
+                    help="In prepend and append import modes, find modules "
+                         "in package roots using an index rather than "
+                         "adding every root to sys.path")
+    group.addoption("--import-check-dist",
+                    metavar="NAME[,NAME...]",
+                    help="Check the modules installed by the specified "
+                         "distributions, as listed in their metadata. "
+                         "The current directory is not collected unless "
+                         "paths are specified explicitly")
+    group.addoption("--import-check-changed-since",
+                    metavar="REF",
+                    help="Check only modules affected by files changed since "
+                         "the specified git ref, i.e. the changed modules "
+                         "and modules importing them")
+    group.addoption("--import-check-changed-files",
+                    metavar="PATH",
+                    type=Path,
+                    help="Check only modules affected by files listed "
+                         "in PATH, one per line")
+    parser.addini("import_check_max_time",
+                  "Fail modules whose import takes longer than the specified "
+                  "number of seconds")
+    parser.addini("import_check_max_memory",
+                  "Fail modules whose import allocates more memory than "
+                  "the specified size (in bytes, with optional K, M or G "
+                  "suffix)")
+    parser.addini("import_check_max_footprint",
+                  "Fail modules whose import loads more than the specified "
+                  "number of other modules")
+    parser.addini("import_check_lazy_modules",
+                  "Modules and packages that must not be loaded by imports "
+                  "of other modules, one per line",
+                  type="linelist")
+    parser.addini("import_check_audit",
+                  "Side effect policies, as \"CLASS = fail|warn\" lines, "
+                  "where CLASS is one of: " + ", ".join(EVENT_CLASS_NAMES)
+                  + " (implies --import-check-audit)",
+                  type="linelist")
+    parser.addini("import_check_timeout",
+                  "Interrupt imports taking longer than the specified "
+                  "number of seconds, and fail the module")
+    parser.addini("import_check_evict_modules",
+                  "Evict modules imported by previously checked packages "
+                  "when more than the specified number of modules are "
+                  "loaded")
+    parser.addini("import_check_evict_memory",
+                  "Evict modules imported by previously checked packages "
+                  "when the process uses more than the specified amount "
+                  "of memory (in bytes, with optional K, M or G suffix)")
+    parser.addini("import_check_blocked",
+                  "How to report modules blocked by a failed import "
+                  "with --import-check-graph: \"fail\" (the default) "
+                  "or \"skip\"",
+                  default="fail")
+    parser.addini("import_check_include",
+                  "Glob patterns of files to check, relative to rootdir, "
+                  "one per line (default: all modules)",
+                  type="linelist")
+    parser.addini("import_check_exclude",
+                  "Glob patterns of files and directories not to check, "
+                  "relative to rootdir, one per line; excluded directories "
+                  "are not collected at all",
+                  type="linelist")
+    parser.addini("import_check_skip_scripts",
+                  "Do not check source files outside packages that contain "
+                  "an 'if __name__ == \"__main__\"' block",
+                  type="bool",
+                  default=False)
 
 
 def pytest_configure(config):
     config.addinivalue_line("markers", "importcheck: Import checking tests")
+    config.stash[index_key] = DirectoryIndex()
+    config.stash[self_times_key] = {}
+    config.stash[spec_cache_key] = SpecCache()
+    config.stash[include_key] = PathMatcher(
+        config.getini("import_check_include"))
+    config.stash[exclude_key] = PathMatcher(
+        config.getini("import_check_exclude"))
+    mode = ImportMode(config.getoption("--import-mode"))
+    if (config.getoption("--import-check-indexed-roots")
+            and mode is not ImportMode.importlib):
+        config.stash[root_finder_key] = IndexedRootFinder(
+            append=mode is ImportMode.append)
+    engines = [name for name, enabled in (
+        ("worker processes",
+         config.getoption("--import-check-workers") > 0
+         or config.getoption("--import-check-preload") is not None
+         or config.getoption("--import-check-daemon")),
+        ("--import-check-interpreters",
+         config.getoption("--import-check-interpreters") > 0),
+        ("--import-check-threads",
+         config.getoption("--import-check-threads") > 0),
+    ) if enabled]
+    if len(engines) > 1:
+        raise pytest.UsageError(
+            f"{' and '.join(engines)} can not be combined")
+    if (config.getoption("--import-check-cache") == "readwrite"
+            and engines not in (["worker processes"],
+                                ["--import-check-interpreters"])):
+        # in-process imports do not record modules imported by earlier
+        # checks as dependencies
+        raise pytest.UsageError(
+            "--import-check-cache=readwrite requires --import-check-workers "
+            "or --import-check-interpreters")
+    if (config.getoption("--import-check-daemon")
+            and not hasattr(socket, "AF_UNIX")):
+        raise pytest.UsageError(
+            "--import-check-daemon requires Unix domain sockets")
+    if (config.getoption("--import-check-interpreters") > 0
+            and not interpreters_available()):
+        raise pytest.UsageError(
+            "--import-check-interpreters requires Python 3.14 or newer")
+    max_time = config.getini("import_check_max_time")
+    if max_time:
+        try:
+            float(max_time)
+        except ValueError:
+            raise pytest.UsageError(
+                f"import_check_max_time: invalid number {max_time!r}")
+    max_memory = config.getini("import_check_max_memory")
+    if max_memory:
+        try:
+            parse_size(max_memory)
+        except ValueError as e:
+            raise pytest.UsageError(f"import_check_max_memory: {e}")
+    max_footprint = config.getini("import_check_max_footprint")
+    if max_footprint:
+        try:
+            int(max_footprint)
+        except ValueError:
+            raise pytest.UsageError(
+                f"import_check_max_footprint: invalid number "
+                f"{max_footprint!r}")
+    policy = config.stash[audit_policy_key] = {}
+    for line in config.getini("import_check_audit"):
+        event_class, sep, action = (x.strip() for x in line.partition("="))
+        if (not sep or event_class not in EVENT_CLASS_NAMES
+                or action not in ("fail", "warn")):
+            raise pytest.UsageError(
+                f"import_check_audit: invalid policy {line!r}")
+        policy[event_class] = action
+    timeout = config.getini("import_check_timeout")
+    if timeout:
+        try:
+            float(timeout)
+        except ValueError:
+            raise pytest.UsageError(
+                f"import_check_timeout: invalid number {timeout!r}")
+    if import_timeout(config) is not None:
+        # stacks of a stuck import are dumped using faulthandler, either
+        # from its own timer or from a separate timer thread, and it needs
+        # the real stderr, as the process may exit while output is captured
+        config.stash[stderr_fd_key] = os.dup(sys.__stderr__.fileno())
+    evict_modules = config.getini("import_check_evict_modules")
+    if evict_modules:
+        try:
+            int(evict_modules)
+        except ValueError:
+            raise pytest.UsageError(
+                f"import_check_evict_modules: invalid number "
+                f"{evict_modules!r}")
+    evict_memory = config.getini("import_check_evict_memory")
+    if evict_memory:
+        try:
+            parse_size(evict_memory)
+        except ValueError as e:
+            raise pytest.UsageError(f"import_check_evict_memory: {e}")
+    blocked = config.getini("import_check_blocked")
+    if blocked not in ("fail", "skip"):
+        raise pytest.UsageError(
+            f"import_check_blocked: invalid value {blocked!r} "
+            f"(expected \"fail\" or \"skip\")")
+    if import_check_level(config) is not None:
+        changed_since = config.getoption("--import-check-changed-since")
+        changed_files = config.getoption("--import-check-changed-files")
+        try:
+            if changed_since is not None:
+                config.stash[changed_key] = git_changed_files(
+                    config.invocation_params.dir, changed_since)
+            if changed_files is not None:
+                config.stash[changed_key] = (
+                    config.stash.get(changed_key, set())
+                    | read_changed_files(changed_files,
+                                         config.invocation_params.dir))
+        except ChangedFilesError as e:
+            raise pytest.UsageError(str(e))
+        dists = config.getoption("--import-check-dist")
+        if dists is not None:
+            try:
+                found = find_distributions(
+                    x.strip() for x in dists.split(",") if x.strip())
+            except DistributionNotFoundError as e:
+                raise pytest.UsageError(str(e))
+            config.stash[dist_modules_key] = {}
+            for name, dist in found.items():
+                modules = distribution_modules(dist, COLLECT_SUFFIXES)
+                if not modules:
+                    raise pytest.UsageError(
+                        f"No modules found in distribution {name}")
+                config.stash[dist_modules_key].update(modules)
+            config.pluginmanager.register(DistributionCollector(config))
+
+
+def pytest_unconfigure(config):
+    stderr_fd = config.stash.get(stderr_fd_key, None)
+    if stderr_fd is not None:
+        os.close(stderr_fd)
+        del config.stash[stderr_fd_key]
+
+
+def import_timeout(config):
+    timeout = config.getoption("--import-check-timeout")
+    if timeout is None and config.getini("import_check_timeout"):
+        timeout = float(config.getini("import_check_timeout"))
+    return timeout
+
+
+def is_xdist_worker(config):
+    return hasattr(config, "workerinput")
+
+
+def pytest_sessionstart(session):
+    config = session.config
+    mode = config.getoption("--import-check-cache")
+    if (mode != "off" and getattr(config, "cache", None) is not None
+            and import_check_level(config) == "full"):
+        options = check_options(config)
+        key = "|".join((interpreter_tag(),
+                        str(options.mode),
+                        str(options.consider_namespace_packages)))
+        write = mode == "readwrite" and not is_xdist_worker(config)
+        cache = config.stash[cache_key] = ResultCache(config.cache, key,
+                                                      write=write)
+        if write:
+            config.pluginmanager.register(CacheRecorder(cache))
+    evict_modules = config.getini("import_check_evict_modules")
+    evict_memory = config.getini("import_check_evict_memory")
+    if evict_modules or evict_memory:
+        config.stash[evictor_key] = ModuleEvictor(
+            int(evict_modules) if evict_modules else None,
+            parse_size(evict_memory) if evict_memory else None)
+    if (getattr(config, "cache", None) is not None
+            and import_check_level(config) == "full"
+            and not is_xdist_worker(config)):
+        config.pluginmanager.register(DurationRecorder(config))
+    profile_path = config.getoption("--import-check-profile")
+    if profile_path is not None and not is_xdist_worker(config):
+        config.pluginmanager.register(ProfileWriter(
+            profile_path, config.getoption("--import-check-profile-format")))
+
+
+class CacheRecorder:
+    """Record results reported by (possibly remote) items in the cache"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def pytest_runtest_logreport(self, report):
+        loaded = getattr(report, "import_check_loaded", None)
+        if loaded is None:
+            return
+        path = Path(report.import_check_path)
+        if report.passed:
+            self.cache.store(path, loaded)
+        else:
+            self.cache.discard(path)
+
+    def pytest_sessionfinish(self):
+        self.cache.save()
+
+
+def duration_key(path, config):
+    """Return the key used to store durations of the module at `path`"""
+    return relative_path(path, config)
+
+
+class DurationRecorder:
+    """Record import times in the cache, to schedule subsequent runs"""
+
+    def __init__(self, config):
+        self.config = config
+        self.durations = {}
+
+    def pytest_runtest_logreport(self, report):
+        path = getattr(report, "import_check_path", None)
+        wall = dict(report.user_properties).get("import_check_wall")
+        if path is not None and wall is not None:
+            self.durations[duration_key(path, self.config)] = wall
+
+    def pytest_sessionfinish(self):
+        if self.durations:
+            durations = self.config.cache.get(DURATIONS_CACHE_KEY, {})
+            durations.update(self.durations)
+            self.config.cache.set(DURATIONS_CACHE_KEY, durations)
+
+
+def installed_nodeid(path, name):
+    """Return the node id of an installed module, relative to its root"""
+    depth = name.count(".") + path.name.startswith("__init__.")
+    return Path(os.path.relpath(path, path.parents[depth])).as_posix()
+
+
+class DistributionCollector:
+    """Add items for modules installed by distributions
+
+    The items are created directly from distribution metadata, with
+    their module names known, rather than by walking the filesystem.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collection_modifyitems(self, session, items):
+        collected = {item.path for item in items
+                     if isinstance(item, ImportCheckItem)}
+        for path, name in self.config.stash[dist_modules_key].items():
+            if path in collected:
+                continue
+            node = ImportCheckFile.from_parent(
+                session, path=path, nodeid=installed_nodeid(path, name))
+            item, = node.collect()
+            item.module_name = name
+            items.append(item)
+
+
+class ProfileWriter:
+    """Collect import profiles from reports and write them"""
+
+    def __init__(self, path, format):
+        self.path = path
+        self.format = format
+        self.profiles = []
+
+    def pytest_runtest_logreport(self, report):
+        profile = getattr(report, "import_check_profile", None)
+        if profile is not None:
+            self.profiles.append(Profile(report.nodeid, *profile))
+
+    def pytest_sessionfinish(self):
+        if self.profiles:
+            write_profiles(self.path, self.profiles, self.format)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = yield
+    if (isinstance(item, ImportCheckItem) and call.when == "call"
+            and item.result is not None):
+        report.import_check_path = str(item.path)
+        report.import_check_loaded = item.result.loaded
+        if item.result.profile is not None:
+            report.import_check_profile = [item.result.wall,
+                                           item.result.profile]
+    return report
+
+
+def import_check_level(config):
+    """Return the requested check level, or None if checks are disabled"""
+    if config.option.import_check_level is not None:
+        return config.option.import_check_level
+    if config.option.import_check:
+        return "full"
+    return None
+
+
+def relative_path(path, config):
+    """Return the path relative to rootdir, using "/" as the separator"""
+    return Path(os.path.relpath(path, config.rootpath)).as_posix()
+
+
+def pytest_ignore_collect(collection_path, config):
+    # with --import-check-dist, only collect the paths passed explicitly
+    if (dist_modules_key in config.stash
+            and config.args_source is not pytest.Config.ArgsSource.ARGS):
+        return True
+    # prune excluded directories, so that they are not walked at all,
+    # unless they may contain regular tests
+    if (config.stash[exclude_key]
+            and not config.pluginmanager.has_plugin("python")
+            and import_check_level(config) is not None
+            and config.stash[exclude_key].match(
+                relative_path(collection_path, config))
+            and collection_path.is_dir()):
+        return True
+    return None
 
 
 def pytest_collect_file(file_path, parent):
-    if not parent.config.option.import_check:
+    if not file_path.name.endswith(COLLECT_SUFFIXES):
+        return None
+    config = parent.config
+    if import_check_level(config) is None:
         return None
-    suffixes = set(SUFFIXES)
-    if len(suffixes) > 1:
-        suffixes.discard(".so")
-    if not file_path.name.endswith(tuple(suffixes)):
+    if config.stash[include_key] or config.stash[exclude_key]:
+        path = relative_path(file_path, config)
+        if (config.stash[include_key]
+                and not config.stash[include_key].match(path)):
+            return None
+        if config.stash[exclude_key].match(path):
+            return None
+    index = config.stash[index_key]
+    index.add(file_path)
+    if (config.getini("import_check_skip_scripts")
+            and not index.has_init(file_path.parent)
+            and file_path.name.endswith(tuple(SOURCE_SUFFIXES))
+            and is_script(file_path)):
         return None
     return ImportCheckFile.from_parent(parent=parent, path=file_path)
 
 
+def module_name(path, config):
+    name = config.stash.get(dist_modules_key, {}).get(path)
+    if name is not None:
+        return name
+    try:
+        _, name = resolve_pkg_root_and_module_name(
+            path,
+            consider_namespace_packages=config.getini(
+                "consider_namespace_packages"),
+            index=config.stash[index_key],
+            spec_cache=config.stash[spec_cache_key])
+    except CouldNotResolvePathError:
+        name = path.name.partition(".")[0]
+    return name
+
+
+def build_graph(config, items):
+    cache = getattr(config, "cache", None)
+    graph = ImportGraph(cache.get(GRAPH_CACHE_KEY, None)
+                        if cache is not None else None)
+    for item in items:
+        if isinstance(item, ImportCheckItem):
+            item.module_name = module_name(item.path, config)
+            graph.add(item.module_name, item.path)
+    graph.build()
+    if cache is not None and not is_xdist_worker(config):
+        cache.set(GRAPH_CACHE_KEY, graph.entries())
+    return graph
+
+
+def deselect_unchanged(config, items, graph):
+    suffixes = tuple(SUFFIXES)
+    changed = {module_name(path, config)
+               for path in config.stash[changed_key]
+               if path.name.endswith(suffixes)}
+    affected = graph.affected(changed)
+    selected = []
+    deselected = []
+    for item in items:
+        if (isinstance(item, ImportCheckItem)
+                and item.path not in affected):
+            deselected.append(item)
+        else:
+            selected.append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def schedule_xdist(config, items):
+    """Order packages longest-first, using durations from previous runs
+
+    This lets pytest-xdist start the slowest packages first, rather than
+    leaving one worker running them at the end.  The modules of every
+    package keep their relative order.
+    """
+    cache = getattr(config, "cache", None)
+    durations = cache.get(DURATIONS_CACHE_KEY, {}) if cache else {}
+    if not durations:
+        return
+    positions = [i for i, item in enumerate(items)
+                 if isinstance(item, ImportCheckItem)]
+    totals = collections.Counter()
+    for i in positions:
+        totals[items[i].xdist_group] += durations.get(
+            duration_key(items[i].path, config), 0.0)
+    ordered = sorted((items[i] for i in positions),
+                     key=lambda item: -totals[item.xdist_group])
+    for i, item in zip(positions, ordered):
+        items[i] = item
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    ordered = config.getoption("--import-check-graph")
+    if is_xdist_worker(config) and not ordered:
+        schedule_xdist(config, items)
+    if not ordered and changed_key not in config.stash:
+        return
+    graph = build_graph(config, items)
+    if changed_key in config.stash:
+        deselect_unchanged(config, items, graph)
+    if not ordered:
+        return
+    positions = [i for i, item in enumerate(items)
+                 if isinstance(item, ImportCheckItem)]
+    by_path = {}
+    for i in positions:
+        by_path.setdefault(items[i].path, []).append(items[i])
+    ordered = graph.order(list(by_path))
+    reordered = [item for path in ordered for item in by_path[path]]
+    for i, item in zip(positions, reordered):
+        items[i] = item
+        item.dependencies = graph.dependencies[item.path]
+    config.stash[failed_key] = {}
+
+
+def check_options(config):
+    return CheckOptions(
+        mode=config.getoption("--import-mode"),
+        root=config.rootpath,
+        consider_namespace_packages=config.getini(
+            "consider_namespace_packages"),
+        index=config.stash[index_key],
+        root_finder=config.stash.get(root_finder_key, None),
+        spec_cache=config.stash[spec_cache_key],
+        code_cache=(config.stash[code_cache_key].code
+                    if code_cache_key in config.stash else None),
+        module_names=config.stash.get(dist_modules_key, None),
+        timeout=import_timeout(config),
+        audit=(config.getoption("--import-check-audit")
+               or bool(config.stash[audit_policy_key])),
+        footprint=(config.getoption("--import-check-footprint") is not None
+                   or bool(config.getini("import_check_max_footprint"))
+                   or bool(config.getini("import_check_lazy_modules"))),
+        timing=config.getoption("--import-check-durations") is not None,
+        profile=config.getoption("--import-check-profile") is not None,
+        memory=(config.getoption("--import-check-memory") is not None
+                or bool(config.getini("import_check_max_memory"))),
+    )
+
+
+def static_search_path(session):
+    """Return package roots of all collected modules
+
+    The roots are found once per session, and kept in the stash.
+    """
+    search_path = session.config.stash.get(static_search_path_key, None)
+    if search_path is not None:
+        return search_path
+    index = session.config.stash[index_key]
+    roots = {}
+    for item in session.items:
+        if not isinstance(item, ImportCheckItem):
+            continue
+        try:
+            pkg_root, _ = resolve_pkg_root_and_module_name(item.path,
+                                                           index=index)
+        except CouldNotResolvePathError:
+            pkg_root = item.path.parent
+        roots[str(pkg_root)] = None
+    search_path = session.config.stash[static_search_path_key] = list(roots)
+    return search_path
+
+
+def run_static_checks(session):
+    config = session.config
+    paths = [item.path for item in session.items
+             if isinstance(item, ImportCheckItem)]
+    workers = (config.getoption("--import-check-workers")
+               or os.cpu_count() or 1)
+    config.stash[static_key] = check_files(paths, static_search_path(session),
+                                           workers)
+
+
+def worker_options(config, paths):
+    """Return options for checking the paths in worker processes"""
+    options = check_options(config)
+    options.sys_path = list(sys.path)
+    preload = config.getoption("--import-check-preload")
+    if preload == "auto":
+        options.preload = detect_preload(paths, config.rootpath)
+    elif preload is not None:
+        options.preload = [x.strip() for x in preload.split(",")
+                           if x.strip()]
+    return options
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtestloop(session):
+    config = session.config
+    workers = config.getoption("--import-check-workers")
+    threads = config.getoption("--import-check-threads")
+    interpreters = config.getoption("--import-check-interpreters")
+    preload = config.getoption("--import-check-preload")
+    daemon = (config.getoption("--import-check-daemon")
+              or config.getoption("--import-check-daemon-stop"))
+    if (preload is not None or daemon) and workers == 0:
+        workers = os.cpu_count() or 1
+    if config.getoption("--import-check-daemon-stop"):
+        paths = [item.path for item in session.items
+                 if isinstance(item, ImportCheckItem)]
+        try:
+            address = daemon_address(worker_options(config, paths), workers)
+            stopped = stop_daemon(address)
+        except DaemonError as e:
+            raise pytest.UsageError(str(e))
+        if stopped:
+            pytest.exit("import-check daemon stopped", returncode=0)
+        pytest.exit("import-check daemon was not running", returncode=0)
+    if import_check_level(config) == "syntax":
+        # xdist workers check their items one by one
+        if not config.option.collectonly and not is_xdist_worker(config):
+            run_static_checks(session)
+    elif not config.option.collectonly:
+        cache = config.stash.get(cache_key, None)
+        paths = [item.path for item in session.items
+                 if isinstance(item, ImportCheckItem)
+                 and (cache is None or not cache.lookup(item.path))]
+        if (paths and config.getoption("--import-check-precompile")
+                and not is_xdist_worker(config)):
+            code = precompile(paths, workers or os.cpu_count() or 1)
+            if code:
+                config.stash[code_cache_key] = CodeCache(code)
+                if workers == 0:
+                    config.stash[code_cache_key].install()
+        if paths and workers > 0:
+            options = worker_options(config, paths)
+            if daemon:
+                try:
+                    engine = DaemonClient(options, workers)
+                except DaemonError as e:
+                    raise pytest.UsageError(str(e))
+                batches = [paths]
+            elif preload is None:
+                engine = WorkerPool(options, workers)
+                batches = batched(paths, workers)
+            else:
+                start_method = "spawn"
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    start_method = "forkserver"
+                engine = WorkerPool(options, workers, start_method)
+                batches = package_batches(paths,
+                                          options.consider_namespace_packages,
+                                          options.index,
+                                          spec_cache=options.spec_cache,
+                                          module_names=options.module_names)
+            config.stash[engine_key] = engine
+            engine.submit(batches)
+        elif paths and interpreters > 0:
+            options = check_options(config)
+            options.sys_path = list(sys.path)
+            engine = InterpreterPool(options, interpreters)
+            config.stash[engine_key] = engine
+            engine.submit(batched(paths, interpreters))
+        elif paths and threads > 0 and free_threading():
+            options = check_options(config)
+            # these measurements are process-wide
+            if not (options.memory or options.audit or options.footprint):
+                engine = ThreadPool(
+                    options, threads,
+                    dump_file=config.stash.get(stderr_fd_key, None))
+                config.stash[engine_key] = engine
+                engine.submit(package_batches(
+                    paths, options.consider_namespace_packages,
+                    options.index, max_size=len(paths),
+                    spec_cache=options.spec_cache,
+                    module_names=options.module_names))
+    try:
+        return (yield)
+    finally:
+        engine = config.stash.get(engine_key, None)
+        if engine is not None:
+            engine.close()
+            del config.stash[engine_key]
+        code_cache = config.stash.get(code_cache_key, None)
+        if code_cache is not None:
+            code_cache.uninstall()
+            del config.stash[code_cache_key]
+
+
+def summary_properties(terminalreporter, count, key, *keys):
+    """Return (values..., nodeid) for the top `count` reports by `key`"""
+    values = []
+    for reports in terminalreporter.stats.values():
+        for report in reports:
+            if getattr(report, "when", None) != "call":
+                continue
+            props = dict(report.user_properties)
+            if key in props:
+                values.append((props[key],
+                               *(props.get(x) for x in keys),
+                               report.nodeid))
+    values.sort(key=lambda x: x[0], reverse=True)
+    if count > 0:
+        values = values[:count]
+    return values
+
+
+def summarize_modules(modules, limit=10):
+    """Summarize module names as top-level packages with module counts"""
+    counts = collections.Counter(x.partition(".")[0] for x in modules)
+    packages = [f"{name} ({count})"
+                for name, count in counts.most_common(limit)]
+    if len(counts) > limit:
+        packages.append(f"and {len(counts) - limit} more")
+    return ", ".join(packages)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    durations = config.getoption("--import-check-durations")
+    if durations is not None:
+        terminalreporter.write_sep(
+            "=", f"slowest {durations} module imports" if durations > 0
+            else "slowest module imports")
+        for wall, self_time, cpu, nodeid in summary_properties(
+                terminalreporter, durations, "import_check_wall",
+                "import_check_self", "import_check_cpu"):
+            terminalreporter.write_line(
+                f"{wall:.3f}s total {self_time:.3f}s own {cpu:.3f}s cpu   "
+                f"{nodeid}")
+
+    memory = config.getoption("--import-check-memory")
+    if memory is not None:
+        terminalreporter.write_sep(
+            "=", f"top {memory} module imports by memory" if memory > 0
+            else "module imports by memory")
+        for allocated, peak, rss, nodeid in summary_properties(
+                terminalreporter, memory, "import_check_memory",
+                "import_check_memory_peak", "import_check_rss"):
+            rss = format_size(rss) if rss is not None else "?"
+            terminalreporter.write_line(
+                f"{format_size(allocated)} allocated "
+                f"{format_size(peak)} peak {rss} rss   {nodeid}")
+
+    footprint = config.getoption("--import-check-footprint")
+    if footprint is not None:
+        terminalreporter.write_sep(
+            "=", f"top {footprint} module imports by footprint"
+            if footprint > 0 else "module imports by footprint")
+        for count, size, modules, nodeid in summary_properties(
+                terminalreporter, footprint, "import_check_footprint",
+                "import_check_footprint_size",
+                "import_check_footprint_modules"):
+            terminalreporter.write_line(
+                f"{count} modules {format_size(size)}   {nodeid}")
+            if modules:
+                terminalreporter.write_line(
+                    f"    {summarize_modules(modules)}")
+
+    if config.getoption("--import-check-audit"):
+        terminalreporter.write_sep("=", "import side effects")
+        audited = []
+        for reports in terminalreporter.stats.values():
+            for report in reports:
+                if getattr(report, "when", None) != "call":
+                    continue
+                events = dict(report.user_properties).get(
+                    "import_check_audit")
+                if events:
+                    audited.append((report.nodeid, events))
+        for nodeid, events in sorted(audited):
+            terminalreporter.write_line(nodeid)
+            for line in format_events(events):
+                terminalreporter.write_line(f"    {line}")
+
+
+class ImportCheckError(Exception):
+    """Import failure reported by a worker process"""
+
+
+class ImportSideEffectWarning(UserWarning):
+    """Side effect of an import disallowed by import_check_audit"""
+
+
+class ImportDeadlockWarning(UserWarning):
+    """Import lock deadlock between modules imported concurrently"""
+
+
 class ImportCheckFile(pytest.File):
     def collect(self):
         return [ImportCheckItem.from_parent(self, name="import-check")]
@@ -44,22 +970,201 @@ class ImportCheckItem(pytest.Item):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.add_marker("importcheck")
+        self.result = None
+        self.module_name = None
+        self.dependencies = set()
+        self.xdist_group = None
+        if is_xdist_worker(self.config):
+            # keep the modules of every package on the same worker
+            # with --dist=loadgroup
+            self.xdist_group = module_name(self.path,
+                                           self.config).partition(".")[0]
+            self.add_marker(pytest.mark.xdist_group(self.xdist_group))
 
     def runtest(self):
-        import_path(self.fspath,
-                    mode=self.config.getoption("--import-mode"),
-                    root=self.config.rootpath,
-                    consider_namespace_packages=
-                        self.config.getini("consider_namespace_packages"))
+        failed = self.config.stash.get(failed_key, None)
+        if failed is None:
+            self.check()
+            return
+
+        blocker = next((failed[x] for x in sorted(self.dependencies)
+                        if x in failed), None)
+        if blocker is not None:
+            failed[self.path] = blocker
+            if self.config.getini("import_check_blocked") == "skip":
+                pytest.skip(f"blocked by {blocker}")
+            pytest.fail(f"blocked by {blocker}", pytrace=False)
+        try:
+            self.check()
+        except (Exception, ImportTimeoutError):
+            failed[self.path] = self.module_name
+            raise
+
+    def check(self):
+        if import_check_level(self.config) == "syntax":
+            self.run_static()
+            return
+
+        cache = self.config.stash.get(cache_key, None)
+        if cache is not None and cache.lookup(self.path):
+            self.user_properties.append(("import_check_cache", "hit"))
+            return
+
+        engine = self.config.stash.get(engine_key, None)
+        if engine is None:
+            options = check_options(self.config)
+            evictor = self.config.stash.get(evictor_key, None)
+            if evictor is not None:
+                evictor.enter(package_key(self.path,
+                                          options.consider_namespace_packages,
+                                          options.index,
+                                          options.spec_cache,
+                                          options.module_names))
+            self.result = CheckResult(self.path)
+            try:
+                run_check(self.path, options, self.result,
+                          dump_file=self.config.stash.get(stderr_fd_key, None),
+                          exit=True)
+            finally:
+                self.record_properties()
+        else:
+            self.run_remote(engine)
+
+        max_time = self.config.getini("import_check_max_time")
+        # tracemalloc distorts import times
+        if (max_time and self.result.memory is None
+                and self.result.wall > float(max_time)):
+            pytest.fail(f"Importing took {self.result.wall:.3f}s, longer "
+                        f"than import_check_max_time = {max_time}s",
+                        pytrace=False)
+        max_memory = self.config.getini("import_check_max_memory")
+        if (max_memory and self.result.memory is not None
+                and self.result.memory > parse_size(max_memory)):
+            pytest.fail(f"Importing allocated "
+                        f"{format_size(self.result.memory)}, more than "
+                        f"import_check_max_memory = {max_memory}",
+                        pytrace=False)
+        self.check_footprint()
+        self.check_audit()
+
+    def run_static(self):
+        results = self.config.stash.get(static_key, None)
+        if results is not None and self.path in results:
+            error = results[self.path]
+        else:
+            error = check_file(self.path, static_search_path(self.session))
+        if error is not None:
+            raise ImportCheckError(error)
+
+    def check_footprint(self):
+        """Apply footprint limits to the modules loaded by the import"""
+        if self.result.footprint is None:
+            return
+        footprint = self.result.footprint
+        own = module_name(self.path, self.config)
+        lazy_modules = self.config.getini("import_check_lazy_modules")
+        # packages may load their own submodules eagerly
+        lazy = [x for x in footprint
+                if any(in_package(x, y) for y in lazy_modules)
+                and not in_package(x, own.partition(".")[0])]
+        if lazy:
+            pytest.fail("Importing loaded modules listed in "
+                        "import_check_lazy_modules: " + ", ".join(lazy),
+                        pytrace=False)
+        max_footprint = self.config.getini("import_check_max_footprint")
+        if max_footprint and len(footprint) > int(max_footprint):
+            pytest.fail(f"Importing loaded {len(footprint)} modules, more "
+                        f"than import_check_max_footprint = {max_footprint}: "
+                        + summarize_modules(footprint),
+                        pytrace=False)
+
+    def check_audit(self):
+        """Apply import_check_audit policies to recorded side effects"""
+        if self.result.audit is None:
+            return
+        policy = self.config.stash[audit_policy_key]
+        for action in ("warn", "fail"):
+            classes = {x for x, y in policy.items() if y == action}
+            lines = format_events(self.result.audit, classes)
+            if not lines:
+                continue
+            message = "Side effects at import:\n" + "\n".join(lines)
+            if action == "fail":
+                pytest.fail(message, pytrace=False)
+            warnings.warn(ImportSideEffectWarning(message))
+
+    def record_properties(self):
+        """Add import timings and other measurements to user properties
+
+        Import times are not recorded if memory was traced, since tracing
+        slows the import down.
+        """
+        if self.result.memory is None:
+            self_times = self.config.stash[self_times_key]
+            self_times.update(self.result.self_times)
+            self.user_properties.extend([
+                ("import_check_wall", self.result.wall),
+                ("import_check_cpu", self.result.cpu),
+                # if the module was imported earlier, use the time from then
+                ("import_check_self",
+                 self_times.get(str(self.path), self.result.wall)),
+            ])
+        else:
+            self.user_properties.extend([
+                ("import_check_memory", self.result.memory),
+                ("import_check_memory_peak", self.result.memory_peak),
+                ("import_check_rss", self.result.rss),
+            ])
+        if self.result.footprint is not None:
+            self.user_properties.extend([
+                ("import_check_footprint", len(self.result.footprint)),
+                ("import_check_footprint_size", self.result.footprint_size),
+                ("import_check_footprint_modules", self.result.footprint),
+            ])
+        if self.result.audit is not None:
+            self.user_properties.append(
+                ("import_check_audit", self.result.audit))
+
+    def run_remote(self, engine):
+        result = self.result = engine.result(self.path)
+        self.record_properties()
+        sys.stdout.write(result.stdout)
+        sys.stderr.write(result.stderr)
+        for message, category, filename, lineno in result.warnings:
+            category = getattr(builtins, category, None)
+            if not isinstance(category, type) or not issubclass(category,
+                                                                Warning):
+                category = UserWarning
+            warnings.warn_explicit(message, category, filename, lineno)
+        if result.deadlock is not None:
+            warnings.warn(ImportDeadlockWarning(
+                f"Import lock deadlock while importing concurrently, "
+                f"the module was imported again: {result.deadlock}"))
+        if result.error is not None:
+            raise ImportCheckError(result.error)
 
     def repr_failure(self, exc_info):
+        if isinstance(exc_info.value, ImportCheckError):
+            error = str(exc_info.value)
+            if error.startswith("Traceback "):
+                # start with the exception, so that the short test summary
+                # shows it, as for in-process failures
+                crash = error.rstrip().rpartition("\n")[2]
+                error = f"{crash}\n\n{error}"
+            return error
+
         importer_path = Path(pytest_import_check.importer.__file__)
+        machinery_paths = (importer_path,
+                           Path(pytest_import_check.timing.__file__))
+        watchdog_path = Path(pytest_import_check.watchdog.__file__)
         done = []
         def filter_cb(entry):
+            if entry.path == watchdog_path:
+                return False
             if done:
                 return True
             if isinstance(entry.path, Path):
-                if entry.path == importer_path:
+                if entry.path in machinery_paths:
                     return False
                 if entry.path.is_relative_to(importlib.__file__):
                     return False
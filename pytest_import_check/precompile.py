@@ -0,0 +1,162 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Compiling modules to bytecode ahead of the import pass"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import importlib.machinery
+import importlib.util
+import itertools
+import marshal
+import multiprocessing
+import os
+import sys
+from importlib.machinery import (
+    BYTECODE_SUFFIXES,
+    EXTENSION_SUFFIXES,
+    SOURCE_SUFFIXES,
+)
+from pathlib import Path
+
+from pytest_import_check.static import POOL_THRESHOLD
+
+# (source mtime in ns, source size, marshalled code)
+CodeEntry = tuple[int, int, bytes]
+
+
+def _is_fresh(cfile: str, st: os.stat_result) -> bool:
+    """Check whether the bytecode file is up-to-date
+
+    Hash-based bytecode files are always considered fresh, so that they
+    are not replaced by timestamp-based files.  The import system
+    verifies them itself.
+    """
+    try:
+        with open(cfile, "rb") as f:
+            header = f.read(16)
+    except OSError:
+        return False
+    if len(header) != 16 or header[:4] != importlib.util.MAGIC_NUMBER:
+        return False
+    flags = int.from_bytes(header[4:8], "little")
+    if flags & 1:
+        return True
+    return (flags == 0
+            and int.from_bytes(header[8:12], "little")
+            == int(st.st_mtime) & 0xFFFFFFFF
+            and int.from_bytes(header[12:16], "little")
+            == st.st_size & 0xFFFFFFFF)
+
+
+def precompile_file(path: Path, write: bool = True) -> CodeEntry | None:
+    """Write the bytecode of the source file to __pycache__
+
+    If the bytecode can not be written, or `write` is False,
+    the marshalled code object is returned instead.  Files that can not
+    be compiled are left for the import to report.
+    """
+    try:
+        st = path.stat()
+        cfile = importlib.util.cache_from_source(str(path))
+        if _is_fresh(cfile, st):
+            return None
+        source = path.read_bytes()
+        code = compile(source, str(path), "exec", dont_inherit=True)
+    except (NotImplementedError, OSError, SyntaxError, ValueError):
+        return None
+    data = marshal.dumps(code)
+    if write:
+        # the same layout as written by the import system, so that it
+        # is used by subsequent imports
+        header = (importlib.util.MAGIC_NUMBER
+                  + (0).to_bytes(4, "little")
+                  + (int(st.st_mtime) & 0xFFFFFFFF).to_bytes(4, "little")
+                  + (st.st_size & 0xFFFFFFFF).to_bytes(4, "little"))
+        try:
+            os.makedirs(os.path.dirname(cfile), exist_ok=True)
+            tmp = f"{cfile}.{os.getpid()}"
+            with open(tmp, "wb") as f:
+                f.write(header + data)
+            os.replace(tmp, cfile)
+            return None
+        except OSError:
+            pass
+    return (st.st_mtime_ns, st.st_size, data)
+
+
+def _precompile_batch(paths: list[Path], write: bool,
+                      ) -> list[CodeEntry | None]:
+    return [precompile_file(path, write) for path in paths]
+
+
+def precompile(paths: list[Path], workers: int) -> dict[str, CodeEntry]:
+    """Compile all source files, using a process pool
+
+    Returns the code of files whose bytecode could not be written,
+    keyed by path, to be used via `CodeCache`.
+    """
+    paths = [path for path in paths
+             if path.name.endswith(tuple(SOURCE_SUFFIXES))]
+    # the pool workers do not inherit sys.dont_write_bytecode if it was
+    # changed at runtime
+    write = not sys.dont_write_bytecode
+    if workers <= 1 or len(paths) < POOL_THRESHOLD:
+        entries = _precompile_batch(paths, write)
+    else:
+        size = max(1, len(paths) // (workers * 4))
+        batches = [paths[i:i + size] for i in range(0, len(paths), size)]
+        with concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"),
+                ) as executor:
+            entries = [entry
+                       for batch_entries in executor.map(
+                           _precompile_batch, batches,
+                           itertools.repeat(write))
+                       for entry in batch_entries]
+    return {str(path): entry for path, entry in zip(paths, entries)
+            if entry is not None}
+
+
+class CodeCache:
+    """Load modules from in-memory code instead of compiling them
+
+    This installs a path hook whose source loader uses the code
+    compiled by `precompile()` for unmodified files, and falls back
+    to the regular loading otherwise.
+    """
+
+    def __init__(self, code: dict[str, CodeEntry]) -> None:
+        self.code = code
+        self.hook = None
+
+    def install(self) -> None:
+        code = self.code
+
+        class CachedSourceFileLoader(importlib.machinery.SourceFileLoader):
+            def get_code(self, fullname):
+                entry = code.get(self.path)
+                if entry is not None:
+                    try:
+                        st = os.stat(self.path)
+                    except OSError:
+                        pass
+                    else:
+                        if (st.st_mtime_ns, st.st_size) == entry[:2]:
+                            return marshal.loads(entry[2])
+                return super().get_code(fullname)
+
+        self.hook = importlib.machinery.FileFinder.path_hook(
+            (importlib.machinery.ExtensionFileLoader, EXTENSION_SUFFIXES),
+            (CachedSourceFileLoader, SOURCE_SUFFIXES),
+            (importlib.machinery.SourcelessFileLoader, BYTECODE_SUFFIXES),
+        )
+        sys.path_hooks.insert(0, self.hook)
+        sys.path_importer_cache.clear()
+
+    def uninstall(self) -> None:
+        if self.hook in sys.path_hooks:
+            sys.path_hooks.remove(self.hook)
+            sys.path_importer_cache.clear()
+        self.hook = None
@@ -0,0 +1,112 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Writing import profiles recorded by ImportTimer"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+
+class Profile(NamedTuple):
+    """Import events recorded for a single checked module"""
+
+    name: str
+    duration: float
+    # [type, name, origin, time] lists, see ImportTimer
+    events: list[list]
+
+
+def collapsed_stacks(events: list[list]) -> Iterator[tuple[list[str], float]]:
+    """Yield (stack, self time) pairs for all closed frames"""
+    stack: list[list] = []
+    for event_type, name, _, at in events:
+        if event_type == "O":
+            # [name, start time, time spent in children]
+            stack.append([name, at, 0.0])
+        else:
+            _, start, children = stack.pop()
+            if stack:
+                stack[-1][2] += at - start
+            yield [x[0] for x in stack] + [name], at - start - children
+
+
+def write_collapsed(path: Path, profiles: list[Profile], prefix: bool
+                    ) -> None:
+    """Write profiles in the collapsed stack format
+
+    If `prefix` is True, the stacks are prefixed with the profile name.
+    """
+    totals: dict[str, float] = {}
+    for profile in profiles:
+        for stack, self_time in collapsed_stacks(profile.events):
+            if prefix:
+                stack = [profile.name, *stack]
+            line = ";".join(stack)
+            totals[line] = totals.get(line, 0.0) + self_time
+    with open(path, "w") as f:
+        for line, self_time in totals.items():
+            # use microseconds, as tools expect integer sample counts
+            f.write(f"{line} {max(0, round(self_time * 1e6))}\n")
+
+
+def write_speedscope(path: Path, profiles: list[Profile]) -> None:
+    """Write profiles as a speedscope file, with one evented profile each"""
+    frames: dict[tuple[str, str | None], int] = {}
+    out_profiles = []
+    for profile in profiles:
+        events = []
+        for event_type, name, origin, at in profile.events:
+            frame = frames.setdefault((name, origin), len(frames))
+            events.append({"type": event_type, "frame": frame, "at": at})
+        out_profiles.append({
+            "type": "evented",
+            "name": profile.name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": max(profile.duration,
+                            events[-1]["at"] if events else 0),
+            "events": events,
+        })
+    data = {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {
+            "frames": [{"name": name, "file": origin}
+                       if origin is not None else {"name": name}
+                       for name, origin in frames],
+        },
+        "profiles": out_profiles,
+        "name": "import profile",
+        "exporter": "pytest-import-check",
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+FORMATS = {
+    "collapsed": ".txt",
+    "speedscope": ".speedscope.json",
+}
+
+
+def write_profiles(path: Path, profiles: list[Profile], format: str) -> None:
+    """Write profiles to the specified path
+
+    If `path` is a directory, one file is written per profile.
+    Otherwise, a single file merging all profiles is written.
+    """
+    if path.is_dir():
+        for profile in profiles:
+            name = re.sub(r"[^\w.-]", "_", profile.name) + FORMATS[format]
+            if format == "collapsed":
+                write_collapsed(path / name, [profile], prefix=False)
+            else:
+                write_speedscope(path / name, [profile])
+    elif format == "collapsed":
+        write_collapsed(path, profiles, prefix=True)
+    else:
+        write_speedscope(path, profiles)
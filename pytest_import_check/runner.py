@@ -0,0 +1,307 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Import check logic shared by the in-process and the isolated runs"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import importlib
+import io
+import os
+import sys
+import traceback
+import warnings
+from collections.abc import Iterable
+from pathlib import Path
+from typing import IO
+
+import pytest_import_check.importer
+import pytest_import_check.timing
+import pytest_import_check.watchdog
+from pytest_import_check.audit import AuditRecorder
+from pytest_import_check.importer import (
+    DirectoryIndex,
+    IndexedRootFinder,
+    SpecCache,
+    import_module_name,
+    import_path,
+)
+from pytest_import_check.memory import MemoryTracker
+from pytest_import_check.precompile import CodeCache, CodeEntry
+from pytest_import_check.timing import ImportTimer
+from pytest_import_check.watchdog import (
+    DUMP_FACTOR,
+    KILL_FACTOR,
+    import_timeout,
+)
+
+
+@dataclasses.dataclass
+class CheckOptions:
+    """Options controlling how modules are imported"""
+
+    mode: str
+    root: Path
+    consider_namespace_packages: bool
+    index: DirectoryIndex | None = None
+    # finder used instead of sys.path in prepend and append modes
+    root_finder: IndexedRootFinder | None = None
+    spec_cache: SpecCache | None = None
+    sys_path: list[str] = dataclasses.field(default_factory=list)
+    # modules imported by workers before running checks
+    preload: list[str] = dataclasses.field(default_factory=list)
+    # whether to measure the time spent in every imported module
+    timing: bool = False
+    # whether to record import profiles
+    profile: bool = False
+    # whether to measure memory use
+    memory: bool = False
+    # seconds after which imports are interrupted
+    timeout: float | None = None
+    # whether to record side effects
+    audit: bool = False
+    # whether to record the modules loaded by imports
+    footprint: bool = False
+    # code of modules whose bytecode could not be written, see CodeCache
+    code_cache: dict[str, CodeEntry] | None = None
+    # names of modules known upfront, e.g. from distribution metadata,
+    # imported by name without resolving them from the path
+    module_names: dict[Path, str] | None = None
+
+
+@dataclasses.dataclass
+class CheckResult:
+    """Outcome of checking a single module"""
+
+    path: Path
+    # formatted traceback, if the import failed (isolated runs only)
+    error: str | None = None
+    # (message, category name, filename, lineno) of warnings emitted
+    # during an isolated import
+    warnings: list[tuple[str, str, str, int]] = dataclasses.field(
+        default_factory=list)
+    stdout: str = ""
+    stderr: str = ""
+    # files of modules loaded for the first time while importing
+    loaded: list[str] = dataclasses.field(default_factory=list)
+    # total wall clock and CPU time spent in import_path()
+    wall: float = 0.0
+    cpu: float = 0.0
+    # time spent executing every loaded module itself, keyed by its origin
+    self_times: dict[str, float] = dataclasses.field(default_factory=dict)
+    # nested import events, see ImportTimer
+    profile: list[list] | None = None
+    # memory allocated by the import (net and peak) and RSS growth,
+    # if measured
+    memory: int | None = None
+    memory_peak: int | None = None
+    rss: int | None = None
+    # side effects, see AuditRecorder, if recorded
+    audit: dict[str, dict[str, list]] | None = None
+    # names of modules loaded for the first time while importing,
+    # other than the module itself and its parent packages, and the total
+    # size of their files, if recorded
+    footprint: list[str] | None = None
+    footprint_size: int | None = None
+    # message of the import lock deadlock that occurred when importing
+    # concurrently, if the module had to be imported again
+    deadlock: str | None = None
+
+
+def run_check(path: Path,
+              options: CheckOptions,
+              result: CheckResult,
+              dump_file: IO | int | None = None,
+              exit: bool = False,
+              ) -> None:
+    """Import the module at `path`, filling `result` in
+
+    Exceptions raised by the import are propagated to the caller.
+    If the import times out and can not be interrupted, the stacks are
+    dumped to `dump_file`, and the process exits if `exit` is True.
+    """
+    modules_before = set(sys.modules)
+    module = None
+    timer = ImportTimer(profile=options.profile, modules=options.timing)
+    # start memory tracking outside the timer, so that its setup
+    # does not count towards the import time
+    memory = MemoryTracker() if options.memory else None
+    audit = AuditRecorder() if options.audit else None
+    try:
+        with contextlib.ExitStack() as stack:
+            if memory is not None:
+                stack.enter_context(memory)
+            if audit is not None:
+                stack.enter_context(audit)
+            if options.timeout is not None:
+                stack.enter_context(import_timeout(
+                    options.timeout,
+                    dump_after=options.timeout * (KILL_FACTOR if exit
+                                                  else DUMP_FACTOR),
+                    dump_file=dump_file,
+                    exit=exit))
+            name = (options.module_names.get(path)
+                    if options.module_names is not None else None)
+            with timer:
+                if name is not None:
+                    module = import_module_name(path, name)
+                else:
+                    module = import_path(
+                        path,
+                        mode=options.mode,
+                        root=options.root,
+                        consider_namespace_packages=(
+                            options.consider_namespace_packages),
+                        index=options.index,
+                        root_finder=options.root_finder,
+                        spec_cache=options.spec_cache)
+    finally:
+        if memory is not None:
+            result.memory = memory.allocated
+            result.memory_peak = memory.peak
+            result.rss = memory.rss
+        if audit is not None:
+            result.audit = audit.events
+        result.wall = timer.wall
+        result.cpu = timer.cpu
+        result.self_times = timer.self_times()
+        result.profile = timer.events
+        new_modules = sys.modules.keys() - modules_before
+        result.loaded = loaded_files(new_modules)
+        if options.footprint:
+            # the module itself and its parent packages are always loaded
+            own = module.__name__ if module is not None else None
+            result.footprint = sorted(
+                x for x in new_modules
+                if own is None or not in_package(own, x))
+            result.footprint_size = files_size(
+                loaded_files(result.footprint))
+
+
+def in_package(name: str, package: str) -> bool:
+    """Return whether module `name` is `package` or its submodule"""
+    return name == package or name.startswith(f"{package}.")
+
+
+def loaded_files(names: Iterable[str]) -> list[str]:
+    """Return files of the specified loaded modules"""
+    files = []
+    for name in names:
+        file = getattr(sys.modules.get(name), "__file__", None)
+        if isinstance(file, str):
+            files.append(file)
+    return files
+
+
+def files_size(files: Iterable[str]) -> int:
+    """Return the total size of the files, skipping missing files"""
+    size = 0
+    for file in files:
+        try:
+            size += os.stat(file).st_size
+        except OSError:
+            pass
+    return size
+
+
+@contextlib.contextmanager
+def isolated_state(root_finder: IndexedRootFinder | None = None):
+    """Restore the import system state after the block
+
+    This removes all modules imported within the block from `sys.modules`,
+    and reverts changes to `sys.path`, the import hooks and the package
+    roots added to `root_finder`, so that the subsequent imports start
+    from a clean state.
+    """
+    modules = dict(sys.modules)
+    path = list(sys.path)
+    meta_path = list(sys.meta_path)
+    path_hooks = list(sys.path_hooks)
+    path_importer_cache = dict(sys.path_importer_cache)
+    roots = root_finder.snapshot() if root_finder is not None else None
+    try:
+        yield
+    finally:
+        if roots is not None:
+            root_finder.restore(roots)
+        sys.modules.clear()
+        sys.modules.update(modules)
+        sys.path[:] = path
+        sys.meta_path[:] = meta_path
+        sys.path_hooks[:] = path_hooks
+        sys.path_importer_cache.clear()
+        sys.path_importer_cache.update(path_importer_cache)
+
+
+def check_isolated(path: Path,
+                   options: CheckOptions,
+                   dump_file: IO | None = None,
+                   ) -> CheckResult:
+    """Check the module at `path`, reverting the import state afterwards
+
+    Unlike `run_check()`, this function captures all output, warnings
+    and exceptions into the returned result, so that it can be passed
+    from a worker back to the pytest process.
+    """
+    result = CheckResult(path)
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(isolated_state(options.root_finder))
+        caught = stack.enter_context(warnings.catch_warnings(record=True))
+        stack.enter_context(contextlib.redirect_stdout(stdout))
+        stack.enter_context(contextlib.redirect_stderr(stderr))
+        warnings.simplefilter("always")
+        try:
+            run_check(path, options, result, dump_file=dump_file)
+        except KeyboardInterrupt:
+            raise
+        except BaseException as exc:  # noqa: BLE001
+            result.error = format_import_error(exc)
+    result.warnings = [(str(w.message), w.category.__name__, w.filename,
+                        w.lineno) for w in caught]
+    result.stdout = stdout.getvalue()
+    result.stderr = stderr.getvalue()
+    return result
+
+
+def _is_import_machinery(filename: str) -> bool:
+    return (filename in (pytest_import_check.importer.__file__,
+                         pytest_import_check.timing.__file__,
+                         __file__)
+            or "importlib" in filename)
+
+
+def format_import_error(exc: BaseException) -> str:
+    """Format the exception, skipping the import machinery frames
+
+    This mimics the traceback filtering done by `ImportCheckItem`
+    for in-process failures.
+    """
+    tb = traceback.TracebackException.from_exception(exc)
+    frames = list(tb.stack)
+    for i, frame in enumerate(frames):
+        if not _is_import_machinery(frame.filename):
+            frames = frames[i:]
+            break
+    else:
+        frames = []
+    # skip the timeout handler
+    while (frames and frames[-1].filename
+           == pytest_import_check.watchdog.__file__):
+        frames.pop()
+    tb.stack = traceback.StackSummary.from_list(frames)
+    return "".join(tb.format())
+
+
+def apply_options(options: CheckOptions) -> None:
+    """Prepare a worker interpreter for running checks"""
+    if options.sys_path:
+        sys.path[:] = options.sys_path
+    if options.code_cache:
+        CodeCache(options.code_cache).install()
+    for module_name in options.preload:
+        with contextlib.suppress(Exception):
+            importlib.import_module(module_name)
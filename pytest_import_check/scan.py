@@ -0,0 +1,151 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Static analysis of module sources"""
+
+from __future__ import annotations
+
+import ast
+import collections
+import importlib.util
+import os
+import sys
+import types
+from pathlib import Path
+
+# exception types whose handlers make imports optional
+OPTIONAL_IMPORT_EXCEPTIONS = frozenset({
+    "ImportError", "ModuleNotFoundError", "Exception", "BaseException",
+})
+
+# names that can be used in conditions evaluated statically
+_CONDITION_NAMES = {
+    "sys": types.SimpleNamespace(version_info=sys.version_info,
+                                 platform=sys.platform,
+                                 implementation=types.SimpleNamespace(
+                                     name=sys.implementation.name)),
+    "os": types.SimpleNamespace(name=os.name),
+    "TYPE_CHECKING": False,
+    "typing": types.SimpleNamespace(TYPE_CHECKING=False),
+}
+_CONDITION_NODES = (ast.Expression, ast.Compare, ast.BoolOp, ast.UnaryOp,
+                    ast.Attribute, ast.Name, ast.Constant, ast.Tuple,
+                    ast.Subscript, ast.Slice, ast.Load, ast.cmpop, ast.boolop,
+                    ast.unaryop)
+
+
+def evaluate_condition(test: ast.expr) -> bool | None:
+    """Evaluate a simple platform or version condition
+
+    Supports conditions on `sys.version_info`, `sys.platform`, `os.name`
+    and `TYPE_CHECKING`.  Returns None if the condition can not be
+    evaluated statically.
+    """
+    expr = ast.Expression(test)
+    for node in ast.walk(expr):
+        if not isinstance(node, _CONDITION_NODES):
+            return None
+        if isinstance(node, ast.Name) and node.id not in _CONDITION_NAMES:
+            return None
+    try:
+        return bool(eval(compile(expr, "<condition>", "eval"),
+                         {"__builtins__": {}}, dict(_CONDITION_NAMES)))
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _handles_import_errors(node: ast.Try) -> bool:
+    for handler in node.handlers:
+        if handler.type is None:
+            return True
+        types_ = (handler.type.elts if isinstance(handler.type, ast.Tuple)
+                  else [handler.type])
+        for type_ in types_:
+            name = (type_.attr if isinstance(type_, ast.Attribute)
+                    else getattr(type_, "id", None))
+            if name in OPTIONAL_IMPORT_EXCEPTIONS:
+                return True
+    return False
+
+
+def module_level_imports(tree: ast.Module,
+                         required_only: bool = False,
+                         ) -> list[ast.Import | ast.ImportFrom]:
+    """Return import statements executed while importing the module
+
+    This includes imports nested in conditionals, `try` and `with`
+    blocks, and class bodies, but not inside functions.
+
+    If `required_only` is True, imports inside `try` blocks handling
+    `ImportError` are skipped, along with the fallbacks in their
+    handlers, and only the taken branch of platform and version
+    conditions is considered.
+    """
+    try_types = (ast.Try, getattr(ast, "TryStar", ast.Try))
+    imports = []
+    stack = list(reversed(tree.body))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(node)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            pass
+        elif (required_only and isinstance(node, try_types)
+                and _handles_import_errors(node)):
+            stack.extend(reversed([*node.orelse, *node.finalbody]))
+        elif (required_only and isinstance(node, ast.If)
+                and (value := evaluate_condition(node.test)) is not None):
+            stack.extend(reversed(node.body if value else node.orelse))
+        else:
+            # expressions can not contain statements
+            stack.extend(reversed([child for child in ast.iter_child_nodes(node)
+                                   if not isinstance(child, ast.expr)]))
+    return imports
+
+
+def top_level_imports(path: Path) -> set[str]:
+    """Return top-level names of absolute imports in the specified file
+
+    Returns an empty set if the file can not be read or parsed.
+    """
+    try:
+        tree = ast.parse(path.read_bytes(), str(path))
+    except (OSError, SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in module_level_imports(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.partition(".")[0] for alias in node.names)
+        elif node.level == 0 and node.module is not None:
+            names.add(node.module.partition(".")[0])
+    return names
+
+
+def detect_preload(paths: list[Path], root: Path, sample: int = 100,
+                   ) -> list[str]:
+    """Guess heavy dependencies worth preloading from a sample of modules
+
+    Returns top-level modules that are imported by at least two
+    of the first `sample` source files, and that are found outside
+    `root`.
+    """
+    counts: collections.Counter[str] = collections.Counter()
+    for path in paths[:sample]:
+        if path.suffix == ".py":
+            counts.update(top_level_imports(path))
+    preload = []
+    for name, count in counts.most_common():
+        if count < 2:
+            break
+        if name in sys.builtin_module_names or name == "__future__":
+            continue
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            continue
+        if spec is None or spec.origin is None:
+            continue
+        if Path(spec.origin).is_relative_to(root):
+            continue
+        preload.append(name)
+    return preload
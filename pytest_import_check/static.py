@@ -0,0 +1,135 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Static checks of modules that do not execute them"""
+
+from __future__ import annotations
+
+import ast
+import concurrent.futures
+import importlib.machinery
+import importlib.util
+import multiprocessing
+import sys
+import traceback
+from importlib.machinery import EXTENSION_SUFFIXES, SOURCE_SUFFIXES
+from pathlib import Path
+from typing import Callable
+
+from pytest_import_check.elf import check_extension
+from pytest_import_check.scan import module_level_imports
+
+# below this many files, the process pool startup is not worth it
+POOL_THRESHOLD = 64
+
+
+def _find_module(name: str, search_path: list[str]) -> bool:
+    """Check whether the module can be found, without importing anything
+
+    Top-level modules are looked up via `sys.meta_path` first, and then
+    in `search_path`.  Submodules are looked up in the search locations
+    of their parent packages.
+    """
+    if name in sys.modules:
+        return True
+    top, *rest = name.split(".")
+    spec = None
+    if top in sys.modules:
+        locations = getattr(sys.modules[top], "__path__", None)
+    else:
+        try:
+            spec = importlib.util.find_spec(top)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None:
+            spec = importlib.machinery.PathFinder.find_spec(top, search_path)
+        if spec is None:
+            return False
+        locations = spec.submodule_search_locations
+    fullname = top
+    for part in rest:
+        if locations is None:
+            # submodules of non-packages can only be created dynamically
+            return True
+        fullname = f"{fullname}.{part}"
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is None:
+                continue
+            spec = find_spec(fullname, list(locations))
+            if spec is not None:
+                break
+        else:
+            return False
+        locations = spec.submodule_search_locations
+    return True
+
+
+def check_source(path: Path, search_path: list[str]) -> str | None:
+    """Compile the file and verify that its imports can be found
+
+    Returns an error message, or None if the check passed.  Only
+    absolute imports that are executed unconditionally while importing
+    the module are checked.
+    """
+    try:
+        source = path.read_bytes()
+        tree = ast.parse(source, str(path))
+        compile(tree, str(path), "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return "".join(traceback.format_exception_only(type(e), e))
+    except OSError as e:
+        return str(e)
+
+    errors = []
+    for node in module_level_imports(tree, required_only=True):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif node.level == 0 and node.module != "__future__":
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            if not _find_module(name, search_path):
+                errors.append(f"{path}:{node.lineno}: module {name!r} "
+                              f"not found")
+    return "\n".join(errors) or None
+
+
+def check_file(path: Path, search_path: list[str]) -> str | None:
+    """Run static checks for the specified module file"""
+    if path.name.endswith(tuple(SOURCE_SUFFIXES)):
+        return check_source(path, search_path)
+    if path.name.endswith(tuple(EXTENSION_SUFFIXES)):
+        return check_extension(path)
+    return None
+
+
+def _check_batch(paths: list[Path], search_path: list[str],
+                 ) -> list[str | None]:
+    return [check_file(path, search_path) for path in paths]
+
+
+def check_files(paths: list[Path],
+                search_path: list[str],
+                workers: int,
+                check: Callable[[list[Path], list[str]], list] = _check_batch,
+                ) -> dict[Path, str | None]:
+    """Run static checks for all files, using a process pool
+
+    Returns a dict mapping paths to error messages (or None).
+    """
+    if workers <= 1 or len(paths) < POOL_THRESHOLD:
+        return dict(zip(paths, check(paths, search_path)))
+
+    size = max(1, len(paths) // (workers * 4))
+    batches = [paths[i:i + size] for i in range(0, len(paths), size)]
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+        futures = [executor.submit(check, batch, search_path)
+                   for batch in batches]
+        for batch, future in zip(batches, futures):
+            results.update(zip(batch, future.result()))
+    return results
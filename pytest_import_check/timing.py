@@ -0,0 +1,150 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Measuring time spent importing modules"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+class _TimedLoader:
+    """Loader wrapper timing module creation and execution"""
+
+    def __init__(self, loader, timer: ImportTimer, name: str,
+                 origin: str | None) -> None:
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+        self._origin = origin
+
+    def __getattr__(self, name):
+        if name == "_loader":
+            raise AttributeError(name)
+        return getattr(self._loader, name)
+
+    def _restore(self, module) -> None:
+        # do not expose the wrapper to the module
+        if getattr(module, "__loader__", None) is self:
+            module.__loader__ = self._loader
+        spec = getattr(module, "__spec__", None)
+        if spec is not None and spec.loader is self:
+            spec.loader = self._loader
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, "create_module", None)
+        if create_module is None:
+            return None
+        # extension modules are initialized here
+        self._timer.enter(self._name, self._origin)
+        try:
+            return create_module(spec)
+        finally:
+            self._timer.leave(self._name, self._origin)
+
+    def exec_module(self, module) -> None:
+        self._restore(module)
+        self._timer.enter(self._name, self._origin)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.leave(self._name, self._origin)
+
+
+class ImportTimer:
+    """Measure the time spent importing modules
+
+    The total wall clock and CPU time are always measured.  If `modules`
+    is True, the timer is also installed at the front of `sys.meta_path`
+    while active.  It delegates finding modules to the remaining
+    finders, and wraps
+    the loaders of returned specs to measure the time spent creating
+    and executing every module.  This makes it possible to determine
+    the time spent in the module itself, excluding the imports of other
+    modules that it triggered.  Only imports in the thread that entered
+    the timer are measured.
+
+    If `profile` is True, the timer additionally records the nested
+    import events as a list of ``[type, name, origin, time]`` lists,
+    where type is "O" for opening and "C" for closing a module frame,
+    and time is relative to the start of the timer.
+    """
+
+    # see SpecCache
+    delegates_to_meta_path = True
+
+    def __init__(self, profile: bool = False, modules: bool = True) -> None:
+        # [start time, time spent in nested imports]
+        self._stack: list[list[float]] = []
+        # module name -> (origin, total time, self time)
+        self.modules: dict[str, tuple[str | None, float, float]] = {}
+        self.events: list[list] | None = [] if profile else None
+        self._install = modules or profile
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self) -> Self:
+        self._thread = threading.get_ident()
+        if self._install:
+            sys.meta_path.insert(0, self)
+        self._start = time.perf_counter()
+        self._start_cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.wall = time.perf_counter() - self._start
+        self.cpu = time.thread_time() - self._start_cpu
+        try:
+            sys.meta_path.remove(self)
+        except ValueError:
+            pass
+
+    def find_spec(self, name, path, target=None):
+        # timers of imports running concurrently in other threads
+        if threading.get_ident() != self._thread:
+            return None
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, name, spec.origin)
+        return spec
+
+    def enter(self, name: str, origin: str | None) -> None:
+        now = time.perf_counter()
+        self._stack.append([now, 0.0])
+        if self.events is not None:
+            self.events.append(["O", name, origin, now - self._start])
+
+    def leave(self, name: str, origin: str | None) -> None:
+        now = time.perf_counter()
+        start, nested = self._stack.pop()
+        total = now - start
+        if self.events is not None:
+            self.events.append(["C", name, origin, now - self._start])
+        if self._stack:
+            self._stack[-1][1] += total
+        _, prev_total, prev_self = self.modules.get(
+            name, (origin, 0.0, 0.0))
+        self.modules[name] = (origin, prev_total + total,
+                              prev_self + total - nested)
+
+    def self_times(self) -> dict[str, float]:
+        """Return self times of executed modules, keyed by origin"""
+        return {origin: self_time
+                for origin, _, self_time in self.modules.values()
+                if origin is not None}
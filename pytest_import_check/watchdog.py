@@ -0,0 +1,84 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+"""Interrupting imports that take too long"""
+
+from __future__ import annotations
+
+import contextlib
+import faulthandler
+import os
+import signal
+import threading
+from collections.abc import Iterator
+from typing import IO
+
+# multiples of the timeout after which faulthandler dumps the stacks
+# of a worker process, and the worker is killed
+DUMP_FACTOR = 1.5
+KILL_FACTOR = 2.0
+
+
+class ImportTimeoutError(BaseException):
+    """Raised in the importing thread when the import times out
+
+    This is not an Exception subclass, so that it is not caught
+    by overly broad exception handlers in the imported modules.
+    """
+
+
+def _dump_traceback(file: IO | int, exit: bool) -> None:
+    faulthandler.dump_traceback(file, all_threads=True)
+    if exit:
+        os._exit(1)
+
+
+@contextlib.contextmanager
+def import_timeout(timeout: float | None,
+                   dump_after: float | None = None,
+                   dump_file: IO | int | None = None,
+                   exit: bool = False,
+                   ) -> Iterator[None]:
+    """Interrupt the code running in the context after `timeout` seconds
+
+    Where supported, SIGALRM is used to raise ImportTimeoutError
+    in the main thread.  This interrupts blocking system calls and lock
+    waits, but not long-running C code that does not check for signals.
+    As the last resort, after `dump_after` seconds faulthandler dumps
+    the stacks of all threads to `dump_file`, and exits the process
+    if `exit` is True.  In other threads, a separate timer thread is used
+    to dump the stacks, since faulthandler supports only one pending
+    dump per process.
+    """
+    if timeout is None:
+        yield
+        return
+
+    def handler(signum, frame):
+        raise ImportTimeoutError(f"Import timed out after {timeout}s")
+
+    main_thread = threading.current_thread() is threading.main_thread()
+    use_signal = hasattr(signal, "setitimer") and main_thread
+    with contextlib.ExitStack() as stack:
+        if dump_after is not None and dump_file is not None:
+            if main_thread:
+                faulthandler.dump_traceback_later(dump_after, file=dump_file,
+                                                  exit=exit)
+                stack.callback(faulthandler.cancel_dump_traceback_later)
+            else:
+                timer = threading.Timer(dump_after, _dump_traceback,
+                                        (dump_file, exit))
+                timer.daemon = True
+                timer.start()
+                stack.callback(timer.cancel)
+        if use_signal:
+            try:
+                old_handler = signal.signal(signal.SIGALRM, handler)
+            except ValueError:
+                # not the main interpreter
+                use_signal = False
+        if use_signal:
+            stack.callback(signal.signal, signal.SIGALRM, old_handler)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+            stack.callback(signal.setitimer, signal.ITIMER_REAL, 0)
+        yield
@@ -0,0 +1,91 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import threading
+
+import pytest
+
+from pytest_import_check.audit import AuditRecorder
+
+
+@pytest.fixture(params=[[], ["--import-check-workers=2"]],
+                ids=["in-process", "workers"])
+def run_audit(run, request, pytester):
+    pytester.makepyfile(
+        clean="import json",
+        reads="with open(__file__) as f:\n    f.read()",
+        spawns="import subprocess\nsubprocess.run(['true'])",
+        network="import socket\nsocket.getaddrinfo('localhost', 80)",
+        threads="import threading\nimport time\n"
+                "threading.Thread(target=time.sleep, args=(1,),"
+                " daemon=True).start()",
+    )
+
+    def inner(*args):
+        return run(*request.param, *args)
+    yield inner
+
+
+def test_audit(run_audit):
+    result = run_audit("--import-check-audit")
+    result.assert_outcomes(passed=5)
+    result.stdout.fnmatch_lines([
+        "*= import side effects =*",
+        "network.py::import-check",
+        "    network: network: socket.getaddrinfo x1 (localhost)",
+        "reads.py::import-check",
+        "    reads: file: open x1 (*reads.py)",
+        "spawns.py::import-check",
+        "    spawns: subprocess: subprocess.Popen x1 (true)",
+        "threads.py::import-check",
+        "    threads: thread: threading.Thread.start x1 (Thread-*)",
+    ])
+    result.stdout.no_fnmatch_line("clean.py::import-check")
+
+
+def test_audit_policy(run_audit, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_audit =
+            network = fail
+            subprocess = warn
+    """)
+    result = run_audit()
+    result.assert_outcomes(passed=4, failed=1, warnings=1)
+    result.stdout.fnmatch_lines([
+        "*Side effects at import:",
+        "network: network: socket.getaddrinfo x1 (localhost)",
+    ])
+    result.stdout.fnmatch_lines([
+        "*ImportSideEffectWarning: Side effects at import:",
+        "*spawns: subprocess: subprocess.Popen x1 (true)",
+    ])
+
+
+def test_audit_invalid(run, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_audit = disk = fail
+    """)
+    result = run()
+    result.stderr.fnmatch_lines(
+        ["*import_check_audit: invalid policy 'disk = fail'*"])
+
+
+def test_audit_other_threads(tmp_path):
+    entered = threading.Event()
+    done = threading.Event()
+
+    def other_thread():
+        entered.wait(10)
+        (tmp_path / "other.txt").write_text("")
+        threading.Thread(target=lambda: None).start()
+        done.set()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    with AuditRecorder() as recorder:
+        entered.set()
+        done.wait(10)
+    thread.join()
+    assert recorder.events == {}
@@ -7,6 +7,8 @@ import sys
 
 import pytest
 
+from pytest_import_check.engine import interpreters_available
+
 
 @pytest.fixture(params=[False, True])
 def py_limited_api(request):
@@ -76,6 +78,24 @@ def test_c_ext_undefined_symbol(run, build_c_ext):
     result.stdout.no_fnmatch_line("*importlib*")
 
 
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="ELF checks are only supported on Linux")
+def test_c_ext_static_undefined_symbol(run, build_c_ext):
+    build_c_ext(code="this_function_does_not_exist();")
+    result = run("--ignore=setup.py", "--import-check-level=syntax")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        "test.*::import-check*FAILED*",
+        "*test.*: undefined symbol 'this_function_does_not_exist'",
+    ])
+
+
+def test_c_ext_static(run, build_c_ext):
+    build_c_ext()
+    result = run("--ignore=setup.py", "--import-check-level=syntax")
+    result.assert_outcomes(passed=1)
+
+
 def test_c_ext_import_py(pytester, run, build_c_ext):
     pytester.makepyfile(foo="")
     build_c_ext(code='if (!PyImport_ImportModule("foo")) return NULL;')
@@ -157,6 +177,16 @@ def test_c_ext_import_indirect_nonexisting(pytester, run, build_c_ext):
     result.stdout.no_fnmatch_line("*importlib*")
 
 
+@pytest.mark.skipif(not interpreters_available(),
+                    reason="InterpreterPoolExecutor not available")
+def test_c_ext_interpreters(run, build_c_ext):
+    # single-phase init extensions are checked in a worker process
+    build_c_ext()
+    result = run("--ignore=setup.py", "--import-check-interpreters=2")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["test.*::import-check*PASSED*"])
+
+
 def test_c_library(pytester, run):
     """Verify that non-extension libraries are ignored"""
     pytester.makefile(".c", test="""
@@ -0,0 +1,69 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import pytest
+
+
+@pytest.fixture
+def run_cache(run):
+    def inner(*args):
+        return run("--import-check-cache=readwrite",
+                   "--import-check-workers=2", *args)
+    yield inner
+
+
+def test_cache_hit(run_cache, pytester):
+    pytester.makepyfile(good="import other", other="")
+    result = run_cache()
+    result.assert_outcomes(passed=2)
+    result = run_cache("--junitxml=out.xml")
+    result.assert_outcomes(passed=2)
+    assert (pytester.path / "out.xml").read_text().count(
+        'name="import_check_cache" value="hit"') == 2
+
+
+def test_cache_invalidation(run_cache, pytester):
+    pytester.makepyfile(good="import other", other="", bad="1 / 0")
+    result = run_cache()
+    result.assert_outcomes(passed=2, failed=1)
+    # modify a dependency of good.py
+    pytester.makepyfile(other="x = 1")
+    result = run_cache("--junitxml=out.xml")
+    result.assert_outcomes(passed=2, failed=1)
+    xml = (pytester.path / "out.xml").read_text()
+    assert xml.count('name="import_check_cache" value="hit"') == 0
+    # now everything should be cached except for bad.py
+    result = run_cache("--junitxml=out.xml")
+    result.assert_outcomes(passed=2, failed=1)
+    xml = (pytester.path / "out.xml").read_text()
+    assert xml.count('name="import_check_cache" value="hit"') == 2
+
+
+def test_cache_read_only(run, pytester):
+    pytester.makepyfile(good="")
+    run("--import-check-cache=read").assert_outcomes(passed=1)
+    run("--import-check-cache=readwrite",
+        "--import-check-workers=1").assert_outcomes(passed=1)
+    pytester.makepyfile(good="1 / 0")
+    run("--import-check-cache=read").assert_outcomes(failed=1)
+    run("--import-check-cache=off").assert_outcomes(failed=1)
+
+
+def test_cache_hit_in_process(run, pytester):
+    pytester.makepyfile(good="import other", other="")
+    run("--import-check-cache=readwrite",
+        "--import-check-workers=1").assert_outcomes(passed=2)
+    result = run("--import-check-cache=read", "--junitxml=out.xml")
+    result.assert_outcomes(passed=2)
+    assert (pytester.path / "out.xml").read_text().count(
+        'name="import_check_cache" value="hit"') == 2
+
+
+def test_cache_readwrite_in_process(run, pytester):
+    pytester.makepyfile(good="")
+    result = run("--import-check-cache=readwrite")
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines([
+        ("ERROR: --import-check-cache=readwrite requires "
+         "--import-check-workers or --import-check-interpreters"),
+    ])
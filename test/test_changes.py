@@ -0,0 +1,68 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import shutil
+import subprocess
+
+import pytest
+
+
+@pytest.fixture
+def modules(pytester):
+    pytester.makepyfile(
+        a_top="import b_mid",
+        b_mid="import c_leaf",
+        c_leaf="",
+        d_independent="",
+        e_removed="try:\n    import gone\nexcept ImportError:\n    pass",
+    )
+
+
+def test_changed_files(run, pytester, modules):
+    (pytester.path / "changed.txt").write_text("b_mid.py\nREADME.rst\n")
+    result = run("--import-check-changed-files=changed.txt")
+    result.assert_outcomes(passed=2, deselected=3)
+    result.stdout.fnmatch_lines([
+        "a_top.py::import-check*PASSED*",
+        "b_mid.py::import-check*PASSED*",
+    ])
+
+
+def test_changed_files_removed(run, pytester, modules):
+    (pytester.path / "changed.txt").write_text("gone.py\n")
+    result = run("--import-check-changed-files=changed.txt")
+    result.assert_outcomes(passed=1, deselected=4)
+    result.stdout.fnmatch_lines([
+        "e_removed.py::import-check*PASSED*",
+    ])
+
+
+def test_changed_files_missing(run, pytester, modules):
+    result = run("--import-check-changed-files=missing.txt")
+    result.stderr.fnmatch_lines(["*unable to read changed files*"])
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not available")
+def test_changed_since(run, pytester, modules):
+    def git(*args):
+        subprocess.run(["git", "-c", "user.name=test",
+                        "-c", "user.email=test@example.com", *args],
+                       cwd=pytester.path, check=True,
+                       stdout=subprocess.DEVNULL)
+
+    git("init", "-q")
+    git("add", "-A")
+    git("commit", "-q", "-m", "initial")
+    (pytester.path / "c_leaf.py").write_text("import os")
+    pytester.makepyfile(f_new="")
+    result = run("--import-check-changed-since=HEAD")
+    result.assert_outcomes(passed=4, deselected=2)
+    result.stdout.fnmatch_lines([
+        "a_top.py::import-check*PASSED*",
+        "b_mid.py::import-check*PASSED*",
+        "c_leaf.py::import-check*PASSED*",
+        "f_new.py::import-check*PASSED*",
+    ])
+
+    result = run("--import-check-changed-since=nonexistent-ref")
+    result.stderr.fnmatch_lines(["*git diff*failed*"])
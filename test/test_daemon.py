@@ -0,0 +1,117 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import socket
+
+import pytest
+
+import pytest_import_check.daemon
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"),
+                                reason="Unix domain sockets not supported")
+
+
+@pytest.fixture(autouse=True)
+def runtime_dir(monkeypatch, tmp_path_factory):
+    path = tmp_path_factory.mktemp("runtime")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(path))
+    yield path
+
+
+@pytest.fixture
+def run_daemon(run, pytester):
+    def inner(*args):
+        return run("--import-check-daemon", "--import-check-workers=2",
+                   *args)
+    yield inner
+    run("--import-check-daemon-stop", "--import-check-workers=2")
+
+
+def imports(pytester, name):
+    path = pytester.path / f"{name}.count"
+    return len(path.read_text()) if path.exists() else 0
+
+
+def test_daemon(run_daemon, pytester):
+    # every module records how many times it was imported
+    counter = "with open(__name__ + '.count', 'a') as f:\n    f.write('x')\n"
+    pytester.makepyfile(
+        good=counter,
+        helper=counter,
+        dependent=counter + "import helper",
+        bad=counter + "import nonexistent_module_xyz",
+    )
+    result = run_daemon()
+    result.assert_outcomes(passed=3, failed=1)
+    result.stdout.fnmatch_lines([
+        "*ModuleNotFoundError: No module named 'nonexistent_module_xyz'",
+    ])
+
+    # results of unchanged modules are reused, failures are not
+    result = run_daemon()
+    result.assert_outcomes(passed=3, failed=1)
+    assert imports(pytester, "good") == 1
+    assert imports(pytester, "bad") == 2
+
+    # changed modules and modules importing them are checked again
+    pytester.makepyfile(
+        bad=counter,
+        helper=counter + "\n",
+    )
+    result = run_daemon()
+    result.assert_outcomes(passed=4)
+    assert imports(pytester, "good") == 1
+    assert imports(pytester, "bad") == 3
+    assert imports(pytester, "dependent") == 2
+
+
+def test_daemon_new_module(run_daemon, pytester):
+    pytester.makepyfile(good="", bad="import foo_missing")
+    result = run_daemon()
+    result.assert_outcomes(passed=1, failed=1)
+    pytester.makepyfile(foo_missing="")
+    result = run_daemon()
+    result.assert_outcomes(passed=3)
+
+
+def test_daemon_shadowing(run_daemon, pytester):
+    pytester.makepyfile(good="import json")
+    sub = pytester.mkpydir("sub")
+    result = run_daemon()
+    result.assert_outcomes(passed=2)
+    # a new module shadowing a module loaded from outside root
+    pytester.makepyfile(json="1 / 0")
+    (sub / "other.py").write_text("")
+    result = run_daemon()
+    result.assert_outcomes(passed=2, failed=2)
+
+
+def test_daemon_stop_not_running(run, pytester):
+    pytester.makepyfile(good="")
+    result = run("--import-check-daemon-stop", "--import-check-workers=2")
+    result.stdout.fnmatch_lines(["*import-check daemon was not running*"])
+
+
+def test_daemon_insecure_directory(run, pytester, runtime_dir):
+    (runtime_dir / "pytest-import-check").mkdir(mode=0o755)
+    (runtime_dir / "pytest-import-check").chmod(0o755)
+    pytester.makepyfile(good="")
+    result = run("--import-check-daemon", "--import-check-workers=2")
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines([
+        ("ERROR: */pytest-import-check is not a directory owned by the "
+         "current user with 0700 permissions"),
+    ])
+
+
+def test_daemon_start_failure(run, pytester, monkeypatch):
+    starts = []
+    monkeypatch.setattr(pytest_import_check.daemon, "START_TIMEOUT", 0.1)
+    monkeypatch.setattr(pytest_import_check.daemon, "start_daemon",
+                        lambda *args: starts.append(args))
+    pytester.makepyfile(**{f"mod{i}": "" for i in range(5)})
+    result = run("--import-check-daemon", "--import-check-workers=2")
+    result.assert_outcomes(failed=5)
+    result.stdout.fnmatch_lines(["*Daemon did not start, see *.log*"])
+    # the daemon is started only once, rather than for every module
+    assert len(starts) == 1
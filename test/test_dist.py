@@ -0,0 +1,133 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import pytest
+
+
+@pytest.fixture
+def site(pytester):
+    site = pytester.mkdir("site")
+    pytester.syspathinsert(site)
+
+    def install(name, files, record=True, top_level=None, editable=None):
+        dist_info = site / f"{name}-1.0.dist-info"
+        dist_info.mkdir()
+        (dist_info / "METADATA").write_text(
+            f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n")
+        if editable is not None:
+            (dist_info / "direct_url.json").write_text(
+                f'{{"dir_info": {{"editable": true}}, '
+                f'"url": "{editable.as_uri()}"}}')
+        for path, content in files.items():
+            (site / path).parent.mkdir(parents=True, exist_ok=True)
+            (site / path).write_text(content)
+        if record:
+            (dist_info / "RECORD").write_text(
+                "".join(f"{x},,\n" for x in [
+                    *files, f"{name}-1.0.dist-info/METADATA",
+                    "../../bin/script"]))
+        if top_level is not None:
+            (dist_info / "top_level.txt").write_text(
+                "".join(f"{x}\n" for x in top_level))
+
+    yield install
+
+
+def test_dist(run, pytester, site):
+    site("Foo_Bar", {
+        "foo/__init__.py": "",
+        "foo/good.py": "import foo.other",
+        "foo/other.py": "",
+        "foo/bad.py": "import nonexistent",
+        "foo/data/not-a-module.py": "import nonexistent",
+        "foo_mod.py": "",
+    })
+    site("unrelated", {"unrelated.py": "import nonexistent"})
+    # not listed in RECORD
+    (pytester.path / "site/foo/stray.py").write_text("import nonexistent")
+    # not collected without explicit paths
+    pytester.makepyfile(local="import nonexistent")
+    result = run("-p", "no:python", "--import-check-dist=foo-bar")
+    result.assert_outcomes(passed=4, failed=1)
+    result.stdout.fnmatch_lines([
+        "foo/__init__.py::import-check*PASSED*",
+        "foo/good.py::import-check*PASSED*",
+        "foo/other.py::import-check*PASSED*",
+        "foo/bad.py::import-check*FAILED*",
+        "foo_mod.py::import-check*PASSED*",
+    ])
+
+
+def test_dist_explicit_paths(run, pytester, site):
+    site("foo", {"foo.py": ""})
+    pytester.makepyfile(local="")
+    result = run("-p", "no:python", "--import-check-dist=foo",
+                 "local.py")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines([
+        "local.py::import-check*PASSED*",
+        "foo.py::import-check*PASSED*",
+    ])
+
+
+def test_dist_workers(run, pytester, site):
+    site("foo", {
+        "foo/__init__.py": "",
+        "foo/good.py": "",
+        "foo/bad.py": "import nonexistent",
+    })
+    result = run("-p", "no:python", "--import-check-dist=foo",
+                 "--import-check-workers=2")
+    result.assert_outcomes(passed=2, failed=1)
+    result.stdout.fnmatch_lines([
+        "foo/bad.py::import-check*FAILED*",
+    ])
+
+
+def test_dist_top_level(run, pytester, site):
+    site("foo", {
+        "foo/__init__.py": "",
+        "foo/bar.py": "",
+        "foo_mod.py": "",
+    }, record=False, top_level=["foo", "foo_mod"])
+    result = run("-p", "no:python", "--import-check-dist=foo")
+    result.assert_outcomes(passed=3)
+
+
+def test_dist_not_installed(run, pytester, site):
+    site("foo", {"foo.py": ""})
+    result = run("--import-check-dist=foo,bar,baz")
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines([
+        "ERROR: Distributions not installed: bar, baz",
+    ])
+
+
+@pytest.mark.parametrize("top_level", [None, ["foo_bar"]])
+def test_dist_editable(run, pytester, site, top_level):
+    src = pytester.mkdir("src")
+    pkg = src / "foo_bar"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("")
+    (pkg / "good.py").write_text("")
+    (pkg / "bad.py").write_text("import nonexistent")
+    # the path added by the .pth file
+    pytester.syspathinsert(src)
+    site("foo-bar", {"__editable__.foo_bar-1.0.pth": str(src)},
+         top_level=top_level, editable=pytester.path)
+    result = run("-p", "no:python", "--import-check-dist=foo-bar")
+    result.assert_outcomes(passed=2, failed=1)
+    result.stdout.fnmatch_lines([
+        "foo_bar/__init__.py::import-check*PASSED*",
+        "foo_bar/bad.py::import-check*FAILED*",
+        "foo_bar/good.py::import-check*PASSED*",
+    ])
+
+
+def test_dist_no_modules(run, pytester, site):
+    site("foo", {"foo.pth": ""})
+    result = run("--import-check-dist=foo")
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines([
+        "ERROR: No modules found in distribution foo",
+    ])
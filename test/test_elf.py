@@ -0,0 +1,54 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import math
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from pytest_import_check.elf import (
+    check_extension,
+    interpreter_symbols,
+    read_elf,
+)
+
+
+@pytest.fixture
+def math_ext():
+    path = getattr(math, "__file__", None)
+    if path is None or read_elf(path) is None:
+        pytest.skip("math is not an ELF extension module")
+    if "libm.so.6" not in read_elf(path).needed:
+        pytest.skip("math extension does not link to libm.so.6")
+    yield Path(path)
+
+
+def test_not_elf(tmp_path):
+    path = tmp_path / "foo.so"
+    path.write_bytes(b"not an ELF file")
+    assert read_elf(str(path)) is None
+    assert check_extension(path) is None
+
+
+def test_interpreter_symbols():
+    if read_elf(os.path.realpath(sys.executable)) is None:
+        pytest.skip("Python executable is not an ELF file")
+    symbols = interpreter_symbols()
+    assert symbols is None or "PyModule_Create2" in symbols
+
+
+def test_extension(math_ext):
+    assert check_extension(math_ext) is None
+
+
+def test_missing_library(math_ext, tmp_path):
+    path = tmp_path / math_ext.name
+    shutil.copy(math_ext, path)
+    # rename the needed library in the string table
+    data = path.read_bytes()
+    path.write_bytes(data.replace(b"libm.so.6\0", b"libX.so.6\0"))
+    assert check_extension(path) == (f"{path}: library 'libX.so.6' "
+                                     f"not found")
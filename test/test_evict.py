@@ -0,0 +1,101 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import importlib
+import importlib.machinery
+import sys
+import types
+
+import pytest
+
+from pytest_import_check.evict import ModuleEvictor
+
+
+@pytest.fixture
+def packages(tmp_path, monkeypatch):
+    for name in ("pkg_a", "pkg_b", "pkg_c"):
+        pkg = tmp_path / name
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("from . import sub")
+        (pkg / "sub.py").write_text("")
+    monkeypatch.syspath_prepend(tmp_path)
+    monkeypatch.setattr(sys, "modules", dict(sys.modules))
+
+
+def fake_extension(name):
+    module = types.ModuleType(name)
+    module.__spec__ = importlib.machinery.ModuleSpec(
+        name, importlib.machinery.ExtensionFileLoader(name, f"{name}.so"))
+    sys.modules[name] = module
+
+
+def test_evict_lru(packages):
+    evictor = ModuleEvictor(max_modules=len(sys.modules) + 5,
+                            max_memory=None)
+    for name in ("pkg_a", "pkg_b", "pkg_c"):
+        evictor.enter(name)
+        importlib.import_module(name)
+    evictor.enter(None)
+    # pkg_a had to be evicted to get below 5 new modules
+    assert "pkg_a" not in sys.modules
+    assert "pkg_a.sub" not in sys.modules
+    assert {"pkg_b", "pkg_b.sub", "pkg_c", "pkg_c.sub"} <= set(sys.modules)
+    assert evictor.evicted == 2
+
+    # evicted modules can be imported again
+    evictor.enter("pkg_a")
+    assert importlib.import_module("pkg_a").sub is sys.modules["pkg_a.sub"]
+
+
+def test_evict_extension_pinned(packages):
+    evictor = ModuleEvictor(max_modules=len(sys.modules), max_memory=None)
+    evictor.enter("pkg_a")
+    importlib.import_module("pkg_a")
+    fake_extension("pkg_a._ext")
+    evictor.enter("pkg_b")
+    importlib.import_module("pkg_b")
+    evictor.enter(None)
+    assert {"pkg_a", "pkg_a.sub", "pkg_a._ext"} <= set(sys.modules)
+    assert "pkg_b" not in sys.modules
+
+
+def test_evict_protected(packages):
+    importlib.import_module("pkg_a")
+    evictor = ModuleEvictor(max_modules=0, max_memory=None)
+    evictor.enter("pkg_a")
+    importlib.import_module("pkg_a.sub")
+    evictor.enter(None)
+    assert evictor.evicted == 0
+
+
+def test_evict_blocked(packages):
+    evictor = ModuleEvictor(max_modules=len(sys.modules), max_memory=None)
+    evictor.enter("pkg_a")
+    importlib.import_module("pkg_a")
+    # blocking a submodule that the package does not have as an attribute
+    sys.modules["pkg_a.blocked"] = None
+    evictor.enter("pkg_b")
+    evictor.enter(None)
+    assert "pkg_a" not in sys.modules
+    assert "pkg_a.blocked" not in sys.modules
+
+
+def test_evict_plugin(run, pytester):
+    for name in ("pkg_a", "pkg_b", "pkg_c"):
+        pkg = pytester.mkpydir(name)
+        (pkg / "mod.py").write_text("import pkg_a.mod")
+    pytester.makeini("""
+        [pytest]
+        import_check_evict_modules = 1
+    """)
+    result = run()
+    result.assert_outcomes(passed=6)
+
+
+def test_evict_invalid(run, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_evict_memory = lots
+    """)
+    result = run()
+    result.stderr.fnmatch_lines(["*import_check_evict_memory: invalid size*"])
@@ -0,0 +1,87 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import pytest
+
+
+@pytest.fixture(params=[[], ["--import-check-workers=2"]],
+                ids=["in-process", "workers"])
+def run_footprint(run, request, pytester):
+    pkg = pytester.mkpydir("heavy")
+    (pkg / "core.py").write_text("import heavy.a\nimport heavy.b")
+    (pkg / "a.py").write_text("")
+    (pkg / "b.py").write_text("")
+    pytester.makepyfile(
+        cli="import heavy.core",
+        lean="",
+    )
+
+    def inner(*args):
+        return run(*request.param, *args)
+    yield inner
+
+
+def test_footprint(run_footprint):
+    result = run_footprint("--import-check-footprint=1")
+    result.assert_outcomes(passed=6)
+    result.stdout.fnmatch_lines([
+        "*= top 1 module imports by footprint =*",
+        "4 modules * cli.py::import-check",
+        "    heavy (4)",
+    ])
+
+
+def test_footprint_max(run_footprint, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_max_footprint = 2
+    """)
+    result = run_footprint()
+    result.assert_outcomes(passed=5, failed=1)
+    result.stdout.fnmatch_lines([
+        ("*Importing loaded 4 modules, more than "
+         "import_check_max_footprint = 2: heavy (4)"),
+    ])
+
+
+def test_footprint_lazy(run_footprint, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_lazy_modules =
+            heavy.a
+            json
+    """)
+    result = run_footprint()
+    result.assert_outcomes(passed=5, failed=1)
+    result.stdout.fnmatch_lines([
+        "cli.py::import-check*FAILED*",
+        ("*Importing loaded modules listed in import_check_lazy_modules: "
+         "heavy.a"),
+    ])
+
+
+def test_footprint_invalid(run, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_max_footprint = many
+    """)
+    result = run()
+    result.stderr.fnmatch_lines(
+        ["*import_check_max_footprint: invalid number 'many'*"])
+
+
+def test_footprint_own_package(run, pytester):
+    pkg = pytester.mkpydir("heavy")
+    (pkg / "core.py").write_text("import heavy.a")
+    (pkg / "a.py").write_text("")
+    pytester.makeini("""
+        [pytest]
+        import_check_max_footprint = 1
+    """)
+    result = run("--import-check-workers=2", "--import-check-footprint=0")
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines([
+        "*= module imports by footprint =*",
+        "1 modules * heavy/core.py::import-check",
+        "    heavy (1)",
+    ])
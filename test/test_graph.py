@@ -0,0 +1,129 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import pytest
+
+from pytest_import_check.graph import ImportGraph
+
+
+def test_graph_dependencies(tmp_path):
+    pkg = tmp_path / "pkg"
+    pkg.mkdir()
+    files = {
+        "pkg/__init__.py": "from . import sub",
+        "pkg/sub.py": "from .. import other\nfrom .helper import x",
+        "pkg/helper.py": "import os\ntry:\n    import pkg.sub\n"
+                         "except ImportError:\n    pass",
+        "other.py": "import pkg.helper\ndef f():\n    import pkg",
+    }
+    graph = ImportGraph()
+    for name, code in files.items():
+        path = tmp_path / name
+        path.write_text(code)
+        graph.add(name.removesuffix(".py").removesuffix("/__init__")
+                  .replace("/", "."), path)
+    graph.build()
+    pkg, sub, helper, other = (tmp_path / x for x in files)
+    assert graph.dependencies == {
+        pkg: {sub},
+        sub: {pkg, helper},
+        helper: set(),
+        other: {pkg, helper},
+    }
+    assert graph.order([other, pkg, helper, sub]) == [helper, sub, pkg, other]
+    # only the requested paths are returned
+    assert graph.order([other, pkg]) == [pkg, other]
+
+
+@pytest.fixture(params=[[], ["--import-check-workers=2"]],
+                ids=["in-process", "workers"])
+def run_graph(run, request, pytester):
+    pytester.makepyfile(
+        a_top="import b_mid",
+        b_mid="import c_leaf",
+        c_leaf="raise RuntimeError('broken')",
+        d_independent="",
+    )
+
+    def inner(*args):
+        return run("--import-check-graph", *request.param, *args)
+    yield inner
+
+
+def test_graph_blocked(run_graph):
+    result = run_graph()
+    result.assert_outcomes(passed=1, failed=3)
+    result.stdout.fnmatch_lines([
+        "c_leaf.py::import-check*FAILED*",
+        "b_mid.py::import-check*FAILED*",
+        "a_top.py::import-check*FAILED*",
+        "d_independent.py::import-check*PASSED*",
+        "*RuntimeError: broken",
+        "*b_mid.py:*blocked by c_leaf",
+        "*a_top.py:*blocked by c_leaf",
+    ])
+    # no tracebacks from the blocked modules
+    result.stdout.no_fnmatch_line("*import c_leaf*")
+
+
+def test_graph_blocked_skip(run_graph, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_blocked = skip
+    """)
+    result = run_graph()
+    result.assert_outcomes(passed=1, failed=1, skipped=2)
+    result.stdout.fnmatch_lines([
+        "c_leaf.py::import-check*FAILED*",
+        "b_mid.py::import-check SKIPPED (blocked by c_leaf)*",
+        "a_top.py::import-check SKIPPED (blocked by c_leaf)*",
+    ])
+
+
+def test_graph_blocked_invalid(run, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_blocked = maybe
+    """)
+    result = run("--import-check-graph")
+    result.stderr.fnmatch_lines(["*import_check_blocked: invalid value*"])
+
+
+def test_graph_same_name(run, pytester, import_mode):
+    if import_mode != "prepend":
+        pytest.skip("module names are unique in importlib mode")
+    # both files are the top-level "mod" module
+    for directory in ("a", "b"):
+        pytester.mkdir(directory)
+        (pytester.path / directory / "mod.py").write_text("")
+    result = run("--import-check-graph", "-p", "no:python")
+    outcomes = result.parseoutcomes()
+    assert outcomes.get("passed", 0) + outcomes.get("failed", 0) == 2
+    # every module is checked exactly once
+    checked = [line.split()[0] for line in result.outlines
+               if line.endswith("%]")]
+    assert checked == ["a/mod.py::import-check", "b/mod.py::import-check"]
+
+
+def test_graph_stored(tmp_path):
+    path = tmp_path / "mod.py"
+    path.write_text("import other")
+    graph = ImportGraph()
+    graph.add("mod", path)
+    graph.build()
+    assert graph.imports == {path: {"other"}}
+    entries = graph.entries()
+
+    # unchanged files are not parsed again
+    entries[str(path)][3:] = [["cached"], []]
+    graph = ImportGraph(entries)
+    graph.add("mod", path)
+    graph.build()
+    assert graph.imports == {path: {"cached"}}
+    assert graph.required == {path: set()}
+
+    path.write_text("import another")
+    graph = ImportGraph(entries)
+    graph.add("mod", path)
+    graph.build()
+    assert graph.imports == {path: {"another"}}
@@ -0,0 +1,158 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import importlib.util
+import sys
+
+import pytest
+
+from pytest_import_check.importer import (
+    CouldNotResolvePathError,
+    DirectoryIndex,
+    ImportPathMismatchError,
+    IndexedRootFinder,
+    SpecCache,
+    compute_module_name,
+    import_path,
+    module_name_from_path,
+    resolve_package_path,
+    resolve_pkg_root_and_module_name,
+)
+from pytest_import_check.runner import CheckOptions, check_isolated
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for path in ["src/a/__init__.py", "src/a/b/__init__.py", "src/a/b/m.py",
+                 "src/a/b/c/__init__.py", "src/a/b/c/m.py", "ns/x/y.py",
+                 ".env.3/p/__init__.py", ".env.3/p/q.py", "top.py",
+                 "not-ident/__init__.py", "not-ident/m.py"]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+    yield tmp_path
+
+
+def resolve(path, **kwargs):
+    try:
+        return resolve_pkg_root_and_module_name(path, **kwargs)
+    except CouldNotResolvePathError:
+        return None
+
+
+def test_directory_index(tree):
+    index = DirectoryIndex()
+    paths = [*tree.rglob("*"), tree, tree / "missing.py"]
+    roots = [tree, tree / "src", tree / "src/a", tree / "top", tree / "other"]
+    for path in paths:
+        assert index.exists(path) == path.exists()
+        assert (resolve_package_path(path, index=index) ==
+                resolve_package_path(path))
+        if path.suffix != ".py":
+            continue
+        for namespace in (False, True):
+            assert (resolve(path, consider_namespace_packages=namespace,
+                            index=index) ==
+                    resolve(path, consider_namespace_packages=namespace))
+        for root in roots:
+            assert (compute_module_name(root, path, index=index) ==
+                    compute_module_name(root, path))
+            assert (module_name_from_path(path, root, index=index) ==
+                    module_name_from_path(path, root))
+
+
+@pytest.fixture
+def import_state(monkeypatch):
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    monkeypatch.setattr(sys, "meta_path", list(sys.meta_path))
+    monkeypatch.setattr(sys, "modules", dict(sys.modules))
+
+
+@pytest.mark.parametrize("mode", ["prepend", "append"])
+def test_indexed_root_finder(tmp_path, import_state, mode):
+    for path in ["one/mod_a.py", "one/shared.py", "two/mod_b.py",
+                 "two/shared.py", "two/pkg_c/__init__.py", "two/pkg_c/sub.py"]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(f"origin = {path!r}")
+    finder = IndexedRootFinder(append=mode == "append")
+    old_path = list(sys.path)
+
+    def imp(path):
+        return import_path(tmp_path / path, mode=mode, root=tmp_path,
+                           consider_namespace_packages=False,
+                           root_finder=finder)
+
+    assert imp("one/mod_a.py").origin == "one/mod_a.py"
+    assert imp("two/pkg_c/sub.py").origin == "two/pkg_c/sub.py"
+    assert sys.path == old_path
+    assert finder in sys.meta_path
+    assert finder.find_spec("json", None) is None
+    # the first root in sys.path order wins
+    if mode == "append":
+        assert imp("one/shared.py").origin == "one/shared.py"
+        with pytest.raises(ImportPathMismatchError):
+            imp("two/shared.py")
+    else:
+        assert imp("two/shared.py").origin == "two/shared.py"
+        del sys.modules["shared"]
+        assert imp("one/shared.py").origin == "one/shared.py"
+
+
+def test_indexed_root_finder_isolated(tmp_path, import_state):
+    (tmp_path / "one").mkdir()
+    (tmp_path / "one/mod_a.py").write_text("")
+    (tmp_path / "two").mkdir()
+    (tmp_path / "two/mod_b.py").write_text("import mod_a")
+    finder = IndexedRootFinder()
+    options = CheckOptions(mode="prepend",
+                           root=tmp_path,
+                           consider_namespace_packages=False,
+                           root_finder=finder)
+    assert check_isolated(tmp_path / "one/mod_a.py", options).error is None
+    # the root of the earlier check is not visible anymore
+    result = check_isolated(tmp_path / "two/mod_b.py", options)
+    assert "No module named 'mod_a'" in result.error
+    assert finder.find_spec("mod_a", None) is None
+
+
+def test_spec_cache(tree, import_state, monkeypatch):
+    calls = []
+    find_spec = importlib.util.find_spec
+
+    def counting_find_spec(name, *args):
+        calls.append(name)
+        return find_spec(name, *args)
+
+    monkeypatch.setattr(importlib.util, "find_spec", counting_find_spec)
+    sys.path.insert(0, str(tree / "ns"))
+    spec_cache = SpecCache()
+    paths = list(tree.rglob("*.py"))
+    for path in paths:
+        assert (resolve(path, consider_namespace_packages=True,
+                        spec_cache=spec_cache) ==
+                resolve(path, consider_namespace_packages=True))
+    assert calls
+    calls.clear()
+    for path in paths:
+        resolve(path, consider_namespace_packages=True,
+                spec_cache=spec_cache)
+    assert calls == []
+
+    # changing sys.path invalidates the cache
+    sys.path.insert(0, str(tree / "src"))
+    assert (resolve(tree / "src/a/b/m.py", consider_namespace_packages=True,
+                    spec_cache=spec_cache) == (tree / "src", "a.b.m"))
+    assert calls != []
+
+
+def test_spec_cache_root_finder(tmp_path, import_state):
+    (tmp_path / "one").mkdir()
+    (tmp_path / "two").mkdir()
+    (tmp_path / "two/shared.py").write_text("")
+    finder = IndexedRootFinder()
+    finder.add(tmp_path / "one")
+    finder.install()
+    spec_cache = SpecCache()
+    assert not spec_cache.is_importable("shared", tmp_path / "two/shared.py")
+    # adding a root invalidates the cache
+    finder.add(tmp_path / "two")
+    assert spec_cache.is_importable("shared", tmp_path / "two/shared.py")
@@ -0,0 +1,77 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import concurrent.futures
+
+import pytest
+
+from pytest_import_check.engine import InterpreterPool, interpreters_available
+from pytest_import_check.runner import CheckOptions
+
+requires_interpreters = pytest.mark.skipif(
+    not interpreters_available(),
+    reason="InterpreterPoolExecutor not available")
+
+
+@requires_interpreters
+def test_interpreters(run, pytester):
+    pytester.makepyfile(
+        good="import json",
+        bad="import nonexistent_module_xyz",
+        # every module is imported with a clean state
+        sets="import json\njson.imported_by_sets = True",
+        uses="import json\nassert not hasattr(json, 'imported_by_sets')",
+    )
+    result = run("--import-check-interpreters=2")
+    result.assert_outcomes(passed=3, failed=1)
+    result.stdout.fnmatch_lines([
+        "bad.py::import-check*FAILED*",
+        "*ModuleNotFoundError: No module named 'nonexistent_module_xyz'",
+    ])
+
+
+@pytest.mark.skipif(interpreters_available(),
+                    reason="InterpreterPoolExecutor available")
+def test_interpreters_unavailable(run, pytester):
+    pytester.makepyfile(good="")
+    result = run("--import-check-interpreters=2")
+    result.stderr.fnmatch_lines(
+        ["*--import-check-interpreters requires Python 3.14 or newer*"])
+
+
+def test_interpreters_threads(run, pytester):
+    pytester.makepyfile(good="")
+    result = run("--import-check-interpreters=2", "--import-check-threads=2")
+    result.stderr.fnmatch_lines(
+        [("*--import-check-interpreters and --import-check-threads can not "
+          "be combined*")])
+
+
+def test_interpreters_timeout(tmp_path, monkeypatch):
+    # processes can stand in for sub-interpreters that can not be killed
+    monkeypatch.setattr(concurrent.futures, "InterpreterPoolExecutor",
+                        concurrent.futures.ProcessPoolExecutor,
+                        raising=False)
+    slow, good, bad = (tmp_path / f"{x}.py" for x in ("slow", "good", "bad"))
+    # can not be interrupted, as in sub-interpreters
+    slow.write_text("import signal, time\n"
+                    "signal.pthread_sigmask(signal.SIG_BLOCK, "
+                    "{signal.SIGALRM})\n"
+                    "time.sleep(2)\n")
+    good.write_text("")
+    bad.write_text("import nonexistent_module_xyz")
+    pool = InterpreterPool(CheckOptions(mode="prepend",
+                                        root=tmp_path,
+                                        consider_namespace_packages=False,
+                                        timeout=0.1),
+                           workers=2)
+    try:
+        pool.submit([[slow], [good, bad]])
+        results = [pool.result(path) for path in (slow, good, bad)]
+    finally:
+        pool.close()
+    assert results[0].error == ("Import timed out after 0.1s per module, "
+                                "and the sub-interpreter could not be "
+                                "interrupted")
+    assert results[1].error is None
+    assert "nonexistent_module_xyz" in results[2].error
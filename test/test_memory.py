@@ -0,0 +1,68 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import re
+
+import pytest
+
+
+@pytest.fixture(params=[[], ["--import-check-workers=2"]],
+                ids=["in-process", "workers"])
+def run_memory(run, request, pytester):
+    pytester.makepyfile(
+        big="table = [bytes(1024) for i in range(10 * 1024)]",
+        small="",
+    )
+
+    def inner(*args):
+        return run(*request.param, *args)
+    yield inner
+
+
+def test_memory_summary(run_memory):
+    result = run_memory("--import-check-memory=0")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines([
+        "*= module imports by memory =*",
+        "* MiB allocated * MiB peak * rss   big.py::import-check",
+        "* allocated * peak * rss   small.py::import-check",
+    ])
+    line = next(x for x in result.stdout.lines
+                if x.endswith("big.py::import-check")
+                and "allocated" in x)
+    assert float(re.match(r"(\S+) MiB", line).group(1)) >= 10
+
+
+def test_max_memory(run_memory, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_max_memory = 1M
+    """)
+    result = run_memory()
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        "big.py::import-check*FAILED*",
+        "small.py::import-check*PASSED*",
+        "Importing allocated * MiB, more than import_check_max_memory = 1M",
+    ])
+
+
+def test_memory_no_timing(run_memory, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_max_time = 0.000001
+    """)
+    result = run_memory("--import-check-memory=0",
+                        "--import-check-durations=0", "--junitxml=out.xml")
+    # import times are distorted by tracemalloc, so they are not used
+    result.assert_outcomes(passed=2)
+    assert "import_check_wall" not in (pytester.path / "out.xml").read_text()
+
+
+def test_max_memory_invalid(run, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_max_memory = lots
+    """)
+    result = run()
+    result.stderr.fnmatch_lines(["*import_check_max_memory: invalid size*"])
@@ -0,0 +1,124 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import pytest
+
+from pytest_import_check.patterns import PathMatcher
+
+
+@pytest.mark.parametrize(
+    "pattern,path,expected",
+    [("setup.py", "setup.py", True),
+     ("setup.py", "sub/setup.py", True),
+     ("setup.py", "setup.pyi", False),
+     ("/setup.py", "sub/setup.py", False),
+     ("*.py", "foo/bar.py", True),
+     ("build", "build", True),
+     ("build/", "foo/build", True),
+     ("build", "build/foo/bar.py", True),
+     ("build", "builder/foo.py", False),
+     ("foo/*.py", "foo/bar.py", True),
+     ("foo/*.py", "foo/bar/baz.py", False),
+     ("foo/**/*.py", "foo/bar/baz.py", True),
+     ("foo/**/*.py", "foo/baz.py", True),
+     ("foo/**", "foo/bar/baz.py", True),
+     ("mod?.py", "mod1.py", True),
+     ("mod?.py", "mod10.py", False),
+     ("mod[0-4].py", "mod1.py", True),
+     ("mod[!0-4].py", "mod1.py", False),
+     ("mod[.py", "mod[.py", True),
+     ])
+def test_path_matcher(pattern, path, expected):
+    assert PathMatcher([pattern]).match(path) is expected
+
+
+def test_path_matcher_multiple():
+    matcher = PathMatcher(["node_modules", "/build", "*_pb2.py"])
+    assert matcher
+    assert matcher.match("web/node_modules")
+    assert matcher.match("build")
+    assert not matcher.match("src/build")
+    assert matcher.match("src/api_pb2.py")
+    assert not matcher.match("src/api.py")
+
+
+def test_path_matcher_empty():
+    matcher = PathMatcher([])
+    assert not matcher
+    assert not matcher.match("foo.py")
+
+
+def test_exclude(run, pytester):
+    pytester.makepyfile(good="", setup="import nonexistent")
+    build = pytester.mkdir("build")
+    # would fail collection, if the directory was walked
+    (build / "conftest.py").write_text("import nonexistent")
+    pytester.makeini("""
+        [pytest]
+        norecursedirs =
+        import_check_exclude =
+            setup.py
+            /build
+    """)
+    result = run("-p", "no:python")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["good.py::import-check*PASSED*"])
+
+
+def test_exclude_regular_tests(run, pytester):
+    tests = pytester.mkdir("tests")
+    (tests / "test_a.py").write_text("def test_x(): pass\n")
+    (tests / "helper.py").write_text("import nonexistent")
+    pytester.makeini("""
+        [pytest]
+        import_check_exclude =
+            tests
+    """)
+    result = run()
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["tests/test_a.py::test_x PASSED*"])
+
+
+def test_include(run, pytester):
+    pytester.makepyfile(bad="import nonexistent")
+    foo = pytester.mkpydir("foo")
+    (foo / "bar.py").write_text("")
+    (foo / "baz.py").write_text("import nonexistent")
+    pytester.makeini("""
+        [pytest]
+        import_check_include =
+            foo/**
+        import_check_exclude =
+            baz.py
+    """)
+    result = run()
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines([
+        "foo/__init__.py::import-check*PASSED*",
+        "foo/bar.py::import-check*PASSED*",
+    ])
+
+
+def test_skip_scripts(run, pytester):
+    pytester.makepyfile(
+        good="",
+        script="""
+        import nonexistent
+
+        if __name__ == "__main__":
+            pass
+        """)
+    foo = pytester.mkpydir("foo")
+    (foo / "__main__.py").write_text(
+        "if __name__ == '__main__':\n    pass\n")
+    pytester.makeini("""
+        [pytest]
+        import_check_skip_scripts = true
+    """)
+    result = run()
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines([
+        "foo/__init__.py::import-check*PASSED*",
+        "foo/__main__.py::import-check*PASSED*",
+        "good.py::import-check*PASSED*",
+    ])
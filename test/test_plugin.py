@@ -81,6 +81,19 @@ def test_package_absolute_imports_src(run, pytester,
     ])
 
 
+def test_indexed_roots(run, pytester, consider_namespace_packages):
+    if consider_namespace_packages == "true":
+        pytest.skip("consider_namespace_packages=true makes roots namespaces")
+    for root in ("one", "two"):
+        pytester.mkdir(root)
+        pkg = pytester.mkpydir(f"{root}/pkg_{root}")
+        (pkg / "mod.py").write_text(f"import pkg_{root}.other")
+        (pkg / "other.py").write_text("import json")
+    (pytester.path / "two" / "top.py").write_text("import pkg_one.mod")
+    result = run("--import-check-indexed-roots")
+    result.assert_outcomes(passed=7)
+
+
 def test_package_relative_imports(run, pytester):
     foo = pytester.mkpydir("foo")
     (foo / "foo.py").write_text("from . import bar")
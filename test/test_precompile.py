@@ -0,0 +1,92 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import importlib.util
+import py_compile
+import sys
+from pathlib import Path
+
+from pytest_import_check.precompile import precompile, precompile_file
+from pytest_import_check.static import POOL_THRESHOLD
+
+
+def test_precompile_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    path = tmp_path / "mod.py"
+    path.write_text("x = 1")
+    cfile = importlib.util.cache_from_source(str(path))
+    assert precompile_file(path) is None
+    with open(cfile, "rb") as f:
+        data = f.read()
+    # up-to-date bytecode is not rewritten
+    assert precompile_file(path) is None
+    with open(cfile, "rb") as f:
+        assert f.read() == data
+
+
+def test_precompile_hash_based(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    path = tmp_path / "mod.py"
+    path.write_text("x = 1")
+    cfile = importlib.util.cache_from_source(str(path))
+    py_compile.compile(
+        str(path), cfile,
+        invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+    with open(cfile, "rb") as f:
+        data = f.read()
+    # hash-based bytecode is not replaced with timestamp-based
+    assert precompile_file(path) is None
+    with open(cfile, "rb") as f:
+        assert f.read() == data
+
+
+def test_precompile_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    paths = []
+    for i in range(POOL_THRESHOLD):
+        paths.append(tmp_path / f"mod{i}.py")
+        paths[-1].write_text(f"x = {i}")
+    assert precompile(paths, 2) == {}
+    assert all(Path(importlib.util.cache_from_source(str(x))).exists()
+               for x in paths)
+
+
+def test_precompile_invalid(tmp_path):
+    path = tmp_path / "bad.py"
+    path.write_text("def foo(:")
+    assert precompile([path], 1) == {}
+
+
+def test_precompile_unwritable(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    path = tmp_path / "mod.py"
+    path.write_text("x = 1")
+    code = precompile([path], 1)
+    assert list(code) == [str(path)]
+    assert not (tmp_path / "__pycache__").exists()
+
+
+def test_plugin(run, pytester, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    pytester.makepyfile(
+        good="",
+        bad="def foo(:",
+    )
+    result = run("--import-check-precompile")
+    result.assert_outcomes(passed=1, failed=1)
+    assert (pytester.path / importlib.util.cache_from_source("good.py")
+            ).exists()
+
+
+def test_plugin_code_cache(run, pytester, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    pytester.makepyfile(
+        cached="""
+            loader = getattr(__loader__, "_loader", __loader__)
+            assert type(loader).__name__ == "CachedSourceFileLoader"
+        """,
+    )
+    path_hooks = list(sys.path_hooks)
+    result = run("--import-check-precompile")
+    result.assert_outcomes(passed=1)
+    assert sys.path_hooks == path_hooks
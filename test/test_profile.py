@@ -0,0 +1,65 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import json
+
+import pytest
+
+
+@pytest.fixture(params=[[], ["--import-check-workers=2"]],
+                ids=["in-process", "workers"])
+def run_profile(run, request, pytester):
+    pytester.makepyfile(
+        a_top="import b_mid",
+        b_mid="import c_leaf",
+        c_leaf="import time; time.sleep(0.05)",
+    )
+
+    def inner(*args):
+        return run(*request.param, *args)
+    yield inner
+
+
+def test_profile_speedscope(run_profile, pytester):
+    result = run_profile("--import-check-profile=profile.json")
+    result.assert_outcomes(passed=3)
+    data = json.loads((pytester.path / "profile.json").read_text())
+    frames = [frame["name"] for frame in data["shared"]["frames"]]
+    profiles = {profile["name"]: profile for profile in data["profiles"]}
+    assert set(profiles) >= {"a_top.py::import-check"}
+    stack = []
+    max_stack = []
+    for event in profiles["a_top.py::import-check"]["events"]:
+        if event["type"] == "O":
+            stack.append(frames[event["frame"]])
+            max_stack = max(max_stack, stack[:], key=len)
+        else:
+            assert stack.pop() == frames[event["frame"]]
+    assert stack == []
+    assert max_stack == ["a_top", "b_mid", "c_leaf"]
+
+
+def test_profile_collapsed(run_profile, pytester):
+    result = run_profile("--import-check-profile=profile.txt",
+                         "--import-check-profile-format=collapsed")
+    result.assert_outcomes(passed=3)
+    stacks = {}
+    for line in (pytester.path / "profile.txt").read_text().splitlines():
+        stack, weight = line.rsplit(" ", 1)
+        stacks[stack] = int(weight)
+    assert stacks["a_top.py::import-check;a_top;b_mid;c_leaf"] >= 50000
+    assert stacks["a_top.py::import-check;a_top;b_mid"] < 50000
+
+
+def test_profile_directory(run_profile, pytester):
+    pytester.mkdir("profiles")
+    result = run_profile("--import-check-profile=profiles",
+                         "--import-check-profile-format=collapsed")
+    result.assert_outcomes(passed=3)
+    files = sorted(x.name for x in (pytester.path / "profiles").iterdir())
+    assert files == ["a_top.py__import-check.txt",
+                     "b_mid.py__import-check.txt",
+                     "c_leaf.py__import-check.txt"]
+    lines = (pytester.path / "profiles/a_top.py__import-check.txt"
+             ).read_text()
+    assert "a_top;b_mid;c_leaf " in lines
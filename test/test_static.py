@@ -0,0 +1,134 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import pytest
+
+import pytest_import_check.plugin
+from pytest_import_check.static import POOL_THRESHOLD
+
+
+@pytest.fixture
+def run_static(run):
+    def inner(*args):
+        return run("--import-check-level=syntax", *args)
+    yield inner
+
+
+def test_not_executed(run_static, pytester):
+    pytester.makepyfile(
+        good="raise RuntimeError('executed')",
+    )
+    result = run_static()
+    result.assert_outcomes(passed=1)
+
+
+def test_syntax_error(run_static, pytester):
+    pytester.makepyfile(
+        bad="def foo(:\n    pass",
+        good="import os",
+    )
+    result = run_static()
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        "bad.py::import-check*FAILED*",
+        "good.py::import-check*PASSED*",
+        "*SyntaxError*",
+    ])
+
+
+def test_missing_import(run_static, pytester):
+    pytester.makepyfile(
+        bad="import os\nimport nonexistent_module_xyz",
+        badsub="import json.nonexistent_submodule",
+    )
+    result = run_static()
+    result.assert_outcomes(failed=2)
+    result.stdout.fnmatch_lines([
+        "*bad.py:2: module 'nonexistent_module_xyz' not found",
+        "*badsub.py:1: module 'json.nonexistent_submodule' not found",
+    ])
+
+
+def test_optional_imports(run_static, pytester):
+    pytester.makepyfile(
+        good="""
+            import sys
+            import typing
+
+            try:
+                import nonexistent_module_xyz
+            except ImportError:
+                nonexistent_module_xyz = None
+
+            if sys.version_info < (3, 0):
+                import nonexistent_py2_module
+
+            if typing.TYPE_CHECKING:
+                import nonexistent_stubs
+
+            def foo():
+                import nonexistent_lazy_module
+        """,
+        bad="""
+            import sys
+
+            if sys.version_info >= (3, 0):
+                import nonexistent_module_xyz
+        """,
+    )
+    result = run_static()
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        "bad.py::import-check*FAILED*",
+        "good.py::import-check*PASSED*",
+    ])
+
+
+def test_package(run_static, pytester):
+    pytester.makepyfile(**{
+        "pkg/__init__.py": "",
+        "pkg/sub.py": "import pkg.other\nfrom . import relative",
+        "pkg/other.py": "from pkg.nonexistent import foo",
+    })
+    result = run_static()
+    result.assert_outcomes(passed=2, failed=1)
+    result.stdout.fnmatch_lines([
+        "*module 'pkg.nonexistent' not found",
+    ])
+
+
+def test_xdist_worker(run_static, pytester, monkeypatch):
+    resolve = pytest_import_check.plugin.resolve_pkg_root_and_module_name
+    calls = []
+
+    def counting_resolve(path, **kwargs):
+        if "spec_cache" not in kwargs:
+            calls.append(path)
+        return resolve(path, **kwargs)
+
+    # xdist workers check their items one by one
+    monkeypatch.setattr(pytest_import_check.plugin, "is_xdist_worker",
+                        lambda config: True)
+    monkeypatch.setattr(pytest_import_check.plugin,
+                        "resolve_pkg_root_and_module_name", counting_resolve)
+    pytester.makepyfile(**{
+        "pkg/__init__.py": "",
+        "pkg/sub.py": "import pkg.other",
+        "pkg/other.py": "from pkg.nonexistent import foo",
+        "top.py": "import pkg.sub",
+    })
+    result = run_static()
+    result.assert_outcomes(passed=3, failed=1)
+    # the search path is found once, rather than for every item
+    assert len(calls) == 4
+
+
+def test_pool(pytester):
+    pytester.makepyfile(**{
+        f"mod{i}": "import os" for i in range(POOL_THRESHOLD)
+    }, bad="import nonexistent_module_xyz")
+    # the pool needs a fresh interpreter, as in-process runs of pytest
+    # reload concurrent.futures
+    result = pytester.runpytest_subprocess("--import-check-level=syntax",
+                                           "--import-check-workers=2")
+    result.assert_outcomes(passed=POOL_THRESHOLD, failed=1)
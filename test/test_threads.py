@@ -0,0 +1,104 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import sys
+
+import pytest
+
+import pytest_import_check.plugin
+from pytest_import_check.engine import ThreadPool
+from pytest_import_check.runner import CheckOptions
+
+
+@pytest.fixture(params=[False, True], ids=["gil", "free-threading"])
+def run_threads(run, request, pytester, monkeypatch):
+    # use threads even if the interpreter has a GIL
+    monkeypatch.setattr(pytest_import_check.plugin, "free_threading",
+                        lambda: request.param)
+    for name in ("pkg_a", "pkg_b"):
+        pkg = pytester.mkpydir(name)
+        (pkg / "good.py").write_text(f"import {name}.other")
+        (pkg / "other.py").write_text("")
+        (pkg / "bad.py").write_text("import nonexistent_module_xyz")
+
+    def inner(*args):
+        return run("--import-check-threads=2", *args)
+    yield inner
+
+
+def test_threads(run_threads):
+    result = run_threads()
+    result.assert_outcomes(passed=6, failed=2)
+    result.stdout.fnmatch_lines([
+        "pkg_a/bad.py::import-check*FAILED*",
+        "pkg_a/good.py::import-check*PASSED*",
+        "*ModuleNotFoundError: No module named 'nonexistent_module_xyz'",
+    ])
+
+
+def test_threads_workers(run, pytester):
+    pytester.makepyfile(good="")
+    result = run("--import-check-threads=2", "--import-check-workers=2")
+    result.stderr.fnmatch_lines(
+        [("*worker processes and --import-check-threads can not be "
+          "combined*")])
+
+
+def test_deadlock(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "modules", dict(sys.modules))
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    monkeypatch.syspath_prepend(tmp_path)
+    (tmp_path / "sync_barrier.py").write_text(
+        "import threading\nbarrier = threading.Barrier(2)\nstarted = set()")
+    # every module waits for the other one to start importing, and then
+    # imports it, while the other thread holds its module lock
+    for name, other in (("mod_a", "mod_b"), ("mod_b", "mod_a")):
+        (tmp_path / f"{name}.py").write_text(f"""
+import sync_barrier
+if {name!r} not in sync_barrier.started:
+    sync_barrier.started.add({name!r})
+    sync_barrier.barrier.wait(timeout=10)
+import {other}
+""")
+    paths = [tmp_path / "mod_a.py", tmp_path / "mod_b.py"]
+    pool = ThreadPool(CheckOptions(mode="prepend",
+                                   root=tmp_path,
+                                   consider_namespace_packages=False),
+                      threads=2)
+    try:
+        pool.submit([[path] for path in paths])
+        results = [pool.result(path) for path in paths]
+    finally:
+        pool.close()
+    assert [x.error for x in results] == [None, None]
+    assert [x.deadlock is not None for x in results].count(True) == 1
+
+
+def test_thread_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "modules", dict(sys.modules))
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    monkeypatch.syspath_prepend(tmp_path)
+    (tmp_path / "hang.py").write_text(
+        "import threading\nthreading.Event().wait(30)")
+    (tmp_path / "after.py").write_text("")
+    (tmp_path / "good.py").write_text("")
+    hang, after, good = (tmp_path / f"{x}.py"
+                         for x in ("hang", "after", "good"))
+    with open(tmp_path / "dump.txt", "w+") as dump_file:
+        pool = ThreadPool(CheckOptions(mode="prepend",
+                                       root=tmp_path,
+                                       consider_namespace_packages=False,
+                                       timeout=0.1),
+                          threads=2,
+                          dump_file=dump_file)
+        try:
+            pool.submit([[hang, after], [good]])
+            results = [pool.result(path) for path in (hang, after, good)]
+        finally:
+            pool.close()
+        dump_file.seek(0)
+        assert "hang.py" in dump_file.read()
+    assert results[0].error.startswith("Import timed out after 0.1s")
+    assert results[1].error == (f"Not checked, as importing {hang} "
+                                f"in the same thread timed out")
+    assert results[2].error is None
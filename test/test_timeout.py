@@ -0,0 +1,104 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import signal
+import threading
+import time
+
+import pytest
+
+from pytest_import_check.watchdog import import_timeout
+
+
+@pytest.fixture(params=[[], ["--import-check-workers=2"]],
+                ids=["in-process", "workers"])
+def run_timeout(run, request, pytester):
+    pytester.makepyfile(
+        good="",
+        sleep="import time\ntime.sleep(60)",
+        lock="import threading\nlock = threading.Lock()\n"
+             "lock.acquire()\nlock.acquire()",
+    )
+
+    def inner(*args):
+        return run(*request.param, *args)
+    yield inner
+
+
+def test_timeout(run_timeout):
+    result = run_timeout("--import-check-timeout=0.5")
+    result.assert_outcomes(passed=1, failed=2)
+    result.stdout.fnmatch_lines([
+        "good.py::import-check*PASSED*",
+        "lock.py::import-check*FAILED*",
+        "sleep.py::import-check*FAILED*",
+        "*lock.acquire()",
+        "*ImportTimeoutError: Import timed out after 0.5s",
+        "*time.sleep(60)",
+        "*ImportTimeoutError: Import timed out after 0.5s",
+    ])
+    result.stdout.no_fnmatch_line("*def handler*")
+
+
+def test_timeout_ini(run_timeout, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_timeout = 0.5
+    """)
+    result = run_timeout()
+    result.assert_outcomes(passed=1, failed=2)
+
+
+def test_timeout_invalid(run, pytester):
+    pytester.makeini("""
+        [pytest]
+        import_check_timeout = forever
+    """)
+    result = run()
+    result.stderr.fnmatch_lines(["*import_check_timeout: invalid number*"])
+
+
+@pytest.mark.skipif(not hasattr(signal, "pthread_sigmask"),
+                    reason="pthread_sigmask() not available")
+def test_timeout_kill(run, pytester):
+    pytester.makepyfile(
+        good="",
+        blocked="""
+            import signal
+            import time
+
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+            time.sleep(60)
+        """,
+        other="",
+    )
+    result = run("--import-check-workers=1", "--import-check-timeout=0.5")
+    result.assert_outcomes(passed=2, failed=1)
+    result.stdout.fnmatch_lines([
+        "blocked.py::import-check*FAILED*",
+        "good.py::import-check*PASSED*",
+        "other.py::import-check*PASSED*",
+        "Import timed out after 0.5s, and the worker process was killed.*",
+        "*blocked.py\", line 5 in <module>",
+    ])
+
+
+def test_timeout_dump_threads(tmp_path):
+    def slow():
+        with import_timeout(10, dump_after=0.2, dump_file=f):
+            time.sleep(0.5)
+
+    def fast():
+        with import_timeout(10, dump_after=0.2, dump_file=f):
+            pass
+
+    with open(tmp_path / "dump", "w+") as f:
+        threads = [threading.Thread(target=slow),
+                   threading.Thread(target=fast)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the dump of the slow thread is not cancelled by the fast thread
+        f.seek(0)
+        assert "in slow" in f.read()
@@ -0,0 +1,83 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import re
+
+import pytest
+
+
+@pytest.fixture(params=[[], ["--import-check-workers=2"]],
+                ids=["in-process", "workers"])
+def run_timing(run, request):
+    def inner(*args):
+        return run(*request.param, *args)
+    yield inner
+
+
+def parse_durations(result):
+    timings = {}
+    for line in result.stdout.lines:
+        match = re.match(r"(\S+)s total (\S+)s own (\S+)s cpu\s+(\S+)$",
+                         line)
+        if match is not None:
+            timings[match.group(4)] = tuple(float(x)
+                                            for x in match.group(1, 2, 3))
+    return timings
+
+
+def test_durations(run_timing, pytester):
+    pytester.makepyfile(
+        fast="",
+        slow="import slowdep",
+        slowdep="import time; time.sleep(0.2)",
+    )
+    result = run_timing("--import-check-durations=1")
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines(["*= slowest 1 module imports =*"])
+    assert list(parse_durations(result)) in (["slow.py::import-check"],
+                                             ["slowdep.py::import-check"])
+
+    result = run_timing("--import-check-durations=0")
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines(["*= slowest module imports =*"])
+    timings = parse_durations(result)
+    assert len(timings) == 3
+    # slow.py's own time does not include slowdep
+    assert timings["slow.py::import-check"][0] >= 0.2
+    assert timings["slow.py::import-check"][1] < 0.1
+    assert timings["slowdep.py::import-check"][1] >= 0.2
+
+
+def test_max_time(run_timing, pytester):
+    pytester.makepyfile(
+        fast="",
+        slow="import time; time.sleep(0.2)",
+    )
+    pytester.makeini("""
+        [pytest]
+        import_check_max_time = 0.1
+    """)
+    result = run_timing()
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        "fast.py::import-check*PASSED*",
+        "slow.py::import-check*FAILED*",
+        "Importing took *s, longer than import_check_max_time = 0.1s",
+    ])
+
+
+@pytest.mark.parametrize("args", [[], ["--import-check-durations=0"]])
+def test_loader_not_wrapped(run_timing, pytester, args):
+    pytester.makepyfile(
+        good=f"""
+            import sys
+
+            assert type(__loader__).__name__ != "_TimedLoader"
+            assert type(__spec__.loader).__name__ != "_TimedLoader"
+            # the timer is only installed if durations are requested
+            assert any(type(x).__name__ == "ImportTimer"
+                       for x in sys.meta_path) is {bool(args)}
+        """,
+    )
+    result = run_timing(*args)
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,145 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import multiprocessing.connection
+
+import pytest
+
+from pytest_import_check.engine import WorkerPool
+from pytest_import_check.runner import CheckOptions
+
+
+@pytest.fixture
+def run_workers(run):
+    def inner(*args):
+        return run("--import-check-workers=2", *args)
+    yield inner
+
+
+def test_workers(run_workers, pytester):
+    pytester.makepyfile(good="import other", other="")
+    foo = pytester.mkpydir("foo")
+    (foo / "bar.py").write_text("from . import baz")
+    (foo / "baz.py").write_text("import foo.bar")
+    result = run_workers()
+    result.assert_outcomes(passed=5)
+    result.stdout.fnmatch_lines([
+        "foo/__init__.py::import-check*PASSED*",
+        "foo/bar.py::import-check*PASSED*",
+        "foo/baz.py::import-check*PASSED*",
+        "good.py::import-check*PASSED*",
+        "other.py::import-check*PASSED*",
+    ])
+
+
+def test_workers_bad_import(run_workers, pytester):
+    pytester.makepyfile(bad="import this_package_really_shouldnt_exist")
+    result = run_workers()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        "bad.py::import-check*FAILED*",
+        "*bad.py*line 1*",
+        "*import this_package_really_shouldnt_exist",
+        "ModuleNotFoundError:*",
+    ])
+    # the exception is shown in the short test summary
+    result.stdout.fnmatch_lines([
+        ("FAILED bad.py::import-check - ModuleNotFoundError: No module named "
+         "'this_package_really_shouldnt_exist'"),
+    ])
+    result.stdout.no_fnmatch_line("*importlib*")
+    result.stdout.no_fnmatch_line("*pytest_import_check*")
+
+
+def test_workers_isolation(run, pytester):
+    pytester.makepyfile(
+        a="import sys; sys.modules['injected'] = sys",
+        b="import injected",
+    )
+    # both modules are imported by the same worker
+    result = run("--import-check-workers=1")
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        "a.py::import-check*PASSED*",
+        "b.py::import-check*FAILED*",
+    ])
+
+
+def test_workers_crash(run_workers, pytester):
+    pytester.makepyfile(crash="import os; os._exit(3)", good="")
+    result = run_workers()
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        "crash.py::import-check*FAILED*",
+        "good.py::import-check*PASSED*",
+        "*Worker process exited with code 3*",
+    ])
+
+
+def test_workers_connection_reset(tmp_path, monkeypatch):
+    path = tmp_path / "mod.py"
+    path.write_text("")
+    pool = WorkerPool(CheckOptions(mode="prepend",
+                                   root=tmp_path,
+                                   consider_namespace_packages=False),
+                      workers=1)
+    try:
+        pool.submit([[path]])
+        worker, = pool._pool
+        worker.process.kill()
+        worker.process.join()
+
+        def recv(self):
+            raise ConnectionResetError("Connection reset by peer")
+
+        # a worker killed while sending the result
+        monkeypatch.setattr(multiprocessing.connection.Connection, "recv",
+                            recv)
+        result = pool.result(path)
+    finally:
+        pool.close()
+    assert result.error == (f"Worker process exited with code -9 while "
+                            f"importing {path}")
+
+
+def test_workers_output(run_workers, pytester):
+    pytester.makepyfile(
+        out="""
+        import warnings
+
+        print("hello from import")
+        warnings.warn("test warning")
+        1 / 0
+        """)
+    result = run_workers("-Wdefault")
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines([
+        "out.py::import-check*FAILED*",
+        "ZeroDivisionError:*",
+        "*Captured stdout call*",
+        "hello from import",
+        "*out.py:4: UserWarning: test warning*",
+    ])
+
+
+@pytest.mark.parametrize("preload", ["json,decimal", "auto"])
+def test_preload(run, pytester, preload):
+    pytester.makepyfile(
+        a="import json, decimal",
+        b="import json, decimal; import sys; sys.modules['injected'] = sys",
+        c="import json; import injected",
+    )
+    foo = pytester.mkpydir("foo")
+    (foo / "bar.py").write_text("import decimal; from . import baz")
+    (foo / "baz.py").write_text("import foo.bar")
+    result = run(f"--import-check-preload={preload}",
+                 "--import-check-workers=2")
+    result.assert_outcomes(passed=5, failed=1)
+    result.stdout.fnmatch_lines([
+        "a.py::import-check*PASSED*",
+        "b.py::import-check*PASSED*",
+        "c.py::import-check*FAILED*",
+        "foo/__init__.py::import-check*PASSED*",
+        "foo/bar.py::import-check*PASSED*",
+        "foo/baz.py::import-check*PASSED*",
+    ])
@@ -0,0 +1,73 @@
+# (c) 2024 Michał Górny
+# SPDX-License-Identifier: GPL-2.0-or-later
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def packages(pytester):
+    for name in ("pkg_a", "pkg_b", "pkg_c"):
+        pkg = pytester.mkpydir(name)
+        (pkg / "mod.py").write_text("")
+
+
+@pytest.fixture
+def fake_worker(pytester):
+    # pretend to be a pytest-xdist worker, and print the scheduled items
+    pytester.makeconftest("""
+        import pytest
+
+        @pytest.hookimpl(tryfirst=True)
+        def pytest_configure(config):
+            config.workerinput = {}
+
+        def pytest_collection_finish(session):
+            for item in session.items:
+                group = item.get_closest_marker("xdist_group").args[0]
+                print(f"ITEM {item.nodeid} {group}")
+    """)
+
+
+def test_xdist_group(run, pytester, packages, fake_worker):
+    result = run("--collect-only")
+    result.stdout.fnmatch_lines([
+        "ITEM pkg_a/__init__.py::import-check pkg_a",
+        "ITEM pkg_a/mod.py::import-check pkg_a",
+        "ITEM pkg_b/__init__.py::import-check pkg_b",
+        "ITEM pkg_b/mod.py::import-check pkg_b",
+        "ITEM pkg_c/__init__.py::import-check pkg_c",
+        "ITEM pkg_c/mod.py::import-check pkg_c",
+    ])
+
+
+def test_xdist_longest_first(run, pytester, packages, fake_worker):
+    cache = pytester.path / ".pytest_cache/v/import-check/durations"
+    cache.parent.mkdir(parents=True)
+    cache.write_text(json.dumps({
+        "pkg_a/mod.py": 0.1,
+        "pkg_b/__init__.py": 0.2,
+        "pkg_b/mod.py": 0.5,
+        "pkg_c/mod.py": 0.3,
+    }))
+    result = run("--collect-only")
+    result.stdout.fnmatch_lines([
+        "ITEM pkg_b/__init__.py::import-check pkg_b",
+        "ITEM pkg_b/mod.py::import-check pkg_b",
+        "ITEM pkg_c/__init__.py::import-check pkg_c",
+        "ITEM pkg_c/mod.py::import-check pkg_c",
+        "ITEM pkg_a/__init__.py::import-check pkg_a",
+        "ITEM pkg_a/mod.py::import-check pkg_a",
+    ])
+
+
+def test_durations_recorded(run, pytester, packages):
+    result = run()
+    result.assert_outcomes(passed=6)
+    cache = pytester.path / ".pytest_cache/v/import-check/durations"
+    assert set(json.loads(cache.read_text())) == {
+        "pkg_a/__init__.py", "pkg_a/mod.py",
+        "pkg_b/__init__.py", "pkg_b/mod.py",
+        "pkg_c/__init__.py", "pkg_c/mod.py",
+    }